@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+"Attributes of type X with label High, by category": walking every simplified JSON
+(parse + Event.Attribute / Event.Object[].Attribute loops) vs the columnar attribute
+table (scripts/attribute_table.py), memory-mapped. The frozen snapshot is replicated
+--scale times under fresh uuids to reach millions of attributes.
+
+Example:
+  python benchmarks/bench_attribute_table.py --scale 100 --type ip-dst --label High
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import json_codec  # noqa: E402
+from attribute_table import AttributeTable, build_attribute_table  # noqa: E402
+from mock_feed import FROZEN_SNAPSHOT, collect_events  # noqa: E402
+
+LABELS = {"1": "High", "2": "Medium", "3": "Low"}
+
+def build_dir(path: str, root: str, scale: int) -> int:
+    os.makedirs(path)
+    n = 0
+    with open(os.path.join(path, "manifest.jsonl"), "w", encoding="utf-8") as mani:
+        for name, src in sorted(collect_events(root).items()):
+            with open(src, "rb") as f:
+                data = f.read()
+            label = json_codec.loads(data).get("Event", {}).get("threat_level_id")
+            for k in range(scale):
+                fn = f"{os.path.splitext(name)[0]}-{k:04d}.json"
+                with open(os.path.join(path, fn), "wb") as f:
+                    f.write(data)
+                mani.write(json.dumps({"filename": fn, "threat_level_id": label}) + "\n")
+                n += 1
+    return n
+
+def walk_json(path: str, attr_type: str, label: str):
+    """The query without a table: parse every file and walk its attributes."""
+    labels = {}
+    with open(os.path.join(path, "manifest.jsonl"), "r", encoding="utf-8") as f:
+        for line in f:
+            r = json.loads(line)
+            labels[r["filename"]] = LABELS.get(str(r.get("threat_level_id")))
+    counts = collections.Counter()
+    for fn in sorted(os.listdir(path)):
+        if not fn.endswith(".json") or labels.get(fn) != label:
+            continue
+        with open(os.path.join(path, fn), "rb") as f:
+            ev = json_codec.loads(f.read()).get("Event", {})
+        attrs = list(ev.get("Attribute") or [])
+        for o in ev.get("Object") or []:
+            attrs.extend(o.get("Attribute") or [])
+        for a in attrs:
+            if a.get("type") == attr_type:
+                counts[a.get("category")] += 1
+    return sorted(counts.items(), key=lambda p: -p[1])
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the columnar attribute table against walking the JSONs.")
+    ap.add_argument("--root", default=FROZEN_SNAPSHOT, help="Directory tree with the (simplified) events to replicate")
+    ap.add_argument("--scale", type=int, default=40, help="Replicate the snapshot N times")
+    ap.add_argument("--type", default="ip-dst")
+    ap.add_argument("--label", default="High")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        simplified, table_dir = os.path.join(tmp, "simplified"), os.path.join(tmp, "attributes")
+        n = build_dir(simplified, args.root, args.scale)
+
+        start = time.perf_counter()
+        expected = walk_json(simplified, args.type, args.label)
+        t_walk = time.perf_counter() - start
+
+        start = time.perf_counter()
+        meta = build_attribute_table(simplified, table_dir)
+        t_build = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(table_dir, f)) for f in os.listdir(table_dir)) / 1e6
+        print(f"\n{n} events, {meta['rows']} attributes; table {size:.1f} MB, built in {t_build:.1f}s\n")
+
+        best_load = best_query = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            table = AttributeTable.load(table_dir)
+            table.dicts["type"].code(args.type)  # reverse maps are built on first use
+            loaded = time.perf_counter()
+            got = table.count_by("category", table.where(type=args.type, label=args.label))
+            done = time.perf_counter()
+            best_load, best_query = min(best_load, loaded - start), min(best_query, done - loaded)
+        print(f"walk JSON          {t_walk * 1e3:10.1f} ms")
+        print(f"table load (mmap)  {best_load * 1e3:10.1f} ms")
+        print(f"table query        {best_query * 1e3:10.1f} ms   x{t_walk / best_query:,.0f} vs walking")
+        print(f"results {'identical' if got == expected else 'DIFFER'}: {got[:3]}")
+
+if __name__ == "__main__":
+    main()
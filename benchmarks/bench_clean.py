@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Scaling of utils.clean_json_recursively / utils.scrub_labels on deep and wide synthetic
+trees, against the previous recursive implementations (kept below as references).
+
+The recursive clean re-cleans every child inside its emptiness test, so its time doubles
+with each level of nesting; it is only run up to --max-legacy-depth. Outputs of the
+stack-based versions (copy and inplace) are checked against the references.
+
+Example:
+  python benchmarks/bench_clean.py --depths 10 14 18 1000 10000 --widths 1000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+from utils import _is_empty, clean_json_recursively, scrub_labels  # noqa: E402
+
+def legacy_clean(x):
+    if isinstance(x, dict):
+        return {k: legacy_clean(v) for k, v in x.items() if not _is_empty(legacy_clean(v))}
+    if isinstance(x, list):
+        return [legacy_clean(v) for v in x if not _is_empty(legacy_clean(v))]
+    return x
+
+def legacy_scrub(event_dict):
+    def _scrub(obj):
+        if isinstance(obj, dict):
+            return {k: _scrub(v) for k, v in obj.items() if k not in ("threat_level", "threat_level_id")}
+        if isinstance(obj, list):
+            return [_scrub(v) for v in obj]
+        return obj
+    return _scrub(event_dict)
+
+def deep_tree(depth: int):
+    root = node = {}
+    for _ in range(depth):
+        child = {"value": "x", "comment": "", "threat_level": 1}
+        node["Object"] = child
+        node = child
+    return {"Event": root}
+
+def wide_tree(width: int):
+    attrs = [{"type": "ip-dst", "value": f"10.0.{i % 256}.{i % 251}", "comment": "", "Tag": [],
+              "threat_level_id": "2"} for i in range(width)]
+    return {"Event": {"info": "wide", "Attribute": attrs, "threat_level_id": "2"}}
+
+def _time(fn, make_tree, repeat: int, fresh: bool):
+    best, out, tree = float("inf"), None, make_tree()
+    for _ in range(repeat):
+        t = make_tree() if fresh else tree
+        start = time.perf_counter()
+        out = fn(t)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+def _row(label: str, make_tree, max_legacy_depth: int, depth: int, repeat: int):
+    for name, new, ref in (("clean", clean_json_recursively, legacy_clean), ("scrub", scrub_labels, legacy_scrub)):
+        t_copy, out = _time(new, make_tree, repeat, False)
+        t_inplace, out_inplace = _time(lambda t: new(t, inplace=True), make_tree, repeat, True)
+        ok = out == out_inplace
+        msg = f"{label:<14} {name}  copy {t_copy * 1e3:9.2f} ms  inplace {t_inplace * 1e3:9.2f} ms"
+        if depth <= max_legacy_depth:
+            t_ref, expected = _time(ref, make_tree, repeat, False)
+            ok = ok and out == expected
+            msg += f"  recursive {t_ref * 1e3:10.2f} ms"
+        print(f"{msg}  {'identical' if ok else 'DIFFER'}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark stack-based clean/scrub on deep and wide trees.")
+    ap.add_argument("--depths", type=int, nargs="+", default=[10, 14, 18, 1000, 10000, 20000])
+    ap.add_argument("--widths", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--max-legacy-depth", type=int, default=18,
+                    help="Deepest tree to run the exponential recursive reference on")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    # Comparing the deepest outputs with == recurses in C; the cleaners themselves do not.
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * max(args.depths) + 1000))
+
+    for d in args.depths:
+        _row(f"depth={d}", lambda: deep_tree(d), args.max_legacy_depth, d, args.repeat)
+    for w in args.widths:
+        _row(f"width={w}", lambda: wide_tree(w), args.max_legacy_depth, 0, args.repeat)
+
+if __name__ == "__main__":
+    main()
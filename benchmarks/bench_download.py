@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Compare the thread and asyncio download engines of download_events.py against
+a local mock feed serving the frozen snapshot (see mock_feed.py).
+
+One synthetic "giant" event is added to the feed so head-of-line blocking in
+in-order reporting shows up as a long stall between consecutive results.
+
+Example:
+  python benchmarks/bench_download.py --max-workers 16 --latency 0.02 --repeat 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import download_events as dl  # noqa: E402
+from mock_feed import FROZEN_SNAPSHOT, MockFeedServer  # noqa: E402
+
+def write_giant_event(path: str, n_attributes: int) -> None:
+    attrs = [
+        {"category": "Network activity", "type": "ip-dst", "value": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+         "comment": "", "timestamp": "1700000000", "to_ids": True}
+        for i in range(n_attributes)
+    ]
+    event = {"Event": {"uuid": "00000000-0000-4000-8000-000000000000", "date": "2025-01-01",
+                       "info": "synthetic giant event", "threat_level_id": "2",
+                       "timestamp": "1700000000", "Attribute": attrs}}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(event, f)
+
+def _pct(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+def run_once(engine: str, feed_url: str, max_workers: int) -> Dict[str, Any]:
+    entries = dl.list_feed_events([feed_url])
+    client = dl.HttpClient(max_workers=max_workers)
+    done_at: List[float] = []
+    errors = 0
+    with tempfile.TemporaryDirectory() as out_raw:
+        def worker(entry):
+            return dl.download_one(entry["url"], out_raw, client=client)
+
+        def on_result(res):
+            nonlocal errors
+            done_at.append(time.perf_counter() - start)
+            errors += "error" in res
+
+        start = time.perf_counter()
+        dl.run_engine(engine, entries, worker, max_workers, on_result)
+        wall = time.perf_counter() - start
+    gaps = [b - a for a, b in zip(done_at, done_at[1:])]
+    return {
+        "engine": engine,
+        "events": len(done_at),
+        "errors": errors,
+        "wall_s": wall,
+        "events_per_s": len(done_at) / wall if wall else 0.0,
+        "first_result_s": done_at[0] if done_at else None,
+        "report_p50_s": _pct(done_at, 0.50),
+        "report_p99_s": _pct(done_at, 0.99),
+        "max_stall_s": max(gaps) if gaps else 0.0,
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark download engines against a local mock feed.")
+    ap.add_argument("--root", default=FROZEN_SNAPSHOT, help="Directory tree with the events to serve")
+    ap.add_argument("--max-workers", type=int, default=16)
+    ap.add_argument("--latency", type=float, default=0.01, help="Injected per-request latency (s)")
+    ap.add_argument("--bytes-per-sec", type=float, default=20e6, help="Per-connection bandwidth (0 = unlimited)")
+    ap.add_argument("--giant-attributes", type=int, default=200_000,
+                    help="Attributes in the synthetic giant event (0 = none)")
+    ap.add_argument("--engines", nargs="+", default=list(dl.ENGINES), choices=dl.ENGINES)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--json", default=None, help="Optional path to write the raw results as JSON")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        extra = {}
+        if args.giant_attributes > 0:
+            giant = os.path.join(tmp, "00000000-0000-4000-8000-000000000000.json")
+            write_giant_event(giant, args.giant_attributes)
+            extra[os.path.basename(giant)] = giant
+            print(f"Giant event: {os.path.getsize(giant) / 1e6:.1f} MB")
+        with MockFeedServer(args.root, latency=args.latency, bytes_per_sec=args.bytes_per_sec or None,
+                            extra_files=extra) as srv:
+            print(f"Mock feed: {len(srv.files)} events at {srv.url}\n")
+            results = []
+            for engine in args.engines:
+                runs = [run_once(engine, srv.url, args.max_workers) for _ in range(args.repeat)]
+                results.extend(runs)
+                med = lambda k: statistics.median(r[k] for r in runs)  # noqa: E731
+                print(f"{engine:8} wall {med('wall_s'):6.2f}s  {med('events_per_s'):7.1f} ev/s  "
+                      f"first {med('first_result_s'):5.2f}s  p50 {med('report_p50_s'):5.2f}s  "
+                      f"p99 {med('report_p99_s'):5.2f}s  max stall {med('max_stall_s'):5.2f}s  "
+                      f"errors {runs[-1]['errors']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
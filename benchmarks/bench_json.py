@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the json_codec backends over the frozen snapshot.
+
+For every installed backend: loads (bytes -> object), compact dumps (what the token
+filter tokenizes) and indent=4 dumps (what simplify_misp writes by default), in MB/s.
+Also checks that every backend produces byte-identical compact and pretty output for
+every event, i.e. that sha256 values and token counts cannot depend on the backend.
+With --tokenizer, token counts of the compact strings are compared as well.
+
+Example:
+  python benchmarks/bench_json.py --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import json_codec  # noqa: E402
+from mock_feed import FROZEN_SNAPSHOT, collect_events  # noqa: E402
+
+def _best_of(repeat: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark JSON backends and check output identity.")
+    ap.add_argument("--root", default=FROZEN_SNAPSHOT, help="Directory tree with the events to use")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--tokenizer", default=None, help="Optional HF tokenizer to compare token counts")
+    args = ap.parse_args()
+
+    blobs: List[bytes] = []
+    for _, path in sorted(collect_events(args.root).items()):
+        with open(path, "rb") as f:
+            blobs.append(f.read())
+    mb = sum(len(b) for b in blobs) / 1e6
+    print(f"{len(blobs)} events, {mb:.1f} MB\n")
+
+    digests: Dict[str, List[str]] = {}
+    compact: Dict[str, List[str]] = {}
+    for backend in json_codec.BACKENDS:
+        try:
+            json_codec.set_backend(backend)
+        except ImportError:
+            print(f"{backend:8} not installed")
+            continue
+        objs = [json_codec.loads(b) for b in blobs]
+        t_loads = _best_of(args.repeat, lambda: [json_codec.loads(b) for b in blobs])
+        t_compact = _best_of(args.repeat, lambda: [json_codec.dumps(o) for o in objs])
+        t_pretty = _best_of(args.repeat, lambda: [json_codec.dumps_bytes(o, indent=4) for o in objs])
+        compact[backend] = [json_codec.dumps(o) for o in objs]
+        digests[backend] = [
+            hashlib.sha256(json_codec.dumps_bytes(o, indent=4)).hexdigest() + hashlib.sha256(c.encode()).hexdigest()
+            for o, c in zip(objs, compact[backend])
+        ]
+        print(f"{backend:8} loads {mb / t_loads:7.1f} MB/s   dumps(compact) {mb / t_compact:7.1f} MB/s   "
+              f"dumps(indent=4) {mb / t_pretty:7.1f} MB/s")
+
+    reference = digests.get("json")
+    for backend, d in digests.items():
+        status = "identical" if d == reference else "DIFFERS"
+        print(f"{backend:8} output vs stdlib: {status}")
+
+    if args.tokenizer:
+        from transformers import AutoTokenizer
+        tok = AutoTokenizer.from_pretrained(args.tokenizer, use_fast=True)
+        counts = {
+            b: [len(ids) for ids in tok(c, add_special_tokens=False).input_ids] for b, c in compact.items()
+        }
+        for backend, c in counts.items():
+            status = "identical" if c == counts["json"] else "DIFFER"
+            print(f"{backend:8} token counts vs stdlib: {status} (total {sum(c)})")
+    json_codec.set_backend(os.environ.get("CTI_JSON_BACKEND", "auto"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Attribute value normalization on attribute-heavy events: the previous per-attribute
+normalize_value (re-parsing the type for every attribute, kept below as a reference)
+vs the per-type dispatch table, one value at a time and per attribute list
+(normalize_attribute_values, as simplify_event uses it).
+
+Events are built from the attributes of the frozen snapshot, --attributes per event,
+with one in --blob-every values replaced by a long hex/base64 blob.
+
+Example:
+  python benchmarks/bench_normalize.py --events 20 --attributes 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import json_codec  # noqa: E402
+import simplify_misp as sm  # noqa: E402
+from mock_feed import FROZEN_SNAPSHOT, collect_events  # noqa: E402
+
+def legacy_normalize_value(attr_type, value, truncate_long):
+    if value is None or not isinstance(value, str):
+        return value
+    if sm._type_is_hashlike(attr_type):
+        tok = sm._first_hash_token(attr_type)
+        return f"<{tok}>" if tok else "<hash>"
+    if sm._looks_like_big_blob(value) and truncate_long > 0:
+        return sm._truncate(value, truncate_long)
+    return value
+
+def build_events(root: str, n_events: int, n_attrs: int, blob_every: int, seed: int):
+    pool = []
+    for _, path in sorted(collect_events(root).items()):
+        with open(path, "rb") as f:
+            ev = json_codec.loads(f.read()).get("Event", {})
+        pool.extend(a for a in ev.get("Attribute", []) if isinstance(a, dict) and a.get("type"))
+        for o in ev.get("Object", []):
+            pool.extend(a for a in o.get("Attribute", []) if isinstance(a, dict) and a.get("type"))
+    rng = random.Random(seed)
+    events = []
+    for e in range(n_events):
+        attrs = []
+        for i in range(n_attrs):
+            a = dict(rng.choice(pool))
+            a["value"] = str(a.get("value"))
+            if blob_every and i % blob_every == 0:
+                a["value"] = rng.choice(["%064x" % rng.getrandbits(256) * 3, "QUJD" * rng.randint(20, 200)])
+            attrs.append(a)
+        events.append({"Event": {"info": f"attribute-heavy {e}", "threat_level_id": "2", "Attribute": attrs}})
+    return events
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark per-type dispatch for attribute value normalization.")
+    ap.add_argument("--root", default=FROZEN_SNAPSHOT, help="Directory tree with the events to draw attributes from")
+    ap.add_argument("--events", type=int, default=10)
+    ap.add_argument("--attributes", type=int, default=20000, help="Attributes per event")
+    ap.add_argument("--blob-every", type=int, default=50, help="Every N-th value is a long blob (0: none)")
+    ap.add_argument("--truncate-long", type=int, default=512)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    events = build_events(args.root, args.events, args.attributes, args.blob_every, 0)
+    attrs = [a for ev in events for a in ev["Event"]["Attribute"]]
+    tl = args.truncate_long
+    print(f"{len(events)} events, {len(attrs)} attributes, {len({a['type'] for a in attrs})} distinct types\n")
+
+    expected = [legacy_normalize_value(a["type"], a["value"], tl) for a in attrs]
+    same = [sm.normalize_value(a["type"], a["value"], tl) for a in attrs] == expected
+    batch = copy.deepcopy(attrs)
+    sm.normalize_attribute_values(batch, tl)
+    same = same and [a["value"] for a in batch] == expected
+
+    t_legacy = _best(lambda: [legacy_normalize_value(a["type"], a["value"], tl) for a in attrs], args.repeat)
+    t_table = _best(lambda: [sm.normalize_value(a["type"], a["value"], tl) for a in attrs], args.repeat)
+    copies = [copy.deepcopy(attrs) for _ in range(args.repeat)]
+    t_batch = _best(lambda: sm.normalize_attribute_values(copies.pop(), tl), args.repeat)
+    for name, t in (("per-attribute (re-parse type)", t_legacy), ("per-attribute (type table)", t_table),
+                    ("per-list batch", t_batch)):
+        print(f"{name:<30} {t * 1e3:8.1f} ms  {len(attrs) / t / 1e6:6.2f} M attrs/s  x{t_legacy / t:5.2f}")
+    print(f"values {'identical' if same else 'DIFFER'}\n")
+
+    t_event = _best(lambda: [sm.simplify_event(ev, keep_to_ids=True, truncate_long=tl) for ev in events], args.repeat)
+    print(f"simplify_event                 {t_event * 1e3:8.1f} ms  {len(attrs) / t_event / 1e6:6.2f} M attrs/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+One-file-per-event directory vs pack (scripts/packstore.py) on the frozen snapshot,
+replicated --scale times: listing, a full sequential read, random access by name,
+and the conversion itself. Page caches are warm, so on a network filesystem the gap
+(dominated there by per-file metadata round-trips) is larger than shown here.
+
+Example:
+  python benchmarks/bench_pack.py --scale 20 --lookups 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import packstore  # noqa: E402
+from mock_feed import FROZEN_SNAPSHOT, collect_events  # noqa: E402
+
+def build_dir(path: str, root: str, scale: int) -> int:
+    os.makedirs(path)
+    n = 0
+    for name, src in sorted(collect_events(root).items()):
+        with open(src, "rb") as f:
+            data = f.read()
+        stem = os.path.splitext(name)[0]
+        for k in range(scale):
+            with open(os.path.join(path, f"{stem}-{k:03d}.json"), "wb") as f:
+                f.write(data)
+            n += 1
+    return n
+
+def _timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - start, out
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark packed shards + offset index vs one file per event.")
+    ap.add_argument("--root", default=FROZEN_SNAPSHOT, help="Directory tree with the events to replicate")
+    ap.add_argument("--scale", type=int, default=10, help="Replicate the snapshot N times")
+    ap.add_argument("--lookups", type=int, default=10000, help="Random reads by name")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plain, packed = os.path.join(tmp, "raw"), os.path.join(tmp, "raw.pack")
+        n = build_dir(plain, args.root, args.scale)
+        t_pack, _ = _timed(lambda: packstore.pack_dir(plain, packed))
+        mb = sum(os.path.getsize(os.path.join(plain, f)) for f in os.listdir(plain)) / 1e6
+        print(f"{n} files, {mb:.1f} MB; pack_dir {t_pack:.2f}s -> {len(os.listdir(packed))} files\n")
+
+        rng = random.Random(0)
+        for label, path in (("directory", plain), ("pack", packed)):
+            t_open, store = _timed(lambda: packstore.open_store(path))
+            t_list, names = _timed(lambda: store.names(".json"))
+            t_seq, _ = _timed(lambda: sum(len(data) for _, data in store.items()))
+            picks = [rng.choice(names) for _ in range(args.lookups)]
+            t_rand, _ = _timed(lambda: [store.read(name) for name in picks])
+            print(f"{label:<10} open+list {(t_open + t_list) * 1e3:8.1f} ms   sequential {mb / t_seq:8.1f} MB/s   "
+                  f"random {t_rand / len(picks) * 1e6:7.1f} us/read")
+            store.close()
+
+if __name__ == "__main__":
+    main()
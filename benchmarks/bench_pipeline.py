@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+End to end against a local mock feed (see mock_feed.py): download_events.py,
+simplify_misp.py and filter_and_split.py run one after the other, vs scripts/pipeline.py
+streaming the same events through bounded queues. Reports wall time and the bytes each
+leaves on disk, and checks that both prepared/ trees are identical.
+
+Example:
+  python benchmarks/bench_pipeline.py --tokenizer meta-llama/Meta-Llama-3-8B-Instruct --latency 0.1
+"""
+
+from __future__ import annotations
+
+import argparse
+import filecmp
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+sys.path.insert(0, SCRIPTS)
+
+from mock_feed import FROZEN_SNAPSHOT, MockFeedServer  # noqa: E402
+
+def _run(argv: List[str]) -> None:
+    subprocess.run([sys.executable, os.path.join(SCRIPTS, argv[0])] + argv[1:], check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def _tree_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+def _same_tree(a: str, b: str) -> bool:
+    cmp = filecmp.dircmp(a, b)
+    if cmp.left_only or cmp.right_only or cmp.funny_files:
+        return False
+    _, mismatch, errors = filecmp.cmpfiles(a, b, cmp.common_files, shallow=False)
+    return not mismatch and not errors and all(_same_tree(os.path.join(a, d), os.path.join(b, d)) for d in cmp.common_dirs)
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the three-script workflow against the streaming pipeline.")
+    ap.add_argument("--root", default=FROZEN_SNAPSHOT, help="Directory tree with the events to serve")
+    ap.add_argument("--tokenizer", default="meta-llama/Meta-Llama-3-8B-Instruct")
+    ap.add_argument("--max-context-length", type=int, default=8192)
+    ap.add_argument("--latency", type=float, default=0.1, help="Injected per-request latency (s)")
+    ap.add_argument("--bytes-per-sec", type=float, default=2e6, help="Per-connection bandwidth (0 = unlimited)")
+    ap.add_argument("--download-workers", type=int, default=16)
+    ap.add_argument("--simplify-workers", type=int, default=1)
+    args = ap.parse_args()
+
+    token = ["--no_token_cache", "--tokenizer_model", args.tokenizer, "--max_context_length", str(args.max_context_length)]
+    with tempfile.TemporaryDirectory() as tmp, \
+            MockFeedServer(args.root, latency=args.latency, bytes_per_sec=args.bytes_per_sec or None) as srv:
+        print(f"Mock feed: {len(srv.files)} events at {srv.url}\n")
+        staged, piped = os.path.join(tmp, "staged"), os.path.join(tmp, "piped")
+
+        start = time.perf_counter()
+        _run(["download_events.py", "--out", staged, "--index-url", srv.url, "--max-workers", str(args.download_workers)])
+        t_download = time.perf_counter() - start
+        _run(["simplify_misp.py", "--input-dir", os.path.join(staged, "raw"), "--output-dir",
+              os.path.join(staged, "simplified"), "--workers", str(args.simplify_workers)])
+        t_simplify = time.perf_counter() - start
+        _run(["filter_and_split.py", "--input_dir", os.path.join(staged, "simplified"), "--output_dir",
+              os.path.join(staged, "prepared"), "--split"] + token)
+        t_staged = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _run(["pipeline.py", "--out", piped, "--index-url", srv.url, "--split",
+              "--download-workers", str(args.download_workers), "--simplify-workers", str(args.simplify_workers),
+              "--no-token-cache", "--tokenizer-model", args.tokenizer, "--max-context-length", str(args.max_context_length)])
+        t_piped = time.perf_counter() - start
+
+        print(f"three scripts  {t_staged:7.2f}s  (download {t_download:.2f}s, simplify {t_simplify - t_download:.2f}s, "
+              f"filter {t_staged - t_simplify:.2f}s)  {_tree_bytes(staged) / 1e6:8.1f} MB on disk")
+        print(f"pipeline       {t_piped:7.2f}s  x{t_staged / t_piped:.2f}"
+              f"{'':>45}{_tree_bytes(piped) / 1e6:8.1f} MB on disk")
+        same = _same_tree(os.path.join(staged, "prepared"), os.path.join(piped, "prepared"))
+        print(f"prepared/ {'identical' if same else 'DIFFERS'}")
+
+if __name__ == "__main__":
+    main()
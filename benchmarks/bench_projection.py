@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Per-spec throughput of the compiled event projections (scripts/projection.py):
+schema / llm / core from utils.py and strict from simplify_misp.py, on already
+parsed events of the frozen snapshot.
+
+Example:
+  python benchmarks/bench_projection.py --repeat 5 --scale 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import json_codec  # noqa: E402
+import simplify_misp  # noqa: E402
+import utils  # noqa: E402
+from mock_feed import FROZEN_SNAPSHOT, collect_events  # noqa: E402
+from projection import compile_spec  # noqa: E402
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark compiled projection specs on the frozen snapshot.")
+    ap.add_argument("--root", default=FROZEN_SNAPSHOT, help="Directory tree with the events to use")
+    ap.add_argument("--scale", type=int, default=1, help="Project every event N times per run")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--truncate-long", type=int, default=512)
+    args = ap.parse_args()
+
+    events = []
+    for _, path in sorted(collect_events(args.root).items()):
+        with open(path, "rb") as f:
+            events.append(json_codec.loads(f.read()))
+    events *= args.scale
+
+    specs = [utils.SCHEMA_SPEC, utils.LLM_SPEC, utils.CORE_SPEC,
+             simplify_misp.strict_spec(keep_to_ids=True, truncate_long=args.truncate_long)]
+    print(f"{len(events)} events\n")
+    for s in specs:
+        start = time.perf_counter()
+        project = compile_spec(s)
+        t_compile = time.perf_counter() - start
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for ev in events:
+                project(ev)
+            best = min(best, time.perf_counter() - start)
+        print(f"{s['name']:<8} {len(events) / best:10.0f} events/s  {best * 1e6 / len(events):7.2f} us/event  "
+              f"compile {t_compile * 1e3:5.2f} ms ({project.source.count('def ')} functions)")
+
+if __name__ == "__main__":
+    main()
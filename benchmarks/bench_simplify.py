@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for simplify_misp.simplify_and_write_dataset(workers=N).
+
+Builds a raw/ directory from the frozen snapshot (optionally replicated --scale
+times under fresh file names), simplifies it with each worker count, and checks
+that every manifest.jsonl is byte-identical to the serial one.
+
+Example:
+  python benchmarks/bench_simplify.py --workers 1 2 4 8 --scale 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import simplify_misp  # noqa: E402
+from mock_feed import FROZEN_SNAPSHOT, collect_events  # noqa: E402
+
+def build_raw_dir(dst: str, root: str, scale: int) -> int:
+    """Copy the snapshot events `scale` times into dst and write a matching manifest.jsonl."""
+    namespace = uuid.UUID(int=0)
+    n = 0
+    with open(os.path.join(dst, "manifest.jsonl"), "w", encoding="utf-8") as mani:
+        for rep in range(scale):
+            for name, path in sorted(collect_events(root).items()):
+                fn = name if rep == 0 else f"{uuid.uuid5(namespace, f'{rep}/{name}')}.json"
+                shutil.copyfile(path, os.path.join(dst, fn))
+                with open(path, "r", encoding="utf-8") as f:
+                    ev = json.load(f).get("Event", {})
+                mani.write(json.dumps({
+                    "filename": fn,
+                    "threat_level_id": ev.get("threat_level_id"),
+                    "date": ev.get("date"),
+                    "publish_timestamp": ev.get("publish_timestamp"),
+                }) + "\n")
+                n += 1
+    return n
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark serial vs process-pool simplification.")
+    ap.add_argument("--root", default=FROZEN_SNAPSHOT, help="Directory tree with the events to simplify")
+    ap.add_argument("--scale", type=int, default=4, help="Replicate the snapshot N times")
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--truncate-long", type=int, default=512)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = os.path.join(tmp, "raw")
+        os.makedirs(raw)
+        n = build_raw_dir(raw, args.root, args.scale)
+        mb = sum(os.path.getsize(os.path.join(raw, f)) for f in os.listdir(raw)) / 1e6
+        rows = {r["filename"]: r for r in simplify_misp.read_manifest(os.path.join(raw, "manifest.jsonl"))}
+        print(f"{n} events, {mb:.1f} MB raw, {os.cpu_count()} CPUs\n")
+
+        reference = None
+        base_wall = None
+        for w in args.workers:
+            out = os.path.join(tmp, f"simplified_w{w}")
+            start = time.perf_counter()
+            simplify_misp.simplify_and_write_dataset(raw, out, rows, keep_to_ids=True,
+                                                     truncate_long=args.truncate_long, workers=w)
+            wall = time.perf_counter() - start
+            with open(os.path.join(out, "manifest.jsonl"), "rb") as f:
+                manifest = f.read()
+            if reference is None:
+                reference, base_wall = manifest, wall
+            same = "identical" if manifest == reference else "MANIFEST DIFFERS"
+            print(f"workers={w:<3} {wall:7.2f}s  {n / wall:8.1f} files/s  {mb / wall:6.1f} MB/s  "
+                  f"speedup x{base_wall / wall:4.2f}  manifest {same}")
+            shutil.rmtree(out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Peak memory and throughput of simplify_file_streaming on one giant synthetic event, vs
+the in-memory path (read + json_codec.loads + simplify_event + dumps_bytes) of
+simplify_one. Each path runs in a fresh subprocess that reports its own peak RSS
+(ru_maxrss); both outputs are compared byte for byte, for the default indent=4
+output and for --compact (which encodes every head value on its own when streaming).
+
+The event is written incrementally (never held in memory) from the attributes and
+objects of the frozen snapshot, cycled until the file reaches --size-mb.
+The in-memory path is skipped above --max-inmem-mb.
+
+Example:
+  python benchmarks/bench_stream.py --size-mb 2048 --max-inmem-mb 512
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+sys.path.insert(0, SCRIPTS)
+
+import json_codec  # noqa: E402
+from mock_feed import FROZEN_SNAPSHOT, collect_events  # noqa: E402
+
+_RUN = """
+import os, resource, sys, time
+sys.path.insert(0, {scripts!r})
+import json_codec, simplify_misp as sm
+mode, in_path, out_path, compact = sys.argv[1:4] + [sys.argv[4] == "compact"]
+start = time.perf_counter()
+if mode == "stream":
+    sm.simplify_file_streaming(in_path, out_path, True, 512, compact)
+else:
+    with open(in_path, "rb") as f:
+        ev = json_codec.loads(f.read())
+    with open(out_path, "wb") as f:
+        f.write(json_codec.dumps_bytes(sm.simplify_event(ev, True, 512), indent=None if compact else 4))
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def write_event(path: str, root: str, size_mb: float) -> int:
+    attrs, objs = [], []
+    for _, p in sorted(collect_events(root).items()):
+        with open(p, "rb") as f:
+            ev = json_codec.loads(f.read()).get("Event", {})
+        attrs.extend(json_codec.dumps_bytes(a) for a in ev.get("Attribute", []))
+        objs.extend(json_codec.dumps_bytes(o) for o in ev.get("Object", []))
+    target = int(size_mb * (1 << 20))
+    with open(path, "wb") as f:
+        f.write(b'{"Event": {"info": "giant synthetic event", "threat_level_id": "2", '
+                b'"date": "2024-01-01", "timestamp": 1e16, "publish_timestamp": 1.5e-7, '
+                b'"Tag": [{"name": "tlp:white"}], "Attribute": [')
+        n = 0
+        while f.tell() < target * 0.9:
+            f.write((b",\n" if n else b"") + attrs[n % len(attrs)])
+            n += 1
+        f.write(b'], "Object": [')
+        m = 0
+        while f.tell() < target:
+            f.write((b",\n" if m else b"") + objs[m % len(objs)])
+            m += 1
+        f.write(b"]}}")
+    return n + m
+
+def run(mode: str, in_path: str, out_path: str, fmt: str):
+    proc = subprocess.run([sys.executable, "-c", _RUN.format(scripts=SCRIPTS), mode, in_path, out_path, fmt],
+                          check=True, capture_output=True, text=True)
+    secs, peak_kb = proc.stdout.split()[-2:]
+    return float(secs), int(peak_kb)
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark bounded-memory streaming simplification of a giant event.")
+    ap.add_argument("--root", default=FROZEN_SNAPSHOT, help="Directory tree with the events to draw items from")
+    ap.add_argument("--size-mb", type=float, default=1024, help="Size of the synthetic event file")
+    ap.add_argument("--max-inmem-mb", type=float, default=512, help="Largest size to also run in memory")
+    ap.add_argument("--tmp-dir", default=None, help="Where to write the event (needs about 2x --size-mb free)")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.tmp_dir) as tmp:
+        in_path = os.path.join(tmp, "event.json")
+        start = time.perf_counter()
+        n_items = write_event(in_path, args.root, args.size_mb)
+        size = os.path.getsize(in_path)
+        print(f"{size / 2**20:.0f} MB event, {n_items} attributes/objects (written in {time.perf_counter() - start:.1f} s)\n")
+
+        for fmt in ("indent", "compact"):
+            outputs = {}
+            for mode in ("stream", "in-memory"):
+                label = f"{mode} ({fmt})"
+                if mode == "in-memory" and size > args.max_inmem_mb * 2**20:
+                    print(f"{label:<20} skipped (--max-inmem-mb {args.max_inmem_mb:g})")
+                    continue
+                outputs[mode] = os.path.join(tmp, f"out-{mode}.json")
+                secs, peak_kb = run(mode, in_path, outputs[mode], fmt)
+                print(f"{label:<20} {secs:7.1f} s  {size / 2**20 / secs:6.1f} MB/s  peak RSS {peak_kb / 1024:8.0f} MB")
+            if len(outputs) == 2:
+                with open(outputs["stream"], "rb") as a, open(outputs["in-memory"], "rb") as b:
+                    same = all(x == y for x, y in zip(iter(lambda: a.read(1 << 20), b""), iter(lambda: b.read(1 << 20), b"")))
+                same = same and os.path.getsize(outputs["stream"]) == os.path.getsize(outputs["in-memory"])
+                print(f"{fmt} outputs {'identical' if same else 'DIFFER'}")
+
+if __name__ == "__main__":
+    main()
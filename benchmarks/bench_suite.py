@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Per-stage benchmark suite: each stage of the data preparation runs over the frozen
+snapshot and over large synthetic raw events (synthetic_feed.py), one event at a time,
+and the results are compared against a stored baseline.
+
+Stages (what the scripts do per event):
+  parse      json_codec.loads of the event file
+  simplify   simplify_misp.simplify_event + indent=4 serialization
+  textify    utils.textify_event
+  render     filter_and_split.render_markdown_for_event
+  minify     json_codec.dumps of the simplified event (the token filter's input)
+  tokens     TokenCounter.within_limit (only with --tokenizer; token cache disabled)
+
+Every (dataset, stage) pair runs in a fresh process, so its peak RSS (prepared inputs
+included) is its own. Results (events/s, attributes/s, p50/p99 per-event latency, peak
+RSS) are written to --output as JSON. With --baseline, a stage whose throughput drops, or
+whose p99 latency or peak RSS grows, by more than --threshold is reported and the exit
+status is 1. benchmarks/baseline.json holds a baseline of the default settings; numbers
+are machine-specific, so record your own with --save-baseline before comparing.
+
+Examples:
+  python benchmarks/bench_suite.py --output results.json --baseline benchmarks/baseline.json
+  python benchmarks/bench_suite.py --save-baseline benchmarks/baseline.json
+  python benchmarks/bench_suite.py --stages simplify render --synthetic-attributes 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import json_codec  # noqa: E402
+from mock_feed import FROZEN_SNAPSHOT, collect_events  # noqa: E402
+from synthetic_feed import SnapshotProfile, SyntheticFeed  # noqa: E402
+from utils import count_attributes  # noqa: E402
+
+STAGES = ("parse", "simplify", "textify", "render", "minify", "tokens")
+DATASETS = ("frozen", "synthetic")
+# metric -> +1 if higher is better, -1 if lower is better
+COMPARED = {"events_per_s": +1, "attributes_per_s": +1, "p99_ms": -1, "peak_rss_mb": -1}
+
+# ---------------------------
+# Datasets
+# ---------------------------
+
+def synthetic_events(root: str, n_events: int, n_attributes: int, seed: int = 0) -> List[bytes]:
+    """n_events raw events of n_attributes attributes each from synthetic_feed.py, following root's distributions."""
+    feed = SyntheticFeed(SnapshotProfile(root), seed=seed)
+    return [b"".join(feed.event(k, n_attributes)[1]) for k in range(n_events)]
+
+def load_dataset(args, name: str) -> List[bytes]:
+    if name == "frozen":
+        data = []
+        for _, path in sorted(collect_events(args.root).items()):
+            with open(path, "rb") as f:
+                data.append(f.read())
+        return data
+    return synthetic_events(args.root, args.synthetic_events, args.synthetic_attributes, seed=args.seed)
+
+# ---------------------------
+# One stage, in this process
+# ---------------------------
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3  # bytes on macOS, KiB elsewhere
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+def prepare_stage(args, stage: str, raw: List[bytes]) -> Tuple[Callable[[Any], Any], List[Any]]:
+    """(per-event function, its inputs) for a stage; building the inputs is not timed."""
+    import simplify_misp
+
+    def simplified() -> List[Dict[str, Any]]:
+        return [simplify_misp.simplify_event(json_codec.loads(b), keep_to_ids=True, truncate_long=args.truncate_long)
+                for b in raw]
+
+    if stage == "parse":
+        return json_codec.loads, raw
+    if stage == "simplify":
+        def simplify(event):
+            return json_codec.dumps_bytes(
+                simplify_misp.simplify_event(event, keep_to_ids=True, truncate_long=args.truncate_long), indent=4)
+        return simplify, [json_codec.loads(b) for b in raw]
+    if stage == "textify":
+        from utils import textify_event
+        return textify_event, simplified()
+    if stage == "render":
+        from filter_and_split import render_markdown_for_event
+        return render_markdown_for_event, simplified()
+    if stage == "minify":
+        return json_codec.dumps, simplified()
+    if stage == "tokens":
+        from filter_and_split import OVERHEAD_CONFIG, calculate_safe_threshold
+        from token_counting import TokenCounter
+        counter = TokenCounter(args.tokenizer, cache_path=None)
+        limit = calculate_safe_threshold(args.max_context_length, OVERHEAD_CONFIG)
+        texts = [json_codec.dumps(e) for e in simplified()]
+        counter.within_limit(texts[:1], limit)  # load the tokenizer outside the timings
+        return (lambda text: counter.within_limit([text], limit)), texts
+    raise ValueError(f"unknown stage: {stage}")
+
+def run_stage(args, dataset: str, stage: str) -> Dict[str, Any]:
+    raw = load_dataset(args, dataset)
+    attributes = [count_attributes(json_codec.loads(b)) for b in raw]
+    fn, inputs = prepare_stage(args, stage, raw)
+    latencies: List[float] = []
+    for _ in range(args.repeat):
+        for x in inputs:
+            start = time.perf_counter()
+            fn(x)
+            latencies.append(time.perf_counter() - start)
+    total = sum(latencies)
+    return {
+        "dataset": dataset,
+        "stage": stage,
+        "events": len(raw),
+        "attributes": sum(attributes),
+        "input_mb": sum(map(len, raw)) / 1e6,
+        "seconds": total,
+        "events_per_s": len(latencies) / total,
+        "attributes_per_s": sum(attributes) * args.repeat / total,
+        "p50_ms": _percentile(latencies, 0.50) * 1e3,
+        "p99_ms": _percentile(latencies, 0.99) * 1e3,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+# ---------------------------
+# Suite driver + baseline comparison
+# ---------------------------
+
+def _child_argv(args, dataset: str, stage: str) -> List[str]:
+    argv = [sys.executable, os.path.abspath(__file__), "--run-one", f"{dataset}/{stage}",
+            "--root", args.root, "--repeat", str(args.repeat), "--seed", str(args.seed),
+            "--synthetic-events", str(args.synthetic_events), "--synthetic-attributes", str(args.synthetic_attributes),
+            "--truncate-long", str(args.truncate_long), "--max-context-length", str(args.max_context_length)]
+    if args.tokenizer:
+        argv += ["--tokenizer", args.tokenizer]
+    return argv
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """One line per metric that regressed by more than threshold (a fraction) against the baseline."""
+    regressions = []
+    for key, res in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric, sign in COMPARED.items():
+            old, new = base.get(metric), res.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if sign * change < -threshold:
+                regressions.append(f"{key:<20} {metric:<17} {old:12.2f} -> {new:12.2f} ({change:+.1%})")
+    return regressions
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-stage throughput/latency/memory suite with baseline comparison.")
+    ap.add_argument("--root", default=FROZEN_SNAPSHOT, help="Directory tree with the events (frozen snapshot)")
+    ap.add_argument("--datasets", nargs="+", default=list(DATASETS), choices=DATASETS)
+    ap.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES)
+    ap.add_argument("--repeat", type=int, default=3, help="Passes over each dataset")
+    ap.add_argument("--synthetic-events", type=int, default=20)
+    ap.add_argument("--synthetic-attributes", type=int, default=20000, help="Attributes per synthetic event")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--truncate-long", type=int, default=512)
+    ap.add_argument("--tokenizer", default=None, help="HF tokenizer for the tokens stage (skipped without one)")
+    ap.add_argument("--max-context-length", type=int, default=8192)
+    ap.add_argument("--output", default="bench_suite_results.json", help="Where to write the results JSON")
+    ap.add_argument("--baseline", default=None, help="Results JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.25,
+                    help="Relative change that counts as a regression (default: 0.25)")
+    ap.add_argument("--save-baseline", default=None, help="Also write the results as a new baseline here")
+    ap.add_argument("--run-one", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.run_one:
+        dataset, stage = args.run_one.split("/")
+        print(json.dumps(run_stage(args, dataset, stage)))
+        return
+
+    stages = [s for s in args.stages if s != "tokens" or args.tokenizer]
+    if len(stages) < len(args.stages):
+        print("[INFO] No --tokenizer given: skipping the tokens stage.")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    print(f"{'dataset/stage':<20} {'events/s':>10} {'attrs/s':>12} {'p50 ms':>9} {'p99 ms':>9} {'peak RSS MB':>12}")
+    for dataset in args.datasets:
+        for stage in stages:
+            proc = subprocess.run(_child_argv(args, dataset, stage), capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"[ERR] {dataset}/{stage} failed:\n{proc.stderr.strip()}")
+                continue
+            res = json.loads(proc.stdout.strip().splitlines()[-1])
+            results[f"{dataset}/{stage}"] = res
+            print(f"{dataset + '/' + stage:<20} {res['events_per_s']:10.1f} {res['attributes_per_s']:12.0f} "
+                  f"{res['p50_ms']:9.3f} {res['p99_ms']:9.3f} {res['peak_rss_mb']:12.1f}")
+
+    report = {
+        "meta": {
+            "date": dt.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "json_backend": json_codec.BACKEND,
+            "settings": {k: getattr(args, k) for k in ("repeat", "synthetic_events", "synthetic_attributes", "seed",
+                                                       "truncate_long", "tokenizer", "max_context_length")},
+        },
+        "results": results,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[DONE] Wrote {path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("settings") != report["meta"]["settings"]:
+            print("[WARN] Baseline was recorded with other settings; comparing anyway.")
+        if baseline["meta"].get("platform") != report["meta"]["platform"]:
+            print(f"[WARN] Baseline was recorded on {baseline['meta'].get('platform')}.")
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"\n[ERR] {len(regressions)} regression(s) beyond {args.threshold:.0%} vs {args.baseline}:")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print(f"\n[DONE] No regression beyond {args.threshold:.0%} vs {args.baseline}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Start-up and throughput of token counting with and without scripts/token_daemon.py.
+
+  cold start   fresh interpreter: import, load the tokenizer, count one event
+  warm start   fresh interpreter: connect to a running daemon, count one event
+  throughput   docs/s and tokens/s for the whole snapshot, in-process vs over the socket
+
+The daemon is started on a temporary socket with the token cache disabled, so every
+number is real tokenization work.
+
+Example:
+  python benchmarks/bench_token_daemon.py --tokenizer meta-llama/Meta-Llama-3-8B-Instruct
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts")
+sys.path.insert(0, SCRIPTS)
+
+import json_codec  # noqa: E402
+from mock_feed import FROZEN_SNAPSHOT, collect_events  # noqa: E402
+from token_counting import TokenCounter  # noqa: E402
+from token_daemon import TokenDaemonClient  # noqa: E402
+
+COLD = """
+import sys; sys.path.insert(0, {scripts!r})
+from token_counting import TokenCounter
+print(TokenCounter({tok!r}).count([open({path!r}, encoding="utf-8").read()])[0])
+"""
+
+WARM = """
+import sys; sys.path.insert(0, {scripts!r})
+from token_daemon import TokenDaemonClient
+print(TokenDaemonClient({tok!r}, {sock!r}).count([open({path!r}, encoding="utf-8").read()])[0])
+"""
+
+def _run(code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def _wait_for(sock: str, tokenizer: str, timeout: float = 120.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with TokenDaemonClient(tokenizer, sock) as c:
+                c.request("ping")
+                return
+        except ConnectionError:
+            time.sleep(0.1)
+    raise SystemExit(f"[ERR] token daemon did not come up on {sock}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark cold vs warm token counting start-up and socket throughput.")
+    ap.add_argument("--root", default=FROZEN_SNAPSHOT, help="Directory tree with the events to use")
+    ap.add_argument("--tokenizer", default="meta-llama/Meta-Llama-3-8B-Instruct")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--window", type=int, default=256, help="Documents per request to the daemon")
+    args = ap.parse_args()
+
+    texts = []
+    for _, path in sorted(collect_events(args.root).items()):
+        with open(path, "rb") as f:
+            texts.append(json_codec.dumps(json_codec.loads(f.read())))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sample = os.path.join(tmp, "event.json")
+        with open(sample, "w", encoding="utf-8") as f:
+            f.write(texts[0])
+        sock = os.path.join(tmp, "daemon.sock")
+        daemon = subprocess.Popen(
+            [sys.executable, os.path.join(SCRIPTS, "token_daemon.py"), "--socket", sock,
+             "--no_token_cache", "--preload", args.tokenizer],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_for(sock, args.tokenizer)
+            fmt = dict(scripts=SCRIPTS, tok=args.tokenizer, path=sample, sock=sock)
+            cold = min(_run(COLD.format(**fmt)) for _ in range(args.repeat))
+            warm = min(_run(WARM.format(**fmt)) for _ in range(args.repeat))
+            print(f"cold start (load tokenizer)  {cold:6.2f}s")
+            print(f"warm start (token daemon)    {warm:6.2f}s   x{cold / warm:.1f} faster\n")
+
+            with TokenCounter(args.tokenizer) as counter:
+                start = time.perf_counter()
+                local = counter.count(texts)
+                t_local = time.perf_counter() - start
+            with TokenDaemonClient(args.tokenizer, sock) as client:
+                start = time.perf_counter()
+                remote = []
+                for i in range(0, len(texts), args.window):
+                    remote.extend(client.count(texts[i:i + args.window]))
+                t_remote = time.perf_counter() - start
+                client.request("shutdown")
+            n_tok = sum(local)
+            print(f"in-process   {len(texts) / t_local:8.1f} docs/s  {n_tok / t_local:12,.0f} tokens/s")
+            print(f"over socket  {len(texts) / t_remote:8.1f} docs/s  {n_tok / t_remote:12,.0f} tokens/s   "
+                  f"counts {'identical' if local == remote else 'DIFFER'}")
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark of TokenCounter.within_limit (length bounds + early exit) against full
+token counting, on the frozen snapshot plus a long tail of giant synthetic events
+(--giants documents, each the concatenation of --giant-events snapshot events).
+
+Checks that every keep/drop decision matches count(text) <= limit.
+
+Example:
+  python benchmarks/bench_token_filter.py --tokenizer meta-llama/Meta-Llama-3-8B-Instruct --limits 3576 7240
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import json_codec  # noqa: E402
+from mock_feed import FROZEN_SNAPSHOT, collect_events  # noqa: E402
+from token_counting import TokenCounter  # noqa: E402
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark tiered within-limit checks vs full tokenization.")
+    ap.add_argument("--root", default=FROZEN_SNAPSHOT, help="Directory tree with the events to use")
+    ap.add_argument("--tokenizer", default="meta-llama/Meta-Llama-3-8B-Instruct")
+    ap.add_argument("--limits", type=int, nargs="+", default=[3576, 7240])
+    ap.add_argument("--giants", type=int, default=20, help="Number of giant synthetic events")
+    ap.add_argument("--giant-events", type=int, default=40, help="Snapshot events per giant event")
+    args = ap.parse_args()
+
+    events = []
+    for _, path in sorted(collect_events(args.root).items()):
+        with open(path, "rb") as f:
+            events.append(json_codec.loads(f.read()))
+    texts = [json_codec.dumps(e) for e in events]
+    for g in range(args.giants):
+        chunk = [events[(g * args.giant_events + k) % len(events)] for k in range(args.giant_events)]
+        texts.append(json_codec.dumps({"Event": chunk}))
+    print(f"{len(texts)} documents ({args.giants} giant), {sum(map(len, texts)) / 1e6:.1f} MB\n")
+
+    with TokenCounter(args.tokenizer) as counter:
+        if counter.bounds is None:
+            print("[WARN] Length bounds do not apply to this tokenizer; only full tokenization is used.")
+        else:
+            print(f"max_token_bytes={counter.bounds.max_token_bytes}")
+        start = time.perf_counter()
+        full = counter.count(texts)
+        t_full = time.perf_counter() - start
+        for limit in args.limits:
+            counter.decided = dict.fromkeys(counter.decided, 0)
+            start = time.perf_counter()
+            verdicts = counter.within_limit(texts, limit)
+            t_tiered = time.perf_counter() - start
+            same = verdicts == [n <= limit for n in full]
+            print(f"limit={limit:<6} full {t_full:6.2f}s  tiered {t_tiered:6.2f}s  speedup x{t_full / t_tiered:5.1f}  "
+                  f"decisions {'identical' if same else 'DIFFER'}  {counter.decided}")
+
+if __name__ == "__main__":
+    main()
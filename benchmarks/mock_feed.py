@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for a MISP OSINT feed, used by the download benchmarks.
+
+Serves every *.json event under a directory tree (e.g. the frozen snapshot) flat
+at /<uuid>.json, plus a generated /manifest.json and an HTML index page, from a
+ThreadingHTTPServer on 127.0.0.1. Latency, bandwidth and throttling can be
+injected to mimic a real feed.
+"""
+
+from __future__ import annotations
+
+import email.utils
+import http.server
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FROZEN_SNAPSHOT = os.path.join(REPO_ROOT, "frozen_snapshot", "snapshot_2025-08-20")
+
+def collect_events(root: str) -> Dict[str, str]:
+    """Map <name>.json -> path for every event file below root (manifests excluded)."""
+    files: Dict[str, str] = {}
+    for dirpath, _, names in os.walk(root):
+        for n in names:
+            if n.endswith(".json") and n != "manifest.json":
+                files[n] = os.path.join(dirpath, n)
+    return files
+
+class MockFeedServer:
+    """
+    Context manager running the stand-in feed in a background thread.
+
+    latency       seconds slept before the response headers of every event
+    bytes_per_sec if set, event bodies are trickled out at this rate
+    throttle_rate fraction of event requests answered with 429 + Retry-After
+    """
+
+    def __init__(
+        self,
+        root: str = FROZEN_SNAPSHOT,
+        latency: float = 0.0,
+        bytes_per_sec: Optional[float] = None,
+        throttle_rate: float = 0.0,
+        seed: int = 0,
+        extra_files: Optional[Dict[str, str]] = None,
+    ):
+        self.files = collect_events(root)
+        self.files.update(extra_files or {})
+        self.latency = latency
+        self.bytes_per_sec = bytes_per_sec
+        self.throttle_rate = throttle_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._server: Optional[http.server.ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.manifest = self._build_manifest()
+
+    def _build_manifest(self) -> bytes:
+        manifest = {}
+        for name, path in sorted(self.files.items()):
+            with open(path, "r", encoding="utf-8") as f:
+                ev = json.load(f).get("Event", {})
+            manifest[name[:-len(".json")]] = {
+                "info": ev.get("info"),
+                "date": ev.get("date"),
+                "threat_level_id": ev.get("threat_level_id"),
+                "timestamp": ev.get("timestamp"),
+            }
+        return json.dumps(manifest).encode("utf-8")
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def _handler(self):
+        feed = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None, trickle: bool = False):
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                if trickle and feed.bytes_per_sec:
+                    chunk = max(1, int(feed.bytes_per_sec / 20))
+                    for i in range(0, len(body), chunk):
+                        self.wfile.write(body[i:i + chunk])
+                        time.sleep(chunk / feed.bytes_per_sec)
+                else:
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                name = self.path.lstrip("/").split("?", 1)[0]
+                if name == "":
+                    links = "".join(f'<a href="{n}">{n}</a>\n' for n in sorted(feed.files))
+                    return self._send(200, f"<html><body>\n{links}</body></html>".encode("utf-8"),
+                                      {"Content-Type": "text/html"})
+                if name == "manifest.json":
+                    return self._send(200, feed.manifest, {"Content-Type": "application/json"})
+                path = feed.files.get(name)
+                if path is None:
+                    return self._send(404, b"")
+                with feed._rng_lock:
+                    throttled = feed._rng.random() < feed.throttle_rate
+                if throttled:
+                    return self._send(429, b"", {"Retry-After": "1"})
+                if feed.latency:
+                    time.sleep(feed.latency)
+                st = os.stat(path)
+                etag = f'"{st.st_size:x}-{int(st.st_mtime):x}"'
+                last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+                validators = {"ETag": etag, "Last-Modified": last_modified}
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send(304, b"", validators)
+                with open(path, "rb") as f:
+                    body = f.read()
+                return self._send(200, body, {"Content-Type": "application/json", **validators}, trickle=True)
+
+        return Handler
+
+    def __enter__(self) -> "MockFeedServer":
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Serve a directory of MISP events as a local OSINT feed.")
+    ap.add_argument("--root", default=FROZEN_SNAPSHOT, help="Directory tree containing <uuid>.json events")
+    ap.add_argument("--latency", type=float, default=0.0, help="Per-request latency in seconds")
+    ap.add_argument("--bytes-per-sec", type=float, default=None, help="Trickle event bodies at this rate")
+    ap.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    args = ap.parse_args()
+    with MockFeedServer(args.root, args.latency, args.bytes_per_sec, args.throttle_rate) as srv:
+        print(f"Serving {len(srv.files)} events at {srv.url} (Ctrl-C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
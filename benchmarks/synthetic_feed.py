@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Seeded generator of realistic raw MISP events, for scale and stress tests offline.
+
+The distributions come from a snapshot (the frozen one by default): every synthetic
+event starts from a randomly picked snapshot event, whose threat level, tag count,
+attribute count and objects it scales, and draws its attributes from the snapshot's
+(category, type) frequencies, to_ids rates, comments and values. Hash-like types get
+random digests of the right shape, since snapshot hashes are masked. Events are written
+as raw MISP exports (ids, uuids, Orgc, distribution, ObjectReference, ...) one attribute
+at a time, so an event with millions of attributes needs little memory.
+
+A generated directory is a drop-in raw/: one <uuid>.json per event plus a manifest.jsonl
+with the rows download_events.py would write. It can also be served by mock_feed.py.
+
+Examples:
+  python benchmarks/synthetic_feed.py --out /tmp/synth/raw --events 100000
+  python benchmarks/synthetic_feed.py --out /tmp/giant/raw --events 0 --giant-events 1 --giant-attributes 1000000 \\
+      --object-share 0.5 --object-references 3 --hash-share 0.4 --blob-share 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import collections
+import hashlib
+import itertools
+import json
+import os
+import random
+import string
+import sys
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import json_codec  # noqa: E402
+from mock_feed import FROZEN_SNAPSHOT, collect_events  # noqa: E402
+from packstore import open_writer  # noqa: E402
+from simplify_misp import HASH_TYPES  # noqa: E402
+from utils import parse_event_minimal  # noqa: E402
+
+# Hex digest length of the hash types that have a fixed one
+HEX_LENGTHS = {
+    "md5": 32, "sha1": 40, "sha224": 56, "sha256": 64, "sha384": 96, "sha512": 128,
+    "sha3-224": 56, "sha3-256": 64, "sha3-384": 96, "sha3-512": 128,
+    "imphash": 32, "authentihash": 64, "pehash": 40, "cdhash": 40, "vhash": 40,
+}
+TAG_COLOURS = ("#0088cc", "#004646", "#ffffff", "#22681c", "#b30000", "#ff9900")
+ATTRIBUTE_BATCH = 1000
+VALUES_PER_TYPE = 5000
+DEFAULT_BASE_URL = "https://synthetic.invalid/feed-osint/"
+
+def is_hash_type(attr_type: str) -> bool:
+    return any(tok.strip() in HASH_TYPES for tok in attr_type.lower().split("|"))
+
+class _Choice:
+    """Weighted sampling from a Counter with precomputed cumulative weights."""
+
+    def __init__(self, counts: Dict[Any, int]):
+        self.items = list(counts)
+        self.cum = list(itertools.accumulate(counts[k] for k in self.items))
+
+    def __bool__(self) -> bool:
+        return bool(self.items)
+
+    def __call__(self, rng: random.Random) -> Any:
+        return self.items[bisect.bisect_right(self.cum, rng.random() * self.cum[-1])]
+
+class SnapshotProfile:
+    """Distributions of a snapshot's events that the generator samples from."""
+
+    def __init__(self, root: str = FROZEN_SNAPSHOT):
+        self.events: List[Dict[str, Any]] = []    # per event: threat level, tag/attribute counts, object templates
+        tags: collections.Counter = collections.Counter()
+        pairs: collections.Counter = collections.Counter()
+        to_ids: collections.Counter = collections.Counter()
+        self.values: Dict[str, List[str]] = collections.defaultdict(list)
+        self.comments: List[str] = []
+        n_attributes = n_commented = 0
+        for _, path in sorted(collect_events(root).items()):
+            with open(path, "rb") as f:
+                ev = json_codec.loads(f.read()).get("Event") or {}
+            objects = []
+            for o in ev.get("Object") or []:
+                objects.append((o.get("name", "misc"), o.get("meta-category", "misc"), o.get("description", ""),
+                                [(a.get("category", "Other"), a.get("type", "text")) for a in o.get("Attribute") or []]))
+            self.events.append({
+                "threat_level_id": str(ev.get("threat_level_id", "4")),
+                "tags": len(ev.get("Tag") or []),
+                "attributes": len(ev.get("Attribute") or []),
+                "objects": objects,
+            })
+            tags.update(t["name"] for t in ev.get("Tag") or [] if t.get("name"))
+            attrs = list(ev.get("Attribute") or [])
+            for o in ev.get("Object") or []:
+                attrs.extend(o.get("Attribute") or [])
+            for a in attrs:
+                t, value = a.get("type", "text"), a.get("value")
+                pairs[(a.get("category", "Other"), t)] += 1
+                to_ids[t] += bool(a.get("to_ids"))
+                if isinstance(value, str) and not is_hash_type(t) and len(self.values[t]) < VALUES_PER_TYPE:
+                    self.values[t].append(value)
+                if a.get("comment"):
+                    self.comments.append(a["comment"])
+                    n_commented += 1
+                n_attributes += 1
+        type_counts = collections.Counter(t for _, t in pairs.elements())
+        self.to_ids_rate = {t: to_ids[t] / n for t, n in type_counts.items()}
+        self.comment_rate = n_commented / max(1, n_attributes)
+        self.tags = _Choice(tags)
+        self.hash_pairs = _Choice({p: n for p, n in pairs.items() if is_hash_type(p[1])})
+        self.other_pairs = _Choice({p: n for p, n in pairs.items() if not is_hash_type(p[1])})
+        n_hash = sum(n for p, n in pairs.items() if is_hash_type(p[1]))
+        self.hash_share = n_hash / max(1, n_attributes)
+        self.filenames = self.values.get("filename") or ["sample.exe"]
+
+class SyntheticFeed:
+    """
+    Generates event k of a seeded synthetic feed (the same k always gives the same event).
+
+    size_scale       multiplies the attribute and object counts of the sampled snapshot event
+    object_share     fraction of attributes inside Objects (None: as in the sampled event)
+    object_size      attributes per Object (None: as in the sampled object template)
+    object_references  ObjectReferences from each Object to earlier ones (chains of objects)
+    hash_share       fraction of hash-typed attributes (None: the snapshot's share)
+    blob_share       fraction of attribute values replaced by a base64 blob of blob_bytes
+    """
+
+    def __init__(self, profile: SnapshotProfile, seed: int = 0, size_scale: float = 1.0,
+                 object_share: Optional[float] = None, object_size: Optional[int] = None, object_references: int = 1,
+                 hash_share: Optional[float] = None, blob_share: float = 0.0, blob_bytes: int = 4096):
+        self.profile = profile
+        self.seed = seed
+        self.size_scale = size_scale
+        self.object_share = object_share
+        self.object_size = object_size
+        self.object_references = object_references
+        self.hash_share = profile.hash_share if hash_share is None else hash_share
+        self.blob_share = blob_share
+        self.blob_bytes = blob_bytes
+
+    # --- values ---
+
+    def _value(self, rng: random.Random, attr_type: str) -> str:
+        if rng.random() < self.blob_share:
+            return _b64(rng, self.blob_bytes)
+        t = attr_type.lower()
+        if is_hash_type(t):
+            parts = []
+            for tok in t.split("|"):
+                if tok in HEX_LENGTHS:
+                    parts.append("%0*x" % (HEX_LENGTHS[tok], rng.getrandbits(4 * HEX_LENGTHS[tok])))
+                elif tok == "ssdeep":
+                    parts.append(f"{rng.choice((96, 192, 384, 768, 1536, 3072))}:{_b64(rng, 45)[:60]}:{_b64(rng, 24)[:32]}")
+                elif tok == "tlsh":
+                    parts.append("T1%068X" % rng.getrandbits(272))
+                elif tok == "filename":
+                    parts.append(rng.choice(self.profile.filenames))
+                else:
+                    parts.append("%064x" % rng.getrandbits(256))
+            return "|".join(parts)
+        pool = self.profile.values.get(attr_type)
+        if pool:
+            return rng.choice(pool)
+        if t.startswith("ip-"):
+            return ".".join(str(rng.randrange(1, 255)) for _ in range(4))
+        if t in ("domain", "hostname"):
+            return "".join(rng.choices(string.ascii_lowercase, k=rng.randrange(5, 14))) + rng.choice((".com", ".net", ".org", ".ru", ".io"))
+        return f"{attr_type}-{rng.getrandbits(32):08x}"
+
+    def _attribute(self, rng: random.Random, attr_id: int, event_id: int, ts: int, pair: Optional[Tuple[str, str]] = None,
+                   object_id: int = 0, relation: Optional[str] = None) -> Dict[str, Any]:
+        p = self.profile
+        if pair is None:
+            pair = p.hash_pairs(rng) if p.hash_pairs and rng.random() < self.hash_share else p.other_pairs(rng)
+        category, attr_type = pair
+        return {
+            "id": str(attr_id),
+            "type": attr_type,
+            "category": category,
+            "to_ids": rng.random() < p.to_ids_rate.get(attr_type, 0.0),
+            "uuid": _uuid(rng),
+            "event_id": str(event_id),
+            "distribution": "5",
+            "timestamp": str(ts - rng.randrange(0, 86400)),
+            "comment": rng.choice(p.comments) if p.comments and rng.random() < p.comment_rate else "",
+            "sharing_group_id": "0",
+            "deleted": False,
+            "disable_correlation": False,
+            "object_id": str(object_id),
+            "object_relation": relation,
+            "first_seen": None,
+            "last_seen": None,
+            "value": self._value(rng, attr_type),
+        }
+
+    # --- events ---
+
+    def event(self, k: int, n_attributes: Optional[int] = None) -> Tuple[Dict[str, Any], Iterator[bytes]]:
+        """
+        (Event head, JSON chunks) of event k. The head holds the scalar keys, Orgc and Tag;
+        the chunks are the whole document, Attribute and Object arrays generated lazily.
+        n_attributes overrides the (scaled) attribute count of the sampled snapshot event.
+        """
+        rng = random.Random(f"{self.seed}/{k}")
+        p = self.profile
+        base = rng.choice(p.events)
+        templates = base["objects"]
+        if n_attributes is None:
+            n_attributes = round((base["attributes"] + sum(len(t[3]) for t in templates)) * self.size_scale)
+        if self.object_share is not None:
+            in_objects = round(n_attributes * self.object_share)
+        elif base["attributes"] + sum(len(t[3]) for t in templates):
+            in_objects = round(n_attributes * sum(len(t[3]) for t in templates)
+                               / (base["attributes"] + sum(len(t[3]) for t in templates)))
+        else:
+            in_objects = 0
+        if not any(t[3] for t in templates):
+            templates = [o for e in p.events[:200] for o in e["objects"] if o[3]] or [("misc", "misc", "", [("Other", "text")])]
+        event_id = 100000 + k
+        ts = 1420070400 + rng.randrange(0, 10 * 365 * 86400)
+        date = time.strftime("%Y-%m-%d", time.gmtime(ts - rng.randrange(0, 30 * 86400)))
+        head: Dict[str, Any] = {
+            "id": str(event_id),
+            "orgc_id": "2",
+            "org_id": "1",
+            "date": date,
+            "threat_level_id": base["threat_level_id"],
+            "info": f"Synthetic event {k}: {rng.choice(p.values.get('comment') or ['OSINT report'])}"[:200],
+            "published": True,
+            "uuid": _uuid(rng),
+            "attribute_count": str(n_attributes),
+            "analysis": str(rng.randrange(0, 3)),
+            "timestamp": str(ts),
+            "distribution": "3",
+            "proposal_email_lock": False,
+            "locked": False,
+            "publish_timestamp": str(ts + rng.randrange(0, 3600)),
+            "sharing_group_id": "0",
+            "disable_correlation": False,
+            "extends_uuid": "",
+            "Orgc": {"id": "2", "name": "CIRCL", "uuid": "55f6ea5e-2c60-40e5-964f-47a8950d210f"},
+            "Tag": [{"id": str(rng.randrange(1, 5000)), "name": name, "colour": rng.choice(TAG_COLOURS),
+                     "exportable": True, "hide_tag": False}
+                    for name in dict.fromkeys(p.tags(rng) for _ in range(base["tags"])) if p.tags],
+        }
+        return head, self._chunks(rng, head, event_id, ts, n_attributes - in_objects, in_objects, templates)
+
+    def _chunks(self, rng: random.Random, head: Dict[str, Any], event_id: int, ts: int, n_direct: int, n_in_objects: int,
+                templates: Sequence[Tuple[str, str, str, List[Tuple[str, str]]]]) -> Iterator[bytes]:
+        attr_ids = itertools.count(event_id * 10000)
+        yield b'{"Event":' + json_codec.dumps_bytes(head)[:-1] + b',"Attribute":['
+        for start in range(0, n_direct, ATTRIBUTE_BATCH):
+            batch = [self._attribute(rng, next(attr_ids), event_id, ts) for _ in range(min(ATTRIBUTE_BATCH, n_direct - start))]
+            yield (b"," if start else b"") + b",".join(json_codec.dumps_bytes(a) for a in batch)
+        yield b'],"Object":['
+        object_uuids: List[str] = []
+        placed = 0
+        while placed < n_in_objects:
+            name, meta_category, description, pairs = rng.choice(templates)
+            size = min(self.object_size or max(1, len(pairs)), n_in_objects - placed)
+            object_id = event_id * 100 + len(object_uuids)
+            obj_uuid = _uuid(rng)
+            pairs = pairs or [("Other", "text")]
+            obj = {
+                "id": str(object_id),
+                "name": name,
+                "meta-category": meta_category,
+                "description": description,
+                "template_uuid": str(uuid.uuid5(uuid.NAMESPACE_URL, name)),
+                "template_version": "1",
+                "event_id": str(event_id),
+                "uuid": obj_uuid,
+                "timestamp": str(ts),
+                "distribution": "5",
+                "sharing_group_id": "0",
+                "comment": "",
+                "deleted": False,
+                "ObjectReference": [
+                    {"id": str(rng.randrange(1, 1 << 20)), "uuid": _uuid(rng), "object_id": str(object_id),
+                     "referenced_uuid": ref, "relationship_type": rng.choice(("related-to", "contains", "communicates-with")),
+                     "comment": ""}
+                    for ref in rng.sample(object_uuids, min(self.object_references, len(object_uuids)))
+                ],
+                "Attribute": [
+                    self._attribute(rng, next(attr_ids), event_id, ts, pairs[i % len(pairs)], object_id,
+                                    pairs[i % len(pairs)][1].replace("|", "-"))
+                    for i in range(size)
+                ],
+            }
+            yield (b"," if object_uuids else b"") + json_codec.dumps_bytes(obj)
+            object_uuids.append(obj_uuid)
+            placed += size
+        yield b"]}}"
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+def _b64(rng: random.Random, n_bytes: int) -> str:
+    import base64
+    return base64.b64encode(rng.getrandbits(8 * n_bytes).to_bytes(n_bytes, "little")).decode("ascii")
+
+def write_raw_dir(out_dir: str, feed: SyntheticFeed, n_events: int, giant_events: int = 0,
+                  giant_attributes: int = 1_000_000, pack: bool = False, base_url: str = DEFAULT_BASE_URL,
+                  progress: bool = True) -> Tuple[int, int]:
+    """
+    Write n_events events (then giant_events events of giant_attributes attributes) and a
+    download_events.py-style manifest.jsonl into out_dir (a pack with pack=True).
+    Returns (events, bytes) written.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    tmp = os.path.join(out_dir, ".synthetic.part")
+    total_bytes = 0
+    total = n_events + giant_events
+    with open_writer(out_dir, pack=pack) as out, \
+            open(os.path.join(out_dir, "manifest.jsonl"), "w", encoding="utf-8") as mani:
+        for k in range(total):
+            head, chunks = feed.event(k, giant_attributes if k >= n_events else None)
+            h = hashlib.sha256()
+            size = 0
+            with open(tmp, "wb") as f:
+                for chunk in chunks:
+                    h.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            name = f"{head['uuid']}.json"
+            out.put_file(name, tmp)
+            mani.write(json.dumps({
+                "url": base_url + name,
+                "filename": name,
+                "size": size,
+                "sha256": h.hexdigest(),
+                **parse_event_minimal({"Event": head}),
+                "timestamp": head["timestamp"],
+            }, ensure_ascii=False) + "\n")
+            total_bytes += size
+            if progress and (k + 1) % 1000 == 0:
+                print(f"[INFO] {k + 1}/{total} events, {total_bytes / 1e6:.0f} MB")
+    return total, total_bytes
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate a seeded synthetic raw/ directory of MISP events.")
+    ap.add_argument("--out", required=True, help="Output raw/ directory (or pack with --pack)")
+    ap.add_argument("--root", default=FROZEN_SNAPSHOT, help="Snapshot whose distributions are followed")
+    ap.add_argument("--events", type=int, default=1000, help="Number of regular events")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--size-scale", type=float, default=1.0,
+                    help="Multiply the attribute/object counts of the sampled snapshot events")
+    ap.add_argument("--giant-events", type=int, default=0, help="Additional events of --giant-attributes attributes")
+    ap.add_argument("--giant-attributes", type=int, default=1_000_000)
+    ap.add_argument("--object-share", type=float, default=None,
+                    help="Fraction of attributes inside Objects (default: as in the sampled events)")
+    ap.add_argument("--object-size", type=int, default=None, help="Attributes per Object (default: as in the snapshot)")
+    ap.add_argument("--object-references", type=int, default=1, help="ObjectReferences from each Object to earlier ones")
+    ap.add_argument("--hash-share", type=float, default=None, help="Fraction of hash-typed attributes (default: snapshot's)")
+    ap.add_argument("--blob-share", type=float, default=0.0, help="Fraction of values replaced by long base64 blobs")
+    ap.add_argument("--blob-bytes", type=int, default=4096, help="Decoded size of each blob")
+    ap.add_argument("--base-url", default=DEFAULT_BASE_URL, help="Feed URL recorded in manifest.jsonl")
+    ap.add_argument("--pack", action="store_true", help="Write --out as a pack (see scripts/packstore.py)")
+    args = ap.parse_args()
+
+    profile = SnapshotProfile(args.root)
+    feed = SyntheticFeed(profile, seed=args.seed, size_scale=args.size_scale, object_share=args.object_share,
+                         object_size=args.object_size, object_references=args.object_references,
+                         hash_share=args.hash_share, blob_share=args.blob_share, blob_bytes=args.blob_bytes)
+    print(f"[INFO] Profile of {len(profile.events)} events from {args.root} "
+          f"(hash share {profile.hash_share:.1%}); writing {args.out} ...")
+    start = time.perf_counter()
+    n, size = write_raw_dir(args.out, feed, args.events, args.giant_events, args.giant_attributes, pack=args.pack,
+                            base_url=args.base_url)
+    print(f"[DONE] {n} events, {size / 1e6:.1f} MB in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Columnar attribute table for corpus-scale analytics, built from simplified events.
+
+Every attribute of Event.Attribute and Event.Object[].Attribute becomes one row:
+
+    event        int32  row of the event (its uuid is dictionary "event")
+    label        int8   threat level id 1/2/3 (High/Medium/Low), 0 = unlabeled
+    category     int32  \\
+    type         int32   | codes into the dictionary of the same name, -1 = missing
+    value        int32   |  (non-string values are stored as their JSON text)
+    object_name  int32  /   -1 for attributes directly under the Event
+    to_ids       int8   1/0, -1 = missing
+
+Event tags are stored once per event (event_tag_offsets/event_tag, CSR style, codes
+into dictionary "tag") and joined to attributes through the event column.
+
+On disk (--output-dir) every column is a .npy file and every dictionary a pair of
+.npy files (UTF-8 bytes + offsets), so AttributeTable.load() memory-maps them and a
+query only touches the columns it uses:
+
+    t = AttributeTable.load("snapshot/attributes")
+    mask = t.where(type="ip-dst", label="High")
+    t.count_by("category", mask)                  # [("Network activity", 1234), ...]
+
+With --parquet (needs pyarrow) the same rows are also written to attributes.parquet,
+with dictionary-encoded string columns and the event tags as a list column.
+
+CLI:
+    python scripts/attribute_table.py build --input-dir snapshot/simplified --output-dir snapshot/attributes
+    python scripts/attribute_table.py query snapshot/attributes --where type=ip-dst label=High --count-by category
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from tqdm import tqdm
+
+import json_codec
+from filter_and_split import LABEL_MAP_NUM2STR, get_label_for_file, read_manifest_labels
+from packstore import open_store
+from utils import ensure_dir
+
+TABLE_VERSION = 1
+META_FILE = "meta.json"
+
+ATTRIBUTE_COLUMNS = {
+    "event": "int32",
+    "label": "int8",
+    "category": "int32",
+    "type": "int32",
+    "value": "int32",
+    "object_name": "int32",
+    "to_ids": "int8",
+}
+EVENT_COLUMNS = {
+    "event_label": "int8",
+    "event_tag_offsets": "int64",
+    "event_tag": "int32",
+}
+# String columns are codes into the dictionary of the same name ("tag" is per event).
+DICTIONARIES = ("event", "category", "type", "value", "object_name", "tag")
+
+LABEL_STR2ID = {v.lower(): int(k) for k, v in LABEL_MAP_NUM2STR.items()}
+
+# ---------------------------
+# Build
+# ---------------------------
+
+class _Encoder:
+    """str -> dense code, in first-seen order."""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+
+    def __call__(self, s: Any) -> int:
+        if s is None:
+            return -1
+        if not isinstance(s, str):
+            s = json.dumps(s, ensure_ascii=False, separators=(",", ":"))  # stdlib text, whatever the backend
+        codes = self.codes
+        c = codes.get(s)
+        if c is None:
+            c = codes[s] = len(codes)
+        return c
+
+def _label_id(v: Any) -> int:
+    s = str(v).strip().lower()
+    return int(s) if s in ("0", "1", "2", "3") else LABEL_STR2ID.get(s, -1)
+
+def _to_ids(v: Any) -> int:
+    if v is None:
+        return -1
+    if isinstance(v, str):
+        return 1 if v.strip().lower() in ("1", "true") else 0
+    return int(bool(v))
+
+class AttributeTableBuilder:
+    """Accumulate events into typed arrays; save() writes the table directory."""
+
+    def __init__(self):
+        self.enc = {name: _Encoder() for name in DICTIONARIES}
+        self.cols = {name: array("i" if dtype == "int32" else "b") for name, dtype in ATTRIBUTE_COLUMNS.items()}
+        self.event_label = array("b")
+        self.event_tag_offsets = array("q", [0])
+        self.event_tag = array("i")
+
+    def add_event(self, uuid: str, label: int, event: Dict[str, Any]) -> int:
+        """Append one Event object (the value of "Event"); returns the number of attribute rows added."""
+        enc, cols = self.enc, self.cols
+        row = enc["event"](uuid)
+        self.event_label.append(label)
+        tags = event.get("Tag")
+        if isinstance(tags, list):
+            self.event_tag.extend(enc["tag"](t.get("name")) for t in tags if isinstance(t, dict) and t.get("name"))
+        self.event_tag_offsets.append(len(self.event_tag))
+
+        enc_category, enc_type, enc_value = enc["category"], enc["type"], enc["value"]
+        col_category, col_type, col_value = cols["category"], cols["type"], cols["value"]
+        col_object, col_to_ids = cols["object_name"], cols["to_ids"]
+        groups: List[Tuple[int, Any]] = [(-1, event.get("Attribute"))]
+        objects = event.get("Object")
+        if isinstance(objects, list):
+            groups.extend((enc["object_name"](o.get("name")), o.get("Attribute")) for o in objects if isinstance(o, dict))
+        n = 0
+        for object_code, attrs in groups:
+            if not isinstance(attrs, list):
+                continue
+            for a in attrs:
+                if not isinstance(a, dict):
+                    continue
+                col_category.append(enc_category(a.get("category")))
+                col_type.append(enc_type(a.get("type")))
+                col_value.append(enc_value(a.get("value")))
+                col_object.append(object_code)
+                col_to_ids.append(_to_ids(a.get("to_ids")))
+                n += 1
+        cols["event"].extend(array("i", [row]) * n)
+        cols["label"].extend(array("b", [label]) * n)
+        return n
+
+    def save(self, out_dir: str, source: str = "") -> Dict[str, Any]:
+        ensure_dir(out_dir)
+        for name, dtype in ATTRIBUTE_COLUMNS.items():
+            np.save(os.path.join(out_dir, f"{name}.npy"), np.frombuffer(self.cols[name], dtype=dtype))
+        for name, data in (("event_label", self.event_label), ("event_tag_offsets", self.event_tag_offsets),
+                           ("event_tag", self.event_tag)):
+            np.save(os.path.join(out_dir, f"{name}.npy"), np.frombuffer(data, dtype=EVENT_COLUMNS[name]))
+        for name, enc in self.enc.items():
+            _save_dictionary(out_dir, name, enc.codes)
+        meta = {
+            "version": TABLE_VERSION,
+            "source": source,
+            "rows": len(self.cols["event"]),
+            "events": len(self.event_label),
+            "columns": ATTRIBUTE_COLUMNS,
+            "event_columns": EVENT_COLUMNS,
+            "dictionaries": {name: len(enc.codes) for name, enc in self.enc.items()},
+        }
+        with open(os.path.join(out_dir, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        return meta
+
+def _save_dictionary(out_dir: str, name: str, codes: Dict[str, int]) -> None:
+    encoded = [s.encode("utf-8", errors="surrogatepass") for s in codes]  # dicts keep insertion (= code) order
+    offsets = np.zeros(len(encoded) + 1, dtype="int64")
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    np.save(os.path.join(out_dir, f"dict_{name}.offsets.npy"), offsets)
+    np.save(os.path.join(out_dir, f"dict_{name}.data.npy"), np.frombuffer(b"".join(encoded), dtype="uint8"))
+
+def build_attribute_table(input_dir: str, output_dir: str, parquet: bool = False) -> Dict[str, Any]:
+    """Flatten every simplified event in input_dir (a directory or a pack) into a table at output_dir."""
+    store = open_store(input_dir)
+    idx = read_manifest_labels(os.path.join(input_dir, "manifest.jsonl"))
+    builder = AttributeTableBuilder()
+    skipped = 0
+    for fn in tqdm(store.names(".json"), desc="Flattening events"):
+        try:
+            data = json_codec.loads(store.read(fn))
+        except Exception as e:
+            print(f"\n[WARN] Skipping {fn}: {e}")
+            skipped += 1
+            continue
+        event = data.get("Event") if isinstance(data, dict) else None
+        if not isinstance(event, dict):
+            skipped += 1
+            continue
+        lab = get_label_for_file(fn, idx, data)
+        builder.add_event(os.path.splitext(fn)[0], int(lab[0]) if lab else 0, event)
+    meta = builder.save(output_dir, source=os.path.abspath(input_dir))
+    meta["skipped"] = skipped
+    if parquet:
+        write_parquet(AttributeTable.load(output_dir), os.path.join(output_dir, "attributes.parquet"))
+    return meta
+
+def write_parquet(table: "AttributeTable", path: str) -> None:
+    """attributes.parquet: one row per attribute, strings dictionary-encoded, event tags as a list column."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("[ERR] --parquet needs pyarrow (pip install pyarrow)")
+
+    def dict_column(codes: np.ndarray, name: str):
+        return pa.DictionaryArray.from_arrays(
+            pa.array(codes, mask=codes < 0), pa.array(table.dicts[name].tolist(), type=pa.string()))
+
+    event_tags = pa.ListArray.from_arrays(
+        pa.array(table.event_tag_offsets, type=pa.int32()),
+        pa.DictionaryArray.from_arrays(pa.array(table.event_tag), pa.array(table.dicts["tag"].tolist(), type=pa.string())),
+    )
+    label_names = np.array([""] + [LABEL_MAP_NUM2STR[str(i)] for i in (1, 2, 3)], dtype=object)
+    pq.write_table(pa.table({
+        "event_uuid": dict_column(table.event, "event"),
+        "label": pa.array(label_names[table.label], mask=table.label == 0),
+        "category": dict_column(table.category, "category"),
+        "type": dict_column(table.type, "type"),
+        "value": dict_column(table.value, "value"),
+        "to_ids": pa.array(table.to_ids == 1, mask=table.to_ids < 0),
+        "object_name": dict_column(table.object_name, "object_name"),
+        "tags": event_tags.take(pa.array(table.event)),
+    }), path)
+
+# ---------------------------
+# Load + query
+# ---------------------------
+
+class StringDictionary:
+    """code -> string over the (memory-mapped) UTF-8 blob; string -> code on demand."""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+        self._codes: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, code: int) -> Optional[str]:
+        if code < 0:
+            return None
+        start, end = self.offsets[code], self.offsets[code + 1]
+        return self.data[start:end].tobytes().decode("utf-8", errors="surrogatepass")
+
+    def tolist(self) -> List[str]:
+        blob = self.data.tobytes()
+        offs = self.offsets.tolist()
+        return [blob[offs[i]:offs[i + 1]].decode("utf-8", errors="surrogatepass") for i in range(len(self))]
+
+    def code(self, s: str) -> int:
+        """Code of s, or -1 if it never occurs (the reverse map is built on first use)."""
+        if self._codes is None:
+            self._codes = {v: i for i, v in enumerate(self.tolist())}
+        return self._codes.get(s, -1)
+
+    def codes_where(self, pred) -> np.ndarray:
+        """Codes of every string for which pred(string) is true (e.g. a prefix test)."""
+        return np.array([i for i, v in enumerate(self.tolist()) if pred(v)], dtype="int32")
+
+class AttributeTable:
+    def __init__(self, path: str, columns: Dict[str, np.ndarray], dicts: Dict[str, StringDictionary], meta: Dict[str, Any]):
+        self.path = path
+        self.columns = columns
+        self.dicts = dicts
+        self.meta = meta
+        for name, col in columns.items():
+            setattr(self, name, col)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "AttributeTable":
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != TABLE_VERSION:
+            raise ValueError(f"{path}: attribute table version {meta.get('version')}, expected {TABLE_VERSION}")
+        mode = "r" if mmap else None
+        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+                   for name in [*meta["columns"], *meta["event_columns"]]}
+        dicts = {name: StringDictionary(np.load(os.path.join(path, f"dict_{name}.offsets.npy"), mmap_mode=mode),
+                                        np.load(os.path.join(path, f"dict_{name}.data.npy"), mmap_mode=mode))
+                 for name in meta["dictionaries"]}
+        return cls(path, columns, dicts, meta)
+
+    def __len__(self) -> int:
+        return len(self.columns["event"])
+
+    def _codes(self, column: str, wanted) -> np.ndarray:
+        """Codes of the wanted values in `column`; values that never occur get -2, which matches nothing."""
+        values = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+        if column == "label":
+            codes = [_label_id(v) for v in values]
+        elif column == "to_ids":
+            codes = [_to_ids(v) for v in values]
+        else:
+            codes = [self.dicts[column].code(v) for v in values]
+        return np.array([c if c != -1 else -2 for c in codes])
+
+    def event_mask_with_tag(self, tags) -> np.ndarray:
+        """Per event: has any of `tags`."""
+        hits = np.flatnonzero(np.isin(self.columns["event_tag"], self._codes("tag", tags)))
+        mask = np.zeros(len(self.columns["event_label"]), dtype=bool)
+        mask[np.searchsorted(self.columns["event_tag_offsets"], hits, side="right") - 1] = True
+        return mask
+
+    def where(self, mask: Optional[np.ndarray] = None, **conditions) -> np.ndarray:
+        """
+        Boolean row mask for column=value (or a list of accepted values) conditions, ANDed.
+        label takes 1/2/3 or High/Medium/Low, to_ids True/False, tag an event tag name.
+        """
+        out = np.ones(len(self), dtype=bool) if mask is None else mask.copy()
+        for column, wanted in conditions.items():
+            if column == "tag":
+                out &= self.event_mask_with_tag(wanted)[self.columns["event"]]
+                continue
+            codes = self._codes(column, wanted)
+            col = self.columns[column]
+            out &= (col == codes[0]) if len(codes) == 1 else np.isin(col, codes)
+        return out
+
+    def count_by(self, column: str, mask: Optional[np.ndarray] = None, top: Optional[int] = None) -> List[Tuple[Any, int]]:
+        """(value, rows) per distinct value of column among the masked rows, most frequent first."""
+        col = self.columns[column] if mask is None else self.columns[column][mask]
+        if column == "tag":
+            raise ValueError("count_by('tag') is per event: use count_tags()")
+        if column == "label":
+            counts = np.bincount(col, minlength=4)
+            pairs = [(LABEL_MAP_NUM2STR.get(str(i)), int(counts[i])) for i in np.flatnonzero(counts)]
+        elif column == "to_ids":
+            counts = np.bincount(col + 1, minlength=3)
+            pairs = [((None, False, True)[i], int(counts[i])) for i in np.flatnonzero(counts)]
+        else:
+            d = self.dicts[column]
+            counts = np.bincount(col + 1, minlength=len(d) + 1)  # +1: slot 0 counts missing values
+            pairs = [(d[i - 1], int(counts[i])) for i in np.flatnonzero(counts)]
+        pairs.sort(key=lambda p: -p[1])
+        return pairs[:top] if top else pairs
+
+    def count_tags(self, mask: Optional[np.ndarray] = None, top: Optional[int] = None) -> List[Tuple[str, int]]:
+        """(tag, events) over the events of the masked rows."""
+        events = np.ones(len(self.columns["event_label"]), dtype=bool)
+        if mask is not None:
+            events[:] = False
+            events[self.columns["event"][mask]] = True
+        offsets = self.columns["event_tag_offsets"]
+        per_tag_event = np.repeat(np.arange(len(events)), np.diff(offsets))
+        counts = np.bincount(self.columns["event_tag"][events[per_tag_event]], minlength=len(self.dicts["tag"]))
+        pairs = [(self.dicts["tag"][i], int(counts[i])) for i in np.flatnonzero(counts)]
+        pairs.sort(key=lambda p: -p[1])
+        return pairs[:top] if top else pairs
+
+# ---------------------------
+# CLI
+# ---------------------------
+
+def _parse_where(items: Iterable[str]) -> Dict[str, Any]:
+    conditions: Dict[str, Any] = {}
+    for item in items:
+        column, sep, value = item.partition("=")
+        if not sep:
+            raise SystemExit(f"[ERR] --where expects column=value, got {item!r}")
+        conditions.setdefault(column, []).append(value)
+    return conditions
+
+def main():
+    ap = argparse.ArgumentParser(description="Flatten simplified events into a columnar attribute table, or query one.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="simplified/ (directory or pack) -> attribute table")
+    b.add_argument("--input-dir", required=True, help="Directory (or pack) with simplified JSONs and manifest.jsonl")
+    b.add_argument("--output-dir", required=True, help="Directory for the .npy columns and dictionaries")
+    b.add_argument("--parquet", action="store_true", help="Also write attributes.parquet (needs pyarrow)")
+    q = sub.add_parser("query", help="Filter and aggregate an attribute table")
+    q.add_argument("table", help="Directory written by build")
+    q.add_argument("--where", nargs="*", default=[], metavar="COLUMN=VALUE",
+                   help="Conditions, ANDed (repeat a column to accept several values); columns: "
+                        "label, category, type, value, object_name, to_ids, tag")
+    q.add_argument("--count-by", default="type", help="Column to aggregate, or 'tag' (default: type)")
+    q.add_argument("--top", type=int, default=20)
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        start = time.perf_counter()
+        meta = build_attribute_table(args.input_dir, args.output_dir, parquet=args.parquet)
+        print(f"[INFO] {meta['rows']} attributes from {meta['events']} events "
+              f"({meta['skipped']} files skipped) in {time.perf_counter() - start:.1f}s")
+        print("[INFO] dictionary sizes: " + ", ".join(f"{k}={v}" for k, v in meta["dictionaries"].items()))
+        print(f"[DONE] Attribute table written to '{args.output_dir}'")
+        return
+
+    start = time.perf_counter()
+    table = AttributeTable.load(args.table)
+    mask = table.where(**_parse_where(args.where))
+    if args.count_by == "tag":
+        pairs = table.count_tags(mask, top=args.top)
+    else:
+        pairs = table.count_by(args.count_by, mask, top=args.top)
+    elapsed = time.perf_counter() - start
+    print(f"{int(mask.sum())} of {len(table)} attributes match ({elapsed * 1e3:.1f} ms)")
+    for value, count in pairs:
+        print(f"{count:>10}  {value}")
+
+if __name__ == "__main__":
+    main()
@@ -2,20 +2,33 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 import concurrent.futures as fut
+import contextlib
 import datetime as dt
+import email.utils
+import hashlib
 import json
 import os
+import random
+import threading
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from urllib.parse import urljoin, urlparse
 
 import requests
 from bs4 import BeautifulSoup
-from common import ensure_dir, sha256_bytes, parse_event_minimal
+from requests.adapters import HTTPAdapter
+
+import json_codec
+from metrics import add_metrics_arguments, metrics_from_args
+from packstore import DirWriter, open_store, open_writer
+from utils import scan_event_minimal, META_PREFIX_BYTES
 
 INDEX_URL_CIRCL = "https://www.circl.lu/doc/misp/feed-osint/"
 INDEX_URL_BOTVRIJ = "https://www.botvrij.eu/data/feed-osint/"
+FEED_MANIFEST = "manifest.json"
+CHUNK_SIZE = 1 << 16
 
 def today_stamp() -> str:
     return dt.date.today().isoformat()
@@ -29,39 +42,405 @@ def list_json_urls(target_urls) -> List[str]:
         soup = BeautifulSoup(r.text, "html.parser")
         for a in soup.find_all("a"):
             href = a.get("href") or ""
-            if href.lower().endswith(".json"):
+            if href.lower().endswith(".json") and os.path.basename(href) != FEED_MANIFEST:
                 urls.append(urljoin(index_url, href))
     return sorted(set(urls))
 
-def download_one(url: str, outdir_raw: str, timeout: int = 120, retries: int = 3) -> Dict[str, Any]:
-    """Download a single JSON and write to disk (into outdir_raw). Returns manifest row."""
+def fetch_feed_manifest(index_url: str, timeout: int = 120) -> List[Dict[str, Any]]:
+    """
+    Fetch a MISP feed's manifest.json ({uuid: {timestamp, ...}}) and return one
+    entry {url, filename, uuid, timestamp} per event listed.
+    """
+    r = requests.get(urljoin(index_url, FEED_MANIFEST), timeout=timeout)
+    r.raise_for_status()
+    manifest = json_codec.loads(r.content)
+    if not isinstance(manifest, dict):
+        raise ValueError(f"unexpected {FEED_MANIFEST} payload: {type(manifest).__name__}")
+    entries: List[Dict[str, Any]] = []
+    for uuid, meta in manifest.items():
+        name = f"{uuid}.json"
+        ts = meta.get("timestamp") if isinstance(meta, dict) else None
+        entries.append({
+            "url": urljoin(index_url, name),
+            "filename": name,
+            "uuid": uuid,
+            "timestamp": None if ts is None else str(ts),
+        })
+    return entries
+
+def list_feed_events(target_urls) -> List[Dict[str, Any]]:
+    """
+    List events of all feeds, preferring each feed's manifest.json (fetched concurrently).
+    Feeds without a usable manifest fall back to scraping the HTML index (no timestamps).
+    """
+    by_url: Dict[str, Dict[str, Any]] = {}
+    with fut.ThreadPoolExecutor(max_workers=len(target_urls)) as ex:
+        futures = {ex.submit(fetch_feed_manifest, u): u for u in target_urls}
+        for f in fut.as_completed(futures):
+            index_url = futures[f]
+            try:
+                entries = f.result()
+                print(f"[INFO] {index_url}{FEED_MANIFEST}: {len(entries)} events")
+            except Exception as e:
+                print(f"[WARN] No usable {FEED_MANIFEST} at {index_url} ({e}); scraping index page instead.")
+                entries = [
+                    {"url": u, "filename": os.path.basename(urlparse(u).path), "timestamp": None}
+                    for u in list_json_urls([index_url])
+                ]
+            for entry in entries:
+                by_url[entry["url"]] = entry
+    return [by_url[u] for u in sorted(by_url)]
+
+def is_unchanged(entry: Dict[str, Any], previous: Optional[Tuple[Dict[str, Any], str]]) -> bool:
+    """An event is unchanged when the feed manifest timestamp matches the one we recorded."""
+    if previous is None or entry.get("timestamp") is None:
+        return False
+    return str(previous[0].get("timestamp")) == entry["timestamp"]
+
+def load_manifest(path: str) -> Dict[str, Dict[str, Any]]:
+    """Read a raw manifest.jsonl and return url->row for successfully downloaded events."""
+    idx: Dict[str, Dict[str, Any]] = {}
+    if not os.path.exists(path):
+        return idx
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                r = json.loads(line)
+            except Exception:
+                continue
+            if "error" in r or not r.get("url") or not r.get("sha256"):
+                continue
+            idx[r["url"]] = r
+    return idx
+
+def load_previous_state(raw_dirs: List[str]) -> Dict[str, Tuple[Dict[str, Any], Any]]:
+    """
+    Merge the manifests of previous raw/ directories (or packs) into url->(row, store).
+    Later directories win; rows whose file is missing or has the wrong size are ignored.
+    """
+    state: Dict[str, Tuple[Dict[str, Any], Any]] = {}
+    for raw_dir in raw_dirs:
+        if not os.path.isdir(raw_dir):
+            continue
+        store = open_store(raw_dir)
+        for url, row in load_manifest(os.path.join(raw_dir, "manifest.jsonl")).items():
+            name = row.get("filename", "")
+            if name and store.exists(name) and store.size(name) == row.get("size"):
+                state[url] = (row, store)
+    return state
+
+def append_manifest_row(f, row: Dict[str, Any]) -> None:
+    """Append one row and flush so a crash loses at most the in-flight downloads."""
+    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    f.flush()
+
+def compact_manifest(path: str, urls: Optional[List[str]] = None) -> int:
+    """
+    Rewrite an append-only manifest: one row per url (the last one appended wins),
+    in `urls` order (rows for urls not listed are dropped) or sorted by url.
+    Atomic via rename; returns the number of rows kept.
+    """
+    latest: Dict[str, Dict[str, Any]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                r = json.loads(line)
+            except Exception:
+                continue  # torn last line of an interrupted run
+            if r.get("url"):
+                latest[r["url"]] = r
+    order = [u for u in urls if u in latest] if urls is not None else sorted(latest)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for u in order:
+            f.write(json.dumps(latest[u], ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+    return len(order)
+
+def _conditional_headers(prev: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    headers: Dict[str, str] = {}
+    if prev:
+        if prev.get("etag"):
+            headers["If-None-Match"] = prev["etag"]
+        if prev.get("last_modified"):
+            headers["If-Modified-Since"] = prev["last_modified"]
+    return headers
+
+def _unchanged_by_headers(prev: Optional[Dict[str, Any]], headers) -> bool:
+    """For servers that ignore conditional requests: same ETag, or same Last-Modified + Content-Length."""
+    if not prev:
+        return False
+    etag = headers.get("ETag")
+    if etag and prev.get("etag"):
+        return etag == prev["etag"]
+    last_modified = headers.get("Last-Modified")
+    length = headers.get("Content-Length")
+    return bool(
+        last_modified and length and last_modified == prev.get("last_modified")
+        and length.isdigit() and int(length) == prev.get("size")
+    )
+
+def _reuse_previous(prev: Dict[str, Any], prev_store, out, headers=None) -> Dict[str, Any]:
+    """Place the previous copy (hard link, or bytes for packs) and carry its manifest row over."""
+    out.copy_from(prev_store, prev["filename"])
+    row = dict(prev)
+    if headers is not None:
+        if headers.get("ETag"):
+            row["etag"] = headers["ETag"]
+        if headers.get("Last-Modified"):
+            row["last_modified"] = headers["Last-Modified"]
+    row["unchanged"] = True
+    return row
+
+# ---------------------------
+# Pooled HTTP client + adaptive per-host concurrency
+# ---------------------------
+
+RETRY_STATUSES = {429, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+POOL_HOSTS = 4  # hosts whose idle connection each worker session keeps
+
+class AimdLimiter:
+    """
+    Additive-increase / multiplicative-decrease cap on in-flight requests to one host.
+    Successful, fast responses grow the limit by ~1 per window of `limit` requests;
+    errors, throttling (429/503) or a latency spike cut it by `backoff`.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int = 1,
+        maximum: int = 64,
+        backoff: float = 0.5,
+        latency_tolerance: float = 3.0,
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.baseline: Optional[float] = None  # smoothed "healthy" time-to-headers
+        self.stats = {"ok": 0, "errors": 0, "throttled": 0, "decreases": 0}
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency: Optional[float], outcome: str) -> None:
+        """outcome is one of 'ok', 'throttled', 'error'."""
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == "ok":
+                self.stats["ok"] += 1
+                congested = (
+                    latency is not None
+                    and self.baseline is not None
+                    and latency > self.latency_tolerance * self.baseline
+                )
+                if latency is not None:
+                    self.baseline = latency if self.baseline is None else 0.9 * self.baseline + 0.1 * latency
+                if congested:
+                    self._decrease()
+                else:
+                    self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            else:
+                self.stats["throttled" if outcome == "throttled" else "errors"] += 1
+                self._decrease()
+            self._cond.notify_all()
+
+    def _decrease(self) -> None:
+        # At most one cut per window so a burst of failures from the same window counts once
+        now = time.monotonic()
+        window = self.baseline or 0.0
+        if now - self._last_decrease < window:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.minimum), self.limit * self.backoff)
+        self.stats["decreases"] += 1
+
+class HttpClient:
+    """
+    One keep-alive requests.Session per worker thread plus one AimdLimiter per host. A
+    thread makes one request at a time, so each session holds at most one idle connection
+    per host (kept for up to POOL_HOSTS hosts) and reuses it for that thread's next
+    download; max_workers only sets the default per-host cap.
+    """
+
+    def __init__(self, max_workers: int = 16, max_per_host: Optional[int] = None, min_per_host: int = 1):
+        self.max_per_host = max_per_host or max(1, max_workers)
+        self.min_per_host = min_per_host
+        self._local = threading.local()
+        self._limiters: Dict[str, AimdLimiter] = {}
+        self._lock = threading.Lock()
+
+    def session(self) -> requests.Session:
+        sess = getattr(self._local, "session", None)
+        if sess is None:
+            sess = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_HOSTS, max_retries=0)
+            sess.mount("http://", adapter)
+            sess.mount("https://", adapter)
+            self._local.session = sess
+        return sess
+
+    def limiter(self, url: str) -> AimdLimiter:
+        host = urlparse(url).netloc
+        with self._lock:
+            lim = self._limiters.get(host)
+            if lim is None:
+                lim = AimdLimiter(
+                    initial=max(self.min_per_host, self.max_per_host // 2),
+                    minimum=self.min_per_host,
+                    maximum=self.max_per_host,
+                )
+                self._limiters[host] = lim
+            return lim
+
+    @contextlib.contextmanager
+    def get(self, url: str, **kwargs) -> Iterator[requests.Response]:
+        """Streaming GET that holds a per-host slot until the body has been consumed."""
+        lim = self.limiter(url)
+        lim.acquire()
+        start = time.monotonic()
+        latency: Optional[float] = None
+        outcome = "error"
+        try:
+            with self.session().get(url, stream=True, **kwargs) as r:
+                latency = time.monotonic() - start  # time to headers, independent of body size
+                if r.status_code in THROTTLE_STATUSES:
+                    outcome = "throttled"
+                elif r.status_code < 500:
+                    outcome = "ok"
+                yield r
+        finally:
+            lim.release(latency, outcome)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                host: {"limit": round(lim.limit, 2), **lim.stats}
+                for host, lim in sorted(self._limiters.items())
+            }
+
+def retry_delay(attempt: int, response: Optional[requests.Response] = None, cap: float = 60.0) -> float:
+    """Honour Retry-After on 429/503; otherwise exponential backoff with full jitter."""
+    if response is not None and response.status_code in THROTTLE_STATUSES:
+        ra = (response.headers.get("Retry-After") or "").strip()
+        if ra.isdigit():
+            return min(cap, float(ra))
+        if ra:
+            try:
+                when = email.utils.parsedate_to_datetime(ra)
+                return min(cap, max(0.0, when.timestamp() - time.time()))
+            except (TypeError, ValueError):
+                pass
+    return random.uniform(0, min(cap, 1.0 * 2 ** (attempt - 1)))
+
+_default_client: Optional[HttpClient] = None
+
+def default_client() -> HttpClient:
+    global _default_client
+    if _default_client is None:
+        _default_client = HttpClient()
+    return _default_client
+
+def interleave_by_host(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Round-robin entries across hosts so workers are not all parked on one host's limiter."""
+    by_host: Dict[str, List[Dict[str, Any]]] = {}
+    for e in entries:
+        by_host.setdefault(urlparse(e["url"]).netloc, []).append(e)
+    out: List[Dict[str, Any]] = []
+    queues = list(by_host.values())
+    for i in range(max((len(q) for q in queues), default=0)):
+        out.extend(q[i] for q in queues if i < len(q))
+    return out
+
+def _stream_to_file(r: requests.Response, path: str) -> Tuple[int, str, bytes]:
+    """
+    Write the body to `path` chunk by chunk, hashing on the fly.
+    Returns (size, sha256, prefix) where prefix is the first META_PREFIX_BYTES for metadata.
+    """
+    h = hashlib.sha256()
+    size = 0
+    prefix = bytearray()
+    with open(path, "wb") as f:
+        for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+            h.update(chunk)
+            f.write(chunk)
+            size += len(chunk)
+            if len(prefix) < META_PREFIX_BYTES:
+                prefix += chunk[:META_PREFIX_BYTES - len(prefix)]
+    return size, h.hexdigest(), bytes(prefix)
+
+def download_one(
+    url: str,
+    outdir_raw: str,
+    timeout: int = 120,
+    retries: int = 3,
+    previous: Optional[Tuple[Dict[str, Any], Any]] = None,
+    client: Optional[HttpClient] = None,
+    writer=None,
+) -> Dict[str, Any]:
+    """
+    Download a single JSON and write to disk (into outdir_raw). Returns manifest row.
+    If `previous` (row, store) is given, a conditional request is sent and an unchanged
+    event is hard-linked from the previous snapshot instead of being rewritten.
+    `writer` (default: a DirWriter on outdir_raw) stores the finished file, e.g. in a pack.
+    """
+    client = client or default_client()
+    out = writer or DirWriter(outdir_raw)
     name = os.path.basename(urlparse(url).path)
-    dest = os.path.join(outdir_raw, name)
+    tmp = f"{os.path.join(outdir_raw, name)}.{os.getpid()}.{threading.get_ident()}.part"
+    prev, prev_store = previous if previous else (None, None)
     last_exc: Optional[Exception] = None
     for attempt in range(1, retries + 1):
+        failed: Optional[requests.Response] = None
         try:
-            r = requests.get(url, timeout=timeout)
-            r.raise_for_status()
-            b = r.content
-            with open(dest, "wb") as f:
-                f.write(b)
-            meta: Dict[str, Any] = {}
-            try:
-                raw = json.loads(b.decode("utf-8", errors="replace"))
-                meta = parse_event_minimal(raw)  # NOTE: respects 'publish_timestamp' (no published_timestamp)
-            except Exception:
-                pass
-            return {
+            with client.get(url, timeout=timeout, headers=_conditional_headers(prev)) as r:
+                if r.status_code in RETRY_STATUSES:
+                    failed = r
+                if prev and r.status_code == 304:
+                    return _reuse_previous(prev, prev_store, out, r.headers)
+                r.raise_for_status()
+                if _unchanged_by_headers(prev, r.headers):
+                    return _reuse_previous(prev, prev_store, out, r.headers)
+                size, digest, prefix = _stream_to_file(r, tmp)
+            if prev and digest == prev.get("sha256"):
+                os.remove(tmp)
+                return _reuse_previous(prev, prev_store, out, r.headers)
+            out.put_file(name, tmp)
+            row: Dict[str, Any] = {
                 "url": url,
                 "filename": name,
-                "size": len(b),
-                "sha256": sha256_bytes(b),
-                **meta,
+                "size": size,
+                "sha256": digest,
+                # NOTE: respects 'publish_timestamp' (no published_timestamp)
+                **scan_event_minimal(prefix),
             }
+            # Validators for the next conditional sync
+            if r.headers.get("ETag"):
+                row["etag"] = r.headers["ETag"]
+            if r.headers.get("Last-Modified"):
+                row["last_modified"] = r.headers["Last-Modified"]
+            return row
         except Exception as e:
             last_exc = e
+            if os.path.exists(tmp):
+                os.remove(tmp)
             if attempt < retries:
-                time.sleep(1.5 * attempt)
+                time.sleep(retry_delay(attempt, failed))
             else:
                 return {
                     "url": url,
@@ -71,36 +450,224 @@ def download_one(url: str, outdir_raw: str, timeout: int = 120, retries: int = 3
     # should not reach
     return {"url": url, "filename": name, "error": "unknown"}
 
+# ---------------------------
+# Download engines
+# ---------------------------
+
+ENGINES = ("thread", "asyncio")
+
+def run_thread_engine(
+    entries: List[Dict[str, Any]],
+    worker: Callable[[Dict[str, Any]], Dict[str, Any]],
+    max_workers: int,
+    on_result: Callable[[Dict[str, Any]], None],
+) -> None:
+    """
+    ThreadPoolExecutor: results are reported in submission order. On an interruption
+    queued work is dropped, in-flight downloads finish, and every download that completed
+    but was not reported yet (e.g. behind a slow one) is reported before re-raising.
+    """
+    ex = fut.ThreadPoolExecutor(max_workers=max_workers)
+    futures = [ex.submit(worker, e) for e in entries]
+    reported = 0
+    try:
+        for f in futures:
+            res = f.result()
+            reported += 1
+            on_result(res)
+    finally:
+        ex.shutdown(wait=True, cancel_futures=True)
+        for f in futures[reported:]:
+            if f.done() and not f.cancelled() and f.exception() is None:
+                on_result(f.result())
+
+async def _run_asyncio(
+    entries: List[Dict[str, Any]],
+    worker: Callable[[Dict[str, Any]], Dict[str, Any]],
+    max_workers: int,
+    max_per_host: int,
+    on_result: Callable[[Dict[str, Any]], None],
+) -> None:
+    loop = asyncio.get_running_loop()
+    executor = fut.ThreadPoolExecutor(max_workers=max_workers)
+    global_sem = asyncio.Semaphore(max_workers)
+    host_sems: Dict[str, asyncio.Semaphore] = {}
+    running: List[asyncio.Future] = []
+
+    async def one(entry: Dict[str, Any]) -> Dict[str, Any]:
+        host_sem = host_sems.setdefault(urlparse(entry["url"]).netloc, asyncio.Semaphore(max_per_host))
+        async with global_sem, host_sem:
+            job = loop.run_in_executor(executor, worker, entry)
+            running.append(job)
+            # shield: a cancelled task must not orphan a download that is already on the wire
+            return await asyncio.shield(job)
+
+    tasks = [asyncio.create_task(one(e)) for e in entries]
+    reported = set()
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            res = await next_done
+            reported.add(id(res))
+            on_result(res)
+    finally:
+        # Cancellation-safe shutdown: drop queued work, let in-flight downloads finish and report them
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for res in await asyncio.gather(*running, return_exceptions=True):
+            if isinstance(res, dict) and id(res) not in reported:
+                on_result(res)
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def run_asyncio_engine(
+    entries: List[Dict[str, Any]],
+    worker: Callable[[Dict[str, Any]], Dict[str, Any]],
+    max_workers: int,
+    on_result: Callable[[Dict[str, Any]], None],
+    max_per_host: Optional[int] = None,
+) -> None:
+    """
+    asyncio scheduler with a global and per-host bounded semaphore; results are
+    reported in completion order so one slow event never stalls progress.
+    The blocking transfer itself runs in a worker thread (requests stays the HTTP stack).
+    """
+    asyncio.run(_run_asyncio(entries, worker, max_workers, max_per_host or max_workers, on_result))
+
+def run_engine(engine: str, entries, worker, max_workers: int, on_result, max_per_host: Optional[int] = None) -> None:
+    if engine == "asyncio":
+        run_asyncio_engine(entries, worker, max_workers, on_result, max_per_host=max_per_host)
+    elif engine == "thread":
+        run_thread_engine(entries, worker, max_workers, on_result)
+    else:
+        raise ValueError(f"unknown engine: {engine}")
+
 def main():
     ap = argparse.ArgumentParser(description="Download CIRCL MISP OSINT feed snapshot.")
     ap.add_argument("--out", default=f"snapshots_both/{today_stamp()}", help="Output snapshot directory (will create <out>/raw)")
     ap.add_argument("--max-workers", type=int, default=16, help="Parallel download workers")
+    ap.add_argument(
+        "--max-per-host",
+        type=int,
+        default=None,
+        help="Upper bound for the adaptive per-host in-flight limit (default: --max-workers)",
+    )
+    ap.add_argument(
+        "--index-url",
+        action="append",
+        default=None,
+        help="Feed index URL (repeatable). Defaults to the CIRCL and botvrij OSINT feeds.",
+    )
+    ap.add_argument(
+        "--sync-from",
+        default=None,
+        help="Previous snapshot directory (or its raw/). Unchanged events are hard-linked instead of re-downloaded.",
+    )
+    ap.add_argument(
+        "--pack",
+        action="store_true",
+        help="Write <out>/raw as a pack (shards + offset index, see packstore.py) instead of one file per event",
+    )
+    ap.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="thread",
+        help="thread: ThreadPoolExecutor, in-order reporting; asyncio: semaphores, completion-order reporting",
+    )
+    add_metrics_arguments(ap)
     args = ap.parse_args()
+    metrics = metrics_from_args("download", args)
 
-    # Create snapshot layout: <out>/raw
+    # Create snapshot layout: <out>/raw (an existing pack stays a pack; its shards are re-indexed first)
     out_raw = os.path.join(args.out, "raw")
-    ensure_dir(out_raw)
+    writer = open_writer(out_raw, pack=args.pack or None, append=True)
 
-    target_urls = [INDEX_URL_CIRCL, INDEX_URL_BOTVRIJ]
+    # Previous state: --sync-from first, then whatever an earlier run left in <out>/raw
+    prev_dirs: List[str] = []
+    if args.sync_from:
+        sync_raw = args.sync_from
+        if os.path.isdir(os.path.join(sync_raw, "raw")):
+            sync_raw = os.path.join(sync_raw, "raw")
+        prev_dirs.append(sync_raw)
+    prev_dirs.append(out_raw)
+    previous = load_previous_state(prev_dirs)
+    if previous:
+        print(f"[INFO] Sync: {len(previous)} events known from previous manifests.")
 
-    print(f"[INFO] Listing JSONs...")
-    urls = list_json_urls(target_urls)
-    print(f"[INFO] Found {len(urls)} files. Downloading to {out_raw} ...")
+    target_urls = args.index_url or [INDEX_URL_CIRCL, INDEX_URL_BOTVRIJ]
+    client = HttpClient(max_workers=args.max_workers, max_per_host=args.max_per_host)
 
-    rows: List[Dict[str, Any]] = []
-    with fut.ThreadPoolExecutor(max_workers=args.max_workers) as ex:
-        for res in ex.map(lambda u: download_one(u, out_raw), urls):
-            rows.append(res)
-            if "error" in res:
-                print(f"[ERR] {res['filename']}: {res['error']}")
-            else:
-                print(f"[OK]  {res['filename']} ({res.get('size','?')} bytes)")
+    print("[INFO] Listing events...")
+    with metrics.stage("list"):
+        entries = list_feed_events(target_urls)
+    n_done = 0
+    n_unchanged = 0
+    n_resumed = 0
 
+    # Rows are appended as downloads complete; a restarted run resumes from them.
     mani_path = os.path.join(out_raw, "manifest.jsonl")
-    with open(mani_path, "w", encoding="utf-8") as f:
-        for r in rows:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
-    print(f"[DONE] Wrote manifest: {mani_path}")
+    mani_f = open(mani_path, "a", encoding="utf-8")
+
+    # Delta against the previous manifest: same feed timestamp => no request at all
+    queue: List[Dict[str, Any]] = []
+    for entry in entries:
+        prev = previous.get(entry["url"])
+        if prev is not None and prev[1].path == out_raw and (entry.get("timestamp") is None or is_unchanged(entry, prev)):
+            n_resumed += 1  # finished by an earlier, interrupted run into this same --out
+        elif is_unchanged(entry, prev):
+            row, prev_store = prev
+            _reuse_previous(row, prev_store, writer)
+            append_manifest_row(mani_f, row)
+            n_unchanged += 1
+        else:
+            queue.append(entry)
+    print(f"[INFO] Found {len(entries)} events: {n_resumed} already done, {n_unchanged} unchanged, "
+          f"{len(queue)} new or updated. Downloading to {out_raw} ...")
+
+    def _download(entry: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        res = download_one(entry["url"], out_raw, previous=previous.get(entry["url"]), client=client, writer=writer)
+        seconds = time.perf_counter() - start
+        metrics.add("download", seconds)
+        status = "error" if "error" in res else "unchanged" if res.get("unchanged") else "ok"
+        metrics.event(res["filename"], url=res["url"], status=status, bytes=res.get("size"), seconds=seconds)
+        if "error" not in res and entry.get("timestamp") is not None:
+            res["timestamp"] = entry["timestamp"]
+        return res
+
+    def _report(res: Dict[str, Any]) -> None:
+        nonlocal n_done, n_unchanged
+        unchanged = res.pop("unchanged", False)
+        append_manifest_row(mani_f, res)
+        n_done += 1
+        if "error" in res:
+            print(f"[ERR] {res['filename']}: {res['error']}")
+        elif unchanged:
+            n_unchanged += 1
+            print(f"[SAME] {res['filename']} ({res.get('size','?')} bytes)")
+        else:
+            print(f"[OK]  {res['filename']} ({res.get('size','?')} bytes)")
+
+    try:
+        run_engine(
+            args.engine, interleave_by_host(queue), _download, args.max_workers, _report,
+            max_per_host=args.max_per_host,
+        )
+    except KeyboardInterrupt:
+        print(f"\n[WARN] Interrupted after {n_done}/{len(queue)} downloads; rerun with the same --out to resume.")
+    finally:
+        mani_f.close()
+        writer.close()
+
+    for host, st in client.summary().items():
+        print(f"[INFO] {host}: final in-flight limit {st['limit']}, ok={st['ok']} "
+              f"throttled={st['throttled']} errors={st['errors']} decreases={st['decreases']}")
+
+    with metrics.stage("compact_manifest"):
+        n_rows = compact_manifest(mani_path, [e["url"] for e in entries])
+    print(f"[DONE] Wrote manifest: {mani_path} ({n_rows} rows)")
+    if previous:
+        print(f"[DONE] Unchanged (reused from previous snapshot): {n_unchanged}/{n_rows}")
+    metrics.close()
 
 if __name__ == "__main__":
     main()
@@ -5,14 +5,23 @@ import json
 import argparse
 import shutil
 import random
-from typing import Dict, Any, List, Optional, Tuple
-from transformers import AutoTokenizer, logging
+import time
+from typing import Dict, Any, Callable, List, Optional, Tuple
 from tqdm import tqdm
 
-# Suppress verbose logging from the transformers library
-logging.set_verbosity_error()
+import json_codec
+from metrics import Metrics, add_metrics_arguments, metrics_from_args
+from token_counting import DEFAULT_BATCH_SIZE, DEFAULT_CACHE_PATH, TokenCounter
+from packstore import open_store, open_writer
+from token_daemon import DEFAULT_SOCKET, TokenDaemonClient
+from utils import count_attributes
 
 LABEL_MAP_NUM2STR = {"1": "High", "2": "Medium", "3": "Low"}
+# Labeled documents are tokenized in windows of about this many characters, so the
+# batched/multi-process counter gets plenty of work without holding the corpus in memory.
+# Each window also holds the parsed events until their Markdown twins are rendered.
+TOKENIZE_WINDOW_CHARS = 16_000_000
+
 LABEL_TEXT2ID = {
     "1": "1", "high": "1",
     "2": "2", "medium": "2",
@@ -266,124 +275,160 @@ def render_markdown_for_event(event_json: Dict[str, Any]) -> str:
 # Main filtering + outputs
 # ---------------------------
 
+OVERHEAD_CONFIG = {
+    "prompt_overhead": 400,
+    "output_buffer": 120,
+    "variance_percentage": 0.10,
+}
+
 def ensure_clean_dir(path: str) -> None:
     if os.path.exists(path):
         shutil.rmtree(path)
     os.makedirs(path, exist_ok=True)
 
-def copy_kept_jsons(src_dir: str, dst_dir: str, kept_filenames: List[str]) -> None:
-    os.makedirs(dst_dir, exist_ok=True)
-    for fn in kept_filenames:
-        shutil.copy(os.path.join(src_dir, fn), os.path.join(dst_dir, fn))
-
-def write_markdowns(src_dir: str, dst_dir: str, kept_filenames: List[str]) -> None:
-    os.makedirs(dst_dir, exist_ok=True)
-    for fn in kept_filenames:
-        in_path = os.path.join(src_dir, fn)
-        try:
-            with open(in_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception as e:
-            print(f"[WARN] Could not render Markdown for {fn}: {e}")
-            continue
-        md = render_markdown_for_event(data)
-        base = os.path.splitext(fn)[0] + ".md"
-        out_path = os.path.join(dst_dir, base)
-        with open(out_path, "w", encoding="utf-8") as f:
-            f.write(md)
+JSON_COPY_METHODS = ("link", "reflink", "copy")
 
-def filter_json_by_tokens(args):
+def copy_kept_jsons(src, dst_dir: str, kept_filenames: List[str], method: str = "copy", pack: bool = False) -> None:
     """
-    Filters a directory of JSON files based on token count, drops unlabeled,
-    and optionally performs a stratified train/test split.
-    Also writes Markdown reports for the kept files into a parallel directory tree.
+    Place kept JSONs from store `src` in dst_dir as hard links, reflinks (copy-on-write
+    clones) or plain copies; with pack, dst_dir becomes a pack holding copies.
     """
-    # --- 1. Setup and Configuration ---
-    input_dir = args.input_dir
-    output_dir = args.output_dir
-    max_len = args.max_context_length
-    tokenizer_model = args.tokenizer_model
+    with open_writer(dst_dir, pack=pack) as out:
+        for fn in kept_filenames:
+            out.copy_from(src, fn, method)
 
-    overhead_config = {
-        "prompt_overhead": 400,
-        "output_buffer": 120,
-        "variance_percentage": 0.10,
-    }
-
-    # --- 2. Calculate Threshold and Load Tokenizer ---
+def render_markdown_to(staging_dir: str, filename: str, data: Dict[str, Any]) -> None:
+    """Render the Markdown twin of an already parsed event into staging_dir."""
     try:
-        print(f"Loading reference tokenizer: '{tokenizer_model}'...")
-        tokenizer = AutoTokenizer.from_pretrained(tokenizer_model, use_fast=True)
-        safe_token_threshold = calculate_safe_threshold(max_len, overhead_config)
+        md = render_markdown_for_event(data)
     except Exception as e:
-        print(f"Error: Could not load tokenizer or calculate threshold. {e}")
-        return
-
-    # --- 3. Prepare Directories ---
-    if not os.path.isdir(input_dir):
-        print(f"Error: Input directory '{input_dir}' not found.")
-        return
-
-    # We will (re)create output_dir with two parallel trees:
-    #   {output_dir}/filtered_json/(train|test|root)
-    #   {output_dir}/filtered_md/(train|test|root)
-    ensure_clean_dir(output_dir)
-    json_root = os.path.join(output_dir, "filtered_json")
-    md_root   = os.path.join(output_dir, "filtered_md")
-    os.makedirs(json_root, exist_ok=True)
-    os.makedirs(md_root, exist_ok=True)
-
-    # Try to read labels from a manifest in the input_dir
-    manifest_in = os.path.join(input_dir, "manifest.jsonl")
-    idx = read_manifest_labels(manifest_in)
-
-    # --- 4. Scan, label-filter, and token-filter ---
-    print(f"Scanning files in '{input_dir}'...")
-    json_files = [f for f in os.listdir(input_dir) if f.endswith('.json')]
-    if not json_files:
-        print("No JSON files found in the input directory.")
+        print(f"[WARN] Could not render Markdown for {filename}: {e}")
         return
+    base = os.path.splitext(filename)[0] + ".md"
+    with open(os.path.join(staging_dir, base), "w", encoding="utf-8") as f:
+        f.write(md)
 
+def place_markdowns(staging_dir: str, dst_dir: str, kept_filenames: List[str], link: bool = False,
+                    pack: bool = False) -> None:
+    """
+    Move (or hard-link, when several trees share them) pre-rendered Markdown twins into
+    dst_dir; with pack, dst_dir becomes a pack and they are copied in.
+    """
+    with open_writer(dst_dir, pack=pack) as out:
+        for fn in kept_filenames:
+            base = os.path.splitext(fn)[0] + ".md"
+            src = os.path.join(staging_dir, base)
+            if not os.path.exists(src):
+                continue  # rendering failed and was reported
+            out.put_file(base, src, keep=link)
+
+def scan_labeled_events(
+    store,
+    json_files: List[str],
+    idx: Dict[str, Dict[str, Any]],
+    on_window: Callable[[List[Tuple[str, str, str, Any]]], None],
+    metrics: Optional[Metrics] = None,
+) -> Tuple[int, List[Tuple[str, str]]]:
+    """
+    Parse every JSON file once (sorted), drop unlabeled ones and hand the labeled ones
+    to on_window as (filename, label_id, minified JSON, parsed event) lists of
+    ~TOKENIZE_WINDOW_CHARS. This is the only time the input files (in `store`, a
+    directory or a pack) are read.
+    With `metrics`, read/parse/minify are timed per file; unlabeled and unreadable files
+    get their metrics row here, labeled ones are noted for on_window to complete.
+    Returns (files scanned, labeled (filename, label_id) pairs).
+    """
+    metrics = metrics or Metrics("filter")
     total_files = 0
     labeled_candidates: List[Tuple[str, str]] = []  # (filename, label_id) BEFORE token filter
-    kept_pairs: List[Tuple[str, str]] = []          # AFTER token filter
+    pending: List[Tuple[str, str, str, Any]] = []   # (filename, label_id, minified JSON, event) awaiting tokenization
+    pending_chars = 0
 
     for filename in tqdm(sorted(json_files), desc="Evaluating JSONs"):
         total_files += 1
-        file_path = os.path.join(input_dir, filename)
+        start = time.perf_counter()
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            raw = store.read(filename)
+            read = time.perf_counter()
+            data = json_codec.loads(raw, errors="strict")
         except json.JSONDecodeError:
             print(f"\n[WARN] Skipping corrupted JSON file: {filename}")
+            metrics.event(filename, status="corrupt")
             continue
         except Exception as e:
             print(f"\n[WARN] Error reading file {filename}: {e}")
+            metrics.event(filename, status="error")
             continue
+        parsed = time.perf_counter()
+        metrics.add("read", read - start)
+        metrics.add("parse", parsed - read)
+        n_bytes = len(raw)
+        del raw
 
         # Label extraction (drop undefined/missing)
         lab = get_label_for_file(filename, idx, data)
         if not lab:
             # drop unlabeled or undefined
+            metrics.event(filename, status="unlabeled", bytes=n_bytes, seconds=parsed - start)
             continue
         lid, _ = lab
         labeled_candidates.append((filename, lid))
 
-        # Tokenize minified JSON for consistency
-        content_string = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
-        tokens = tokenizer(content_string, add_special_tokens=False).input_ids
-        token_count = len(tokens)
-
-        if token_count <= safe_token_threshold:
-            kept_pairs.append((filename, lid))
+        # Tokenize minified JSON for consistency (batched, see token_counting.py)
+        minify_start = time.perf_counter()
+        content_string = json_codec.dumps(data)
+        minified = time.perf_counter()
+        metrics.add("minify", minified - minify_start)
+        if metrics.enabled:
+            metrics.note(filename, label=lid, bytes=n_bytes, attributes=count_attributes(data),
+                         seconds=parsed - start + minified - minify_start)
+        pending.append((filename, lid, content_string, data))
+        pending_chars += len(content_string)
+        if pending_chars >= TOKENIZE_WINDOW_CHARS:
+            on_window(pending)
+            pending = []
+            pending_chars = 0
+
+    if pending:
+        on_window(pending)
+    return total_files, labeled_candidates
+
+def _render_timed(metrics: Metrics, staging_dir: str, filename: str, data: Dict[str, Any]) -> float:
+    """render_markdown_to, timed as the "render" stage; returns the seconds it took."""
+    start = time.perf_counter()
+    render_markdown_to(staging_dir, filename, data)
+    seconds = time.perf_counter() - start
+    metrics.add("render", seconds)
+    return seconds
+
+def write_filtered_outputs(
+    store,
+    output_dir: str,
+    kept_pairs: List[Tuple[str, str]],
+    labeled_candidates: List[Tuple[str, str]],
+    total_files: int,
+    args,
+    staging_md: Optional[str],
+    json_method: str = "copy",
+    link_md: bool = False,
+) -> None:
+    """
+    Write manifests, JSON copies and Markdown twins of kept_pairs under output_dir,
+    optionally as a stratified train/test split.
 
-    # --- 5. Copy Kept Files + Generate Markdown (optionally stratified split) ---
+    JSONs are placed with copy_kept_jsons(json_method); Markdown twins are taken from
+    staging_md, where they were rendered during the scan (moved, or hard-linked when
+    link_md because other trees need them too). staging_md=None writes manifests only.
+    With args.pack every JSON/Markdown directory is written as a pack instead.
+    """
     # Print label stats: before vs after filtering
     print_label_stats("Labeled BEFORE token filter", labeled_candidates)
     print_label_stats("Labeled AFTER token filter", kept_pairs)
 
     kept_filenames = [fn for fn, _ in kept_pairs]
+    json_root = os.path.join(output_dir, "filtered_json")
+    md_root   = os.path.join(output_dir, "filtered_md")
 
     if args.split:
         test_size = args.test_size
@@ -403,13 +448,14 @@ def filter_json_by_tokens(args):
         os.makedirs(train_md_dir, exist_ok=True)
         os.makedirs(test_md_dir, exist_ok=True)
 
-        # Copy JSONs
-        copy_kept_jsons(input_dir, train_json_dir, train_files)
-        copy_kept_jsons(input_dir, test_json_dir,  test_files)
+        if staging_md is not None:
+            # Place JSONs
+            copy_kept_jsons(store, train_json_dir, train_files, method=json_method, pack=args.pack)
+            copy_kept_jsons(store, test_json_dir,  test_files, method=json_method, pack=args.pack)
 
-        # Write MDs
-        write_markdowns(input_dir, train_md_dir, train_files)
-        write_markdowns(input_dir, test_md_dir,  test_files)
+            # Place MDs
+            place_markdowns(staging_md, train_md_dir, train_files, link=link_md, pack=args.pack)
+            place_markdowns(staging_md, test_md_dir,  test_files, link=link_md, pack=args.pack)
 
         # Write manifests
         write_manifest(os.path.join(output_dir, "filtered_manifest.jsonl"), kept_pairs)
@@ -439,8 +485,9 @@ def filter_json_by_tokens(args):
         os.makedirs(flat_json_dir, exist_ok=True)
         os.makedirs(flat_md_dir,   exist_ok=True)
 
-        copy_kept_jsons(input_dir, flat_json_dir, kept_filenames)
-        write_markdowns(input_dir, flat_md_dir, kept_filenames)
+        if staging_md is not None:
+            copy_kept_jsons(store, flat_json_dir, kept_filenames, method=json_method, pack=args.pack)
+            place_markdowns(staging_md, flat_md_dir, kept_filenames, link=link_md, pack=args.pack)
 
         write_manifest(os.path.join(output_dir, "filtered_manifest.jsonl"), kept_pairs)
         # mirror manifest to both trees for convenience
@@ -455,9 +502,213 @@ def filter_json_by_tokens(args):
         print(f"Filtered MD:   '{flat_md_dir}'")
         print(f"Filtered manifest: {os.path.join(output_dir, 'filtered_manifest.jsonl')}")
 
+def _list_inputs(input_dir: str) -> Optional[Tuple[Any, List[str], Dict[str, Dict[str, Any]]]]:
+    """(store, JSON filenames, manifest labels) of input_dir, a directory or a pack."""
+    if not os.path.isdir(input_dir):
+        print(f"Error: Input directory '{input_dir}' not found.")
+        return None
+    print(f"Scanning files in '{input_dir}'...")
+    store = open_store(input_dir)
+    json_files = store.names(".json")
+    if not json_files:
+        print("No JSON files found in the input directory.")
+        return None
+    # Try to read labels from a manifest in the input_dir
+    return store, json_files, read_manifest_labels(os.path.join(input_dir, "manifest.jsonl"))
+
+def _token_counter(args, tokenizer_model: str):
+    if args.token_daemon:
+        return TokenDaemonClient(tokenizer_model, args.token_daemon)
+    cache_path = None if args.no_token_cache else args.token_cache
+    return TokenCounter(tokenizer_model, batch_size=args.batch_size, workers=args.workers, cache_path=cache_path)
+
+def filter_json_by_tokens(args, metrics: Optional[Metrics] = None):
+    """
+    Filters a directory of JSON files based on token count, drops unlabeled,
+    and optionally performs a stratified train/test split.
+    Also writes Markdown reports for the kept files into a parallel directory tree.
+
+    With several tokenizers and/or context lengths, runs filter_matrix instead.
+    With enabled `metrics`, kept events are counted exactly (count_capped, same verdicts)
+    so their rows carry a token count; dropped ones are above the threshold (tokens null).
+    """
+    # --- 1. Setup and Configuration ---
+    input_dir = args.input_dir
+    output_dir = args.output_dir
+    metrics = metrics or Metrics("filter")
+    if len(args.tokenizer_model) * len(args.max_context_length) > 1:
+        return filter_matrix(args, metrics)
+    max_len = args.max_context_length[0]
+    tokenizer_model = args.tokenizer_model[0]
+
+    # --- 2. Calculate Threshold and Load Tokenizer ---
+    try:
+        print(f"Loading reference tokenizer: '{tokenizer_model}'...")
+        counter = _token_counter(args, tokenizer_model)
+        safe_token_threshold = calculate_safe_threshold(max_len, OVERHEAD_CONFIG)
+    except Exception as e:
+        print(f"Error: Could not load tokenizer or calculate threshold. {e}")
+        return
+
+    # --- 3. Prepare Directories ---
+    inputs = _list_inputs(input_dir)
+    if inputs is None:
+        counter.close()
+        return
+    store, json_files, idx = inputs
+
+    # We will (re)create output_dir with two parallel trees:
+    #   {output_dir}/filtered_json/(train|test|root)
+    #   {output_dir}/filtered_md/(train|test|root)
+    ensure_clean_dir(output_dir)
+
+    # --- 4. Scan, label-filter, and token-filter ---
+    kept_pairs: List[Tuple[str, str]] = []  # AFTER token filter
+
+    staging_md = os.path.join(output_dir, ".md_staging")
+    os.makedirs(staging_md)
+
+    def keep_within_threshold(pending: List[Tuple[str, str, str, Any]]) -> None:
+        texts = [text for _, _, text, _ in pending]
+        with metrics.stage("tokenize"):
+            if metrics.enabled:
+                tokens = counter.count_capped(texts, safe_token_threshold)
+                verdicts = [n is not None for n in tokens]
+            else:
+                verdicts = counter.within_limit(texts, safe_token_threshold)
+                tokens = [None] * len(texts)
+        for (filename, lid, _, data), fits, n in zip(pending, verdicts, tokens):
+            if fits:
+                kept_pairs.append((filename, lid))
+                seconds = _render_timed(metrics, staging_md, filename, data)
+                metrics.event(filename, status="kept", tokens=n, seconds=seconds)
+            else:
+                metrics.event(filename, status="dropped", tokens=None)
+
+    with counter:
+        total_files, labeled_candidates = scan_labeled_events(store, json_files, idx, keep_within_threshold, metrics)
+        print(counter.report())
+
+    # --- 5. Place Kept Files + Rendered Markdown (optionally stratified split) ---
+    with metrics.stage("place"):
+        write_filtered_outputs(store, output_dir, kept_pairs, labeled_candidates, total_files, args,
+                               staging_md, json_method=args.json_copy)
+    shutil.rmtree(staging_md)
+
+def _model_slug(tokenizer_model: str) -> str:
+    return tokenizer_model.strip("/").replace("/", "__")
+
+def filter_matrix(args, metrics: Optional[Metrics] = None) -> None:
+    """
+    One scan for every (tokenizer, context length) combination.
+
+    Each event is parsed and minified once; every tokenizer counts it once, capped at
+    the largest threshold it needs. Writes {output_dir}/token_matrix.jsonl (one row per
+    labeled event, tokens per tokenizer; null = above that tokenizer's largest threshold),
+    {output_dir}/matrix_summary.json, and one filtered (optionally split) tree per
+    combination under {output_dir}/<tokenizer>/ctx<N>/. With --matrix_outputs link the
+    JSONs are placed per --json_copy and each Markdown twin is rendered once during the
+    scan and hard-linked into every tree that keeps it; with manifest only the manifests
+    are written.
+    """
+    input_dir = args.input_dir
+    output_dir = args.output_dir
+    metrics = metrics or Metrics("filter")
+    models: List[str] = list(dict.fromkeys(args.tokenizer_model))
+    lengths: List[int] = sorted(set(args.max_context_length))
+
+    counters: Dict[str, TokenCounter] = {}
+    try:
+        thresholds = {n: calculate_safe_threshold(n, OVERHEAD_CONFIG) for n in lengths}
+        for model in models:
+            print(f"Loading reference tokenizer: '{model}'...")
+            counters[model] = _token_counter(args, model)
+    except Exception as e:
+        print(f"Error: Could not load tokenizer or calculate threshold. {e}")
+        for c in counters.values():
+            c.close()
+        return
+    cap = max(thresholds.values())
+
+    inputs = _list_inputs(input_dir)
+    if inputs is None:
+        for c in counters.values():
+            c.close()
+        return
+    store, json_files, idx = inputs
+    ensure_clean_dir(output_dir)
+
+    tokens: Dict[str, Dict[str, Optional[int]]] = {}  # filename -> model -> count (None = over cap)
+
+    staging_md = os.path.join(output_dir, ".md_staging")
+    os.makedirs(staging_md)
+    render = args.matrix_outputs == "link"
+
+    def count_window(pending: List[Tuple[str, str, str, Any]]) -> None:
+        texts = [text for _, _, text, _ in pending]
+        for model, counter in counters.items():
+            with metrics.stage("tokenize"):
+                counts = counter.count_capped(texts, cap)
+            for (filename, _, _, _), n in zip(pending, counts):
+                tokens.setdefault(filename, {})[model] = n
+        for filename, _, _, data in pending:
+            # Markdown for anything kept by at least one combination, rendered once and linked
+            kept = any(n is not None for n in tokens[filename].values())
+            seconds = _render_timed(metrics, staging_md, filename, data) if render and kept else 0.0
+            metrics.event(filename, status="kept" if kept else "dropped", tokens=tokens[filename], seconds=seconds)
+
+    try:
+        total_files, labeled_candidates = scan_labeled_events(store, json_files, idx, count_window, metrics)
+        for model, counter in counters.items():
+            print(f"[{model}]")
+            print(counter.report())
+    finally:
+        for c in counters.values():
+            c.close()
+
+    with open(os.path.join(output_dir, "token_matrix.jsonl"), "w", encoding="utf-8") as f:
+        for fn, lid in labeled_candidates:
+            f.write(json.dumps({"filename": fn, "threat_level_id": lid, "tokens": tokens[fn]}, ensure_ascii=False) + "\n")
+
+    combinations = []
+    for model in models:
+        for n in lengths:
+            threshold = thresholds[n]
+            combo_dir = os.path.join(output_dir, _model_slug(model), f"ctx{n}")
+            os.makedirs(combo_dir, exist_ok=True)
+            kept_pairs = [(fn, lid) for fn, lid in labeled_candidates
+                          if tokens[fn][model] is not None and tokens[fn][model] <= threshold]
+            print(f"\n=== {model} @ {n} (safe threshold {threshold}) ===")
+            with metrics.stage("place"):
+                write_filtered_outputs(store, combo_dir, kept_pairs, labeled_candidates, total_files, args,
+                                       staging_md if render else None, json_method=args.json_copy, link_md=True)
+            combinations.append({
+                "tokenizer_model": model,
+                "max_context_length": n,
+                "safe_token_threshold": threshold,
+                "output_dir": os.path.relpath(combo_dir, output_dir),
+                "kept": len(kept_pairs),
+            })
+
+    shutil.rmtree(staging_md)
+
+    with open(os.path.join(output_dir, "matrix_summary.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "input_dir": os.path.abspath(input_dir),
+            "labeled": len(labeled_candidates),
+            "outputs": args.matrix_outputs,
+            "combinations": combinations,
+        }, f, indent=2)
+
+    print("\n--- Matrix Filtering Complete ---")
+    for c in combinations:
+        print(f"{c['tokenizer_model']} @ {c['max_context_length']}: kept {c['kept']} → {c['output_dir']}")
+    print(f"Token matrix: {os.path.join(output_dir, 'token_matrix.jsonl')}")
+
 def main():
     parser = argparse.ArgumentParser(
-        description="Filter JSONs by token count (single tokenizer), drop unlabeled, optionally stratify split, and emit Markdown twins.",
+        description="Filter JSONs by token count, drop unlabeled, optionally stratify split, and emit Markdown twins.\n"
+                    "Several --tokenizer_model / --max_context_length values produce one output per combination from a single scan.",
         formatter_class=argparse.RawTextHelpFormatter
     )
     parser.add_argument('--input_dir', type=str,
@@ -467,16 +718,41 @@ def main():
     parser.add_argument('--output_dir', default="/Users/murathanku/PycharmProjects/Cyber/pass2/snapshots_both/2025-08-20/filtered-text",
                         help="Output directory. Will contain filtered_json/ and filtered_md/ (and train/test if split).")
 
-    parser.add_argument('--max_context_length', type=int, default=8192, help="Fixed context window.")
-    parser.add_argument('--tokenizer_model', type=str, default='meta-llama/Meta-Llama-3-8B-Instruct',
-                        help="HF model name for tokenization.")
+    parser.add_argument('--max_context_length', type=int, nargs='+', default=[8192],
+                        help="Fixed context window(s).")
+    parser.add_argument('--tokenizer_model', type=str, nargs='+', default=['meta-llama/Meta-Llama-3-8B-Instruct'],
+                        help="HF model name(s) for tokenization.")
+    parser.add_argument('--matrix_outputs', choices=("link", "manifest"), default="link",
+                        help="With several tokenizers/context lengths: hard-link JSON/Markdown trees per combination\n"
+                             "(default) or write manifests only.")
+    parser.add_argument('--json_copy', choices=JSON_COPY_METHODS, default="link",
+                        help="How kept JSONs are placed: hard link (default; falls back to a copy across\n"
+                             "filesystems), reflink (copy-on-write clone where supported) or copy.")
+    parser.add_argument('--pack', action='store_true',
+                        help="Write every filtered JSON/Markdown directory as a pack (shards + offset index,\n"
+                             "see packstore.py). --input_dir may be a directory or a pack either way.")
     parser.add_argument('--split', action='store_true', help="If set, perform a stratified train/test split.")
     parser.add_argument('--test_size', type=float, default=0.3,
                         help="Test set ratio when --split is used (default: 0.3).")
     parser.add_argument('--seed', type=int, default=42,
                         help="Random seed for deterministic stratified split (default: 42).")
+    parser.add_argument('--batch_size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Documents per tokenizer call; batches group similar lengths (default: {DEFAULT_BATCH_SIZE}).")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Tokenize in N worker processes, each loading the tokenizer once (default: 1).")
+    parser.add_argument('--token_cache', type=str, default=DEFAULT_CACHE_PATH,
+                        help="SQLite cache of token counts keyed by sha256(minified JSON) and tokenizer "
+                             f"fingerprint, shared across runs and snapshots (default: {DEFAULT_CACHE_PATH}).")
+    parser.add_argument('--no_token_cache', action='store_true',
+                        help="Neither read nor update the token count cache.")
+    parser.add_argument('--token_daemon', nargs='?', const=DEFAULT_SOCKET, default=None, metavar='SOCKET',
+                        help="Count tokens through a running token_daemon.py (warm tokenizers; the daemon's\n"
+                             f"own cache settings apply). Default socket: {DEFAULT_SOCKET}")
+    add_metrics_arguments(parser, underscore=True)
     args = parser.parse_args()
-    filter_json_by_tokens(args)
+    metrics = metrics_from_args("filter", args)
+    filter_json_by_tokens(args, metrics)
+    metrics.close()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+One JSON codec for all pipeline scripts: orjson or msgspec when installed, stdlib json otherwise.
+
+    loads(data)              bytes/str -> object (invalid UTF-8 is replaced, like .decode(errors="replace");
+                             pass errors="strict" to raise UnicodeDecodeError instead)
+    dumps(obj)               compact str, == json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    dumps(obj, indent=4)     pretty str, always via stdlib (no fast backend does 4-space indent)
+    dumps_bytes(obj, ...)    the same, UTF-8 encoded
+    raw_decode(s, idx)       (value, end) of the value starting at s[idx], as loads would decode it
+
+Whatever the backend, the results are identical to stdlib json, so token counts and
+sha256 values do not depend on what is installed. The fast paths are only taken
+when that is provably the case:
+  - loads: input with integers of 19+ digits goes to stdlib (orjson turns integers
+    outside int64/uint64 into floats, e.g. -9223372036854775809); anything the fast decoder rejects (NaN, lone surrogates, ...) is
+    parsed by stdlib, with non-finite floats tagged so they never reach a fast encoder.
+  - dumps: if the fast output contains a non-integer number, including a top-level
+    scalar float, it is re-encoded with stdlib (float formatting differs, e.g. 1e16
+    vs 1e+16).
+
+Select the backend with CTI_JSON_BACKEND=auto|orjson|msgspec|json (default auto).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from typing import Any, Callable, Optional, Tuple, Union
+
+BACKENDS = ("orjson", "msgspec", "json")
+
+# Both guards run on a translated copy of the bytes (digits -> "0", everything that
+# can follow/precede a number collapsed to one class) because bytes.translate plus a
+# literal-led search is several times faster than a character-class regex on the raw
+# text, and the guards must stay well under the cost of the parse they protect.
+# They are conservative: digits inside strings can trigger them, which only costs a
+# stdlib round-trip.
+def _table(classes: dict) -> bytes:
+    table = bytearray(b" " * 256)
+    for chars, repl in classes.items():
+        for c in chars:
+            table[c] = ord(repl)
+    return bytes(table)
+
+_DIGITS = _table({b"0123456789": "0"})
+_BIG_INT = b"0" * 19  # every integer outside int64, and some harmless ones inside it
+_NUMBERS = _table({b"0123456789": "0", b".eE": ".", b":[,": ":", b"-": "-"})
+_RE_FLOAT = re.compile(rb":-?0+\.")
+_RE_FLOAT_HEAD = re.compile(rb"-?0+\.")  # a top-level scalar has no ":" before it
+
+class _NonFiniteFloat(float):
+    """NaN/Infinity from the stdlib fallback; fast encoders reject the subclass, stdlib prints it as usual."""
+
+def _parse_float(s: str) -> float:
+    f = float(s)
+    return f if f - f == 0 else _NonFiniteFloat(f)
+
+_stdlib_decoder = json.JSONDecoder(parse_float=_parse_float, parse_constant=_NonFiniteFloat)
+
+def _stdlib_loads(data: Union[bytes, str], errors: str = "replace") -> Any:
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode("utf-8", errors=errors)
+    return _stdlib_decoder.decode(data)
+
+def _load_backend(name: str) -> Tuple[Callable[[bytes], Any], Optional[Callable[[Any], bytes]]]:
+    if name == "orjson":
+        import orjson
+        return orjson.loads, orjson.dumps
+    if name == "msgspec":
+        import msgspec
+        return msgspec.json.Decoder().decode, msgspec.json.Encoder().encode
+    if name == "json":
+        return _stdlib_loads, None
+    raise ValueError(f"unknown JSON backend {name!r}; expected one of {', '.join(BACKENDS)} or auto")
+
+BACKEND = "json"
+_fast_loads: Optional[Callable[[bytes], Any]] = None
+_fast_dumps: Optional[Callable[[Any], bytes]] = None
+
+def set_backend(name: str = "auto") -> str:
+    """Select the backend ('auto' picks the first importable of orjson, msgspec, json). Returns its name."""
+    global BACKEND, _fast_loads, _fast_dumps
+    candidates = BACKENDS if name == "auto" else (name,)
+    for cand in candidates:
+        try:
+            loads_fn, dumps_fn = _load_backend(cand)
+        except ImportError:
+            if name != "auto":
+                raise
+            continue
+        BACKEND = cand
+        _fast_loads, _fast_dumps = (None, None) if cand == "json" else (loads_fn, dumps_fn)
+        return BACKEND
+    return BACKEND
+
+def loads(data: Union[bytes, str], errors: str = "replace") -> Any:
+    if _fast_loads is not None:
+        raw = data.encode("utf-8", errors="surrogatepass") if isinstance(data, str) else data
+        if _BIG_INT not in raw.translate(_DIGITS):
+            try:
+                return _fast_loads(raw)
+            except Exception:
+                pass
+    return _stdlib_loads(data, errors=errors)
+
+def raw_decode(s: str, idx: int = 0) -> Tuple[Any, int]:
+    return _stdlib_decoder.raw_decode(s, idx)
+
+def _fast_encode(obj: Any) -> Optional[bytes]:
+    if _fast_dumps is None:
+        return None
+    try:
+        out = _fast_dumps(obj)
+    except Exception:
+        return None
+    numbers = out.translate(_NUMBERS)
+    return None if _RE_FLOAT_HEAD.match(numbers) or _RE_FLOAT.search(numbers) else out
+
+def dumps_bytes(obj: Any, indent: Optional[int] = None) -> bytes:
+    out = _fast_encode(obj) if indent is None else None
+    if out is not None:
+        return out
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), indent=indent).encode("utf-8")
+
+def dumps(obj: Any, indent: Optional[int] = None) -> str:
+    out = _fast_encode(obj) if indent is None else None
+    if out is not None:
+        return out.decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), indent=indent)
+
+set_backend(os.environ.get("CTI_JSON_BACKEND", "auto"))
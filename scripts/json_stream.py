@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Incremental JSON reading and writing for documents too large to hold in memory.
+
+JsonStreamReader walks a document from a binary file: containers are entered member by
+member / item by item, and only the values asked for are decoded (with the same
+stdlib decoder json_codec falls back to, so values are identical to json_codec.loads).
+Memory is bounded by the largest single value decoded plus one read chunk.
+
+JsonStreamWriter emits a document piece by piece, byte-identical to
+json_codec.dumps_bytes(whole_document, indent=...).
+
+    r = JsonStreamReader(f)
+    for key in r.members():            # the caller consumes exactly one value per key
+        if key == "Attribute" and r.peek() == "[":
+            for _ in r.items():        # ... and per item
+                attr = r.value()
+        else:
+            r.skip()
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from typing import Any, BinaryIO, Iterator, List, Optional
+
+import json_codec
+
+DEFAULT_CHUNK_BYTES = 1 << 20
+
+_RE_WS = re.compile(r"[ \t\n\r]*")
+_RE_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+
+class JsonStreamReader:
+    def __init__(self, f: BinaryIO, chunk_bytes: int = DEFAULT_CHUNK_BYTES):
+        self._f = f
+        self._chunk = chunk_bytes
+        # Same result as decoding the whole file with errors="replace", chunk by chunk.
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.consumed = 0  # characters of decoded values so far (for batching by size)
+
+    def _fill(self, want: int = 0) -> bool:
+        """Drop consumed text and append at least one more chunk; False at end of file."""
+        if self._eof:
+            return False
+        data = self._f.read(max(self._chunk, want))
+        self._eof = not data
+        self._buf = self._buf[self._pos:] + self._decoder.decode(data, final=self._eof)
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ('' at end of input), without consuming it."""
+        while True:
+            self._pos = _RE_WS.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf) or not self._fill():
+                return self._buf[self._pos:self._pos + 1]
+
+    def _expect(self, chars: str) -> str:
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f"expected one of {chars!r}, got {c or 'end of input'!r}")
+        self._pos += 1
+        self.consumed += 1
+        return c
+
+    def value(self) -> Any:
+        """Decode the next value."""
+        self.peek()
+        while True:
+            try:
+                val, end = json_codec.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError as e:
+                # Incomplete input fails at (or, for strings, is reported from the start
+                # of) the end of the buffer; anything else is a real syntax error.
+                truncated = e.msg.startswith("Unterminated string") or e.pos >= len(self._buf) - 6
+                if not truncated or not self._fill(want=len(self._buf) - self._pos):
+                    raise
+                continue
+            if (type(val) in (int, float) and _RE_NUMBER_TAIL.match(self._buf, end).end() == len(self._buf)
+                    and self._fill()):
+                continue  # the number (e.g. "-0." + "0025") may go on in the next chunk
+            self.consumed += end - self._pos
+            self._pos = end
+            return val
+
+    def members(self) -> Iterator[str]:
+        """Enter the object at the current position; yield each key with the reader at its value."""
+        self._expect("{")
+        if self.peek() == "}":
+            self._expect("}")
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError(f"object key expected, got {key!r}")
+            self._expect(":")
+            yield key
+            if self._expect(",}") == "}":
+                return
+
+    def items(self) -> Iterator[None]:
+        """Enter the array at the current position; yield once per item with the reader at it."""
+        self._expect("[")
+        if self.peek() == "]":
+            self._expect("]")
+            return
+        while True:
+            yield None
+            if self._expect(",]") == "]":
+                return
+
+    def skip(self) -> None:
+        """Consume the next value; containers are walked without being built."""
+        c = self.peek()
+        if c == "{":
+            for _ in self.members():
+                self.skip()
+        elif c == "[":
+            for _ in self.items():
+                self.skip()
+        else:
+            self.value()
+
+    def at_end(self) -> bool:
+        return self.peek() == ""
+
+class JsonStreamWriter:
+    """
+    Write a document as a sequence of begin/value/end calls. `depth` is the nesting level
+    of the first container written, so a nested part can be produced separately and
+    spliced in with raw().
+    """
+
+    def __init__(self, out: BinaryIO, indent: Optional[int] = None, depth: int = 0):
+        self._out = out
+        self._indent = indent
+        self._depth = depth
+        self._stack: List[List[Any]] = []  # [closing bytes, items written]
+
+    def _newline(self, depth: int) -> bytes:
+        return b"\n" + b" " * (self._indent * depth)
+
+    def _prefix(self, key: Optional[str]) -> None:
+        parts = []
+        if self._stack:
+            top = self._stack[-1]
+            if top[1]:
+                parts.append(b",")
+            if self._indent is not None:
+                parts.append(self._newline(self._depth + len(self._stack)))
+            top[1] += 1
+        if key is not None:
+            parts.append(json_codec.dumps_bytes(key) + b":")
+        self._out.write(b"".join(parts))
+
+    def begin_object(self, key: Optional[str] = None) -> None:
+        self._prefix(key)
+        self._out.write(b"{")
+        self._stack.append([b"}", 0])
+
+    def begin_array(self, key: Optional[str] = None) -> None:
+        self._prefix(key)
+        self._out.write(b"[")
+        self._stack.append([b"]", 0])
+
+    def end(self) -> None:
+        close, n = self._stack.pop()
+        if n and self._indent is not None:
+            self._out.write(self._newline(self._depth + len(self._stack)) + close)
+        else:
+            self._out.write(close)
+
+    def value(self, obj: Any, key: Optional[str] = None) -> None:
+        self._prefix(key)
+        data = json_codec.dumps_bytes(obj, indent=self._indent)
+        depth = self._depth + len(self._stack)
+        if self._indent is not None and depth:
+            # JSON strings never contain a raw newline, so every b"\n" is layout.
+            data = data.replace(b"\n", self._newline(depth))
+        self._out.write(data)
+
+    def values(self, objs: List[Any]) -> None:
+        """value() for each of objs in the current array, encoded in one call."""
+        if not objs:
+            return
+        data = json_codec.dumps_bytes(objs, indent=self._indent)
+        if self._indent is None:
+            data = data[1:-1]
+        else:
+            # drop "[\n" + one indent and "\n]", then re-indent from level 1 to the current depth
+            data = data[2 + self._indent:-2]
+            depth = self._depth + len(self._stack)
+            if depth > 1:
+                data = data.replace(b"\n", self._newline(depth - 1))
+        self._prefix(None)
+        self._stack[-1][1] += len(objs) - 1
+        self._out.write(data)
+
+    def raw(self, chunks, key: Optional[str] = None) -> None:
+        """Splice in a value already encoded for this position (e.g. by a writer with depth=current)."""
+        self._prefix(key)
+        for chunk in chunks:
+            self._out.write(chunk)
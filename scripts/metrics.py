@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Opt-in instrumentation shared by the scripts (--metrics, --profile, --tracemalloc).
+
+A Metrics object collects
+  - stage timers: seconds and calls per named stage (list, download, read, parse,
+    simplify, tokenize, render, ...), from `with metrics.stage(name):` blocks or from
+    add() for time measured elsewhere (e.g. in a worker process). Stages of concurrent
+    workers add up, so a stage can report more seconds than the run's wall time;
+  - one row per event (bytes, attributes, tokens, seconds, ...), appended to the
+    metrics JSONL as soon as the event is done. Fields known at different points can be
+    gathered with note() before event() writes the row.
+
+close() appends a summary row (wall time, stages, peak RSS, top-N events), prints the
+stage table and the slowest / largest events, and finishes the optional hooks:
+cProfile (calls made by the main thread; dumped for pstats/snakeviz) and tracemalloc
+(peak traced memory and the top allocation sites near that peak). When none of the
+options is given every call is a no-op.
+
+Metrics JSONL:
+    {"kind": "event", "script": "simplify", "filename": "<uuid>.json", "bytes": ..., "seconds": ..., ...}
+    ...
+    {"kind": "summary", "script": "simplify", "wall_s": ..., "events": ..., "stages": {...}, ...}
+"""
+
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import datetime as dt
+import heapq
+import json
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TOP_N = 10
+PROFILE_LINES = 25
+# tracemalloc snapshots are taken at stage exits once traced memory grew by this factor
+SNAPSHOT_GROWTH = 1.1
+
+def peak_rss_mb(who: str = "self") -> Optional[float]:
+    """Peak resident set size of this process ("self") or of its reaped children, in MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3  # bytes on macOS, KiB elsewhere
+
+class Metrics:
+    """Stage timers, per-event rows and the optional profiling hooks of one script run."""
+
+    def __init__(
+        self,
+        script: str,
+        path: Optional[str] = None,
+        top: int = TOP_N,
+        profile: Optional[str] = None,
+        trace_memory: bool = False,
+    ):
+        self.script = script
+        self.path = path
+        self.top = top
+        self.profile_path = profile
+        self.trace_memory = trace_memory
+        self.enabled = bool(path or profile or trace_memory)
+        self.stages: Dict[str, List[float]] = {}  # name -> [seconds, calls]
+        self.events = 0
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._slowest: List[Tuple[float, int, Dict[str, Any]]] = []  # min-heaps of the top rows
+        self._largest: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+        self._started = dt.datetime.now().isoformat(timespec="seconds")
+        self._start = time.perf_counter()
+        self._f = open(path, "w", encoding="utf-8") if path else None
+        self._profiler: Optional[cProfile.Profile] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._snapshot_bytes = 0
+        if trace_memory:
+            tracemalloc.start()
+        if profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    # --- stage timers ---
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the block as one call of stage `name`."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+            if self.trace_memory:
+                self._maybe_snapshot()
+
+    def add(self, name: str, seconds: float, calls: int = 1) -> None:
+        """Add time measured elsewhere to stage `name`."""
+        if not self.enabled:
+            return
+        with self._lock:
+            st = self.stages.setdefault(name, [0.0, 0])
+            st[0] += seconds
+            st[1] += calls
+
+    def add_timings(self, timings: Dict[str, float]) -> None:
+        """add() every {stage: seconds} of one event."""
+        for name, seconds in timings.items():
+            self.add(name, seconds)
+
+    # --- per-event rows ---
+
+    @staticmethod
+    def _merge(row: Dict[str, Any], fields: Dict[str, Any]) -> None:
+        seconds = row.get("seconds")
+        row.update(fields)
+        if seconds is not None and fields.get("seconds") is not None:
+            row["seconds"] = seconds + fields["seconds"]
+
+    def note(self, filename: str, **fields: Any) -> None:
+        """Remember fields of an event whose row is written later by event(); "seconds" add up."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._merge(self._pending.setdefault(filename, {}), fields)
+
+    def event(self, filename: str, **fields: Any) -> None:
+        """Write the row of one event: noted fields, then `fields` ("bytes" and "seconds" feed the top-N report)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            row = {"kind": "event", "script": self.script, "filename": filename}
+            self._merge(row, self._pending.pop(filename, {}))
+            self._merge(row, fields)
+            self.events += 1
+            if self._f is not None:
+                self._f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            for heap, key in ((self._slowest, "seconds"), (self._largest, "bytes")):
+                value = row.get(key)
+                if value is None:
+                    continue
+                item = (value, self.events, row)
+                if len(heap) < self.top:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+
+    # --- tracemalloc ---
+
+    def _maybe_snapshot(self) -> None:
+        current = tracemalloc.get_traced_memory()[0]
+        if current > self._snapshot_bytes * SNAPSHOT_GROWTH:
+            self._snapshot_bytes = current
+            self._snapshot = tracemalloc.take_snapshot()
+
+    # --- summary ---
+
+    def top_events(self, key: str) -> List[Dict[str, Any]]:
+        """The top-N rows by "seconds" or "bytes", largest first."""
+        heap = self._slowest if key == "seconds" else self._largest
+        return [row for _, _, row in sorted(heap, key=lambda item: (item[0], -item[1]), reverse=True)]
+
+    def summary(self) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {
+            "kind": "summary",
+            "script": self.script,
+            "started": self._started,
+            "wall_s": round(time.perf_counter() - self._start, 6),
+            "events": self.events,
+            "stages": {name: {"seconds": round(s, 6), "calls": n} for name, (s, n) in self.stages.items()},
+            "peak_rss_mb": peak_rss_mb("self"),
+            "children_peak_rss_mb": peak_rss_mb("children"),
+            "slowest": [row["filename"] for row in self.top_events("seconds")],
+            "largest": [row["filename"] for row in self.top_events("bytes")],
+        }
+        if self.trace_memory:
+            summary["traced_peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+        return summary
+
+    def report(self, summary: Dict[str, Any]) -> None:
+        print(f"\n[INFO] {self.script}: {summary['wall_s']:.2f}s wall, {self.events} events, "
+              f"peak RSS {summary['peak_rss_mb'] or 0:.1f} MB (children {summary['children_peak_rss_mb'] or 0:.1f} MB)")
+        if self.stages:
+            print(f"  {'stage':<18} {'seconds':>10} {'calls':>8} {'ms/call':>9}")
+            for name, (seconds, calls) in sorted(self.stages.items(), key=lambda kv: -kv[1][0]):
+                print(f"  {name:<18} {seconds:10.3f} {calls:8d} {1e3 * seconds / max(calls, 1):9.3f}")
+        for key, title in (("seconds", "slowest"), ("bytes", "largest")):
+            rows = self.top_events(key)
+            if not rows:
+                continue
+            print(f"[INFO] Top {len(rows)} {title} events:")
+            for row in rows:
+                extra = "".join(f"  {k}={row[k]}" for k in ("attributes", "tokens") if row.get(k) is not None)
+                seconds = f"{row['seconds']:8.3f}s" if row.get("seconds") is not None else f"{'-':>9}"
+                size = f"{row['bytes'] / 1e6:9.2f} MB" if row.get("bytes") is not None else f"{'-':>12}"
+                print(f"  {seconds} {size}  {row['filename']}{extra}")
+        if summary.get("traced_peak_mb") is not None:
+            print(f"[INFO] tracemalloc: peak traced {summary['traced_peak_mb']:.1f} MB (main process)")
+            if self._snapshot is not None:
+                print(f"[INFO] Top allocation sites at {self._snapshot_bytes / 1e6:.1f} MB traced:")
+                for stat in self._snapshot.statistics("lineno")[:self.top]:
+                    print(f"  {stat.size / 1e6:9.2f} MB {stat.count:9d} blocks  {stat.traceback}")
+
+    def close(self) -> None:
+        """Write the summary row, print the report and finish the profiling hooks."""
+        if not self.enabled:
+            return
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self.trace_memory:
+            self._maybe_snapshot()
+        summary = self.summary()
+        self.report(summary)
+        if self._f is not None:
+            self._f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+            self._f.close()
+            self._f = None
+            print(f"[DONE] Wrote metrics: {self.path}")
+        if self._profiler is not None:
+            self._profiler.dump_stats(self.profile_path)
+            print(f"[INFO] cProfile (main thread), top {PROFILE_LINES} by cumulative time:")
+            pstats.Stats(self._profiler, stream=sys.stdout).sort_stats("cumulative").print_stats(PROFILE_LINES)
+            print(f"[DONE] Wrote profile: {self.profile_path}")
+        if self.trace_memory:
+            tracemalloc.stop()
+
+    def __enter__(self) -> "Metrics":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def add_metrics_arguments(parser, underscore: bool = False) -> None:
+    """--metrics, --metrics-top, --profile and --tracemalloc (underscore: --metrics_top, as filter_and_split.py spells flags)."""
+    group = parser.add_argument_group("instrumentation")
+    group.add_argument("--metrics", metavar="PATH", default=None,
+                       help="Write one JSON row per event and a per-stage summary to PATH (JSONL), "
+                            "and print the slowest / largest events.")
+    group.add_argument("--metrics_top" if underscore else "--metrics-top", dest="metrics_top", type=int, default=TOP_N,
+                       help=f"Events listed in the slowest / largest report (default: {TOP_N}).")
+    group.add_argument("--profile", metavar="PATH", default=None,
+                       help="Run under cProfile (main thread) and write the stats to PATH.")
+    group.add_argument("--tracemalloc", action="store_true",
+                       help="Trace Python allocations: peak traced memory and the top allocation sites.")
+
+def metrics_from_args(script: str, args) -> Metrics:
+    return Metrics(script, args.metrics, top=args.metrics_top, profile=args.profile, trace_memory=args.tracemalloc)
@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+"""
+Packed snapshot directories: thousands of small per-uuid files stored as a few
+append-only shards plus a binary offset index, read through mmap.
+
+A pack is a directory and can be used wherever the scripts take a data directory
+(raw/, simplified/, filtered_json/train, ...):
+
+    pack.idx             name -> (shard, offset, length); open-addressing hash table, O(1) lookup
+    shard-00000.dat ...  newline-delimited records: b"<name>\\t<length>\\n" + data + b"\\n"
+    manifest.jsonl ...   everything that is not a payload file (*.json, *.md) stays a plain file
+
+Code that opens <dir>/manifest.jsonl therefore works on packs unchanged. Records are
+self-delimiting, so the shards of an interrupted writer can be re-indexed
+(PackWriter(append=True)); a name written twice resolves to its last record.
+
+    store = open_store(path)             DirStore or PackStore: names/read/view/open/size/items
+    w = open_writer(path, pack=True)     DirWriter or PackWriter: put/put_file/copy_from/delete
+    pack_dir(src, dst) / unpack_dir(src, dst)
+
+CLI:
+    python scripts/packstore.py pack   snapshot/raw  snapshot/raw.pack  [--recursive]
+    python scripts/packstore.py unpack snapshot/raw.pack  snapshot/raw  [--recursive]
+    python scripts/packstore.py ls     snapshot/raw.pack
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import io
+import mmap
+import os
+import shutil
+import struct
+import threading
+import zlib
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+from utils import ensure_dir, link_or_copy, reflink_or_copy
+
+INDEX_FILE = "pack.idx"
+SHARD_PATTERN = "shard-%05d.dat"
+PAYLOAD_SUFFIXES = (".json", ".md")
+DEFAULT_SHARD_BYTES = 256 << 20
+
+_MAGIC = b"CTIPACK\x00"
+_VERSION = 1
+_HEADER = struct.Struct("<8sIII")   # magic, version, entries, slots
+_ENTRY = struct.Struct("<IIQQI")    # shard, name length, data offset, data length, name offset in the names blob
+# The names blob is every name + "\n", in entry (= name) order.
+_SLOT = struct.Struct("<I")         # entry number + 1 (0 = empty)
+
+def is_payload(name: str) -> bool:
+    return name.lower().endswith(PAYLOAD_SUFFIXES)
+
+def is_pack(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, INDEX_FILE))
+
+def _slot_of(name: bytes, mask: int) -> int:
+    return zlib.crc32(name) & mask
+
+def _side_files(path: str) -> List[str]:
+    """Plain files of a data directory that are neither payload nor pack internals."""
+    if not os.path.isdir(path):
+        return []
+    shards = set(map(os.path.basename, glob.glob(os.path.join(path, "shard-*.dat"))))
+    return sorted(
+        n for n in os.listdir(path)
+        if os.path.isfile(os.path.join(path, n)) and not is_payload(n) and n != INDEX_FILE and n not in shards
+    )
+
+# ---------------------------
+# Readers
+# ---------------------------
+
+class DirStore:
+    """A plain directory of payload files, behind the same API as PackStore."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def names(self, suffix: Optional[str] = None) -> List[str]:
+        """Sorted payload names (only those ending in `suffix`, case-insensitive, if given)."""
+        out = [n for n in os.listdir(self.path) if is_payload(n)]
+        if suffix is not None:
+            out = [n for n in out if n.lower().endswith(suffix)]
+        return sorted(out)
+
+    def path_of(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def exists(self, name: str) -> bool:
+        return os.path.isfile(self.path_of(name))
+
+    def size(self, name: str) -> int:
+        return os.path.getsize(self.path_of(name))
+
+    def read(self, name: str) -> bytes:
+        with open(self.path_of(name), "rb") as f:
+            return f.read()
+
+    view = read
+
+    def open(self, name: str) -> BinaryIO:
+        return open(self.path_of(name), "rb")
+
+    def items(self) -> Iterator[Tuple[str, bytes]]:
+        for name in self.names():
+            yield name, self.read(name)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class _ViewReader(io.RawIOBase):
+    """Read-only binary file over a memoryview (a pack record), without copying it."""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), len(self._view) - self._pos)
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+class PackStore:
+    """Read a pack through mmap: the index is never parsed as a whole, shards are mapped on first use."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE), "rb") as f:
+            self._idx = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._n, n_slots = _HEADER.unpack_from(self._idx, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path}: not a pack index (or an unsupported version)")
+        self._mask = n_slots - 1
+        self._slots = _HEADER.size
+        self._entries = self._slots + n_slots * _SLOT.size
+        self._names = self._entries + self._n * _ENTRY.size
+        self._shards: Dict[int, mmap.mmap] = {}
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _entry(self, i: int) -> Tuple[int, int, int, str]:
+        shard, name_len, offset, length, name_off = _ENTRY.unpack_from(self._idx, self._entries + i * _ENTRY.size)
+        start = self._names + name_off
+        return shard, offset, length, self._idx[start:start + name_len].decode("utf-8")
+
+    def _find(self, name: str) -> Optional[Tuple[int, int, int]]:
+        key = name.encode("utf-8")
+        slot = _slot_of(key, self._mask)
+        while True:
+            (n,) = _SLOT.unpack_from(self._idx, self._slots + slot * _SLOT.size)
+            if not n:
+                return None
+            shard, name_len, offset, length, name_off = _ENTRY.unpack_from(self._idx, self._entries + (n - 1) * _ENTRY.size)
+            start = self._names + name_off
+            if name_len == len(key) and self._idx[start:start + name_len] == key:
+                return shard, offset, length
+            slot = (slot + 1) & self._mask
+
+    def _locate(self, name: str) -> Tuple[int, int, int]:
+        loc = self._find(name)
+        if loc is None:
+            raise FileNotFoundError(f"{name} not in pack {self.path}")
+        return loc
+
+    def _shard(self, shard: int) -> mmap.mmap:
+        mm = self._shards.get(shard)
+        if mm is None:
+            with open(os.path.join(self.path, SHARD_PATTERN % shard), "rb") as f:
+                mm = self._shards[shard] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return mm
+
+    def names(self, suffix: Optional[str] = None) -> List[str]:
+        """Sorted payload names (the index is written in name order)."""
+        out = self._idx[self._names:].decode("utf-8").split("\n")[:-1] if self._n else []
+        if suffix is not None:
+            out = [n for n in out if n.lower().endswith(suffix)]
+        return out
+
+    def exists(self, name: str) -> bool:
+        return self._find(name) is not None
+
+    def size(self, name: str) -> int:
+        return self._locate(name)[2]
+
+    def view(self, name: str) -> memoryview:
+        """Zero-copy view of a record; valid until close()."""
+        shard, offset, length = self._locate(name)
+        return memoryview(self._shard(shard))[offset:offset + length]
+
+    def read(self, name: str) -> bytes:
+        shard, offset, length = self._locate(name)
+        return self._shard(shard)[offset:offset + length]
+
+    def open(self, name: str) -> BinaryIO:
+        return io.BufferedReader(_ViewReader(self.view(name)))
+
+    def items(self) -> Iterator[Tuple[str, memoryview]]:
+        """Every record in storage order (shard by shard, front to back): sequential reads."""
+        entries = sorted(self._entry(i) for i in range(self._n))
+        for shard, offset, length, name in entries:
+            yield name, memoryview(self._shard(shard))[offset:offset + length]
+
+    def close(self) -> None:
+        for mm in [self._idx, *self._shards.values()]:
+            try:
+                mm.close()
+            except BufferError:
+                pass  # a view() is still alive; the map goes when it does
+        self._shards = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def open_store(path: str) -> Union[DirStore, PackStore]:
+    return PackStore(path) if is_pack(path) else DirStore(path)
+
+# ---------------------------
+# Writers
+# ---------------------------
+
+class DirWriter:
+    """Write payload files into a plain directory (PackWriter's API)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        ensure_dir(path)
+
+    def names(self, suffix: Optional[str] = None) -> List[str]:
+        return DirStore(self.path).names(suffix)
+
+    def has(self, name: str) -> bool:
+        return os.path.isfile(os.path.join(self.path, name))
+
+    def put(self, name: str, data: bytes) -> None:
+        # A new file renamed into place: never write through a hard link another tree shares
+        dst = os.path.join(self.path, name)
+        tmp = f"{dst}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, dst)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def put_file(self, name: str, src: str, keep: bool = False) -> None:
+        """Move src into place (hard-link it when keep, e.g. when other trees need it too)."""
+        dst = os.path.join(self.path, name)
+        if keep:
+            link_or_copy(src, dst)
+        elif os.path.abspath(src) != os.path.abspath(dst):
+            os.replace(src, dst)
+
+    def copy_from(self, store, name: str, method: str = "link") -> None:
+        """Place `name` from another store: hard link / reflink / copy for directories, bytes for packs."""
+        if isinstance(store, DirStore):
+            place = {"link": link_or_copy, "reflink": reflink_or_copy, "copy": shutil.copy}[method]
+            src, dst = store.path_of(name), os.path.join(self.path, name)
+            if method != "link" and os.path.exists(dst) and os.path.abspath(src) != os.path.abspath(dst):
+                os.remove(dst)  # copy into a new inode, not through an existing (possibly shared) one
+            place(src, dst)
+        else:
+            self.put(name, store.view(name))
+
+    def delete(self, name: str) -> None:
+        os.remove(os.path.join(self.path, name))
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _write_index(path: str, entries: Dict[str, Tuple[int, int, int]]) -> None:
+    names = sorted(entries)
+    n_slots = 8
+    while n_slots < 2 * len(names):
+        n_slots *= 2
+    mask = n_slots - 1
+    slots = bytearray(n_slots * _SLOT.size)
+    entry_bytes = bytearray(len(names) * _ENTRY.size)
+    blob = bytearray()
+    for i, name in enumerate(names):
+        key = name.encode("utf-8")
+        shard, offset, length = entries[name]
+        _ENTRY.pack_into(entry_bytes, i * _ENTRY.size, shard, len(key), offset, length, len(blob))
+        blob += key + b"\n"
+        slot = _slot_of(key, mask)
+        while _SLOT.unpack_from(slots, slot * _SLOT.size)[0]:
+            slot = (slot + 1) & mask
+        _SLOT.pack_into(slots, slot * _SLOT.size, i + 1)
+    tmp = os.path.join(path, INDEX_FILE + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(names), n_slots))
+        f.write(slots)
+        f.write(entry_bytes)
+        f.write(blob)
+    os.replace(tmp, os.path.join(path, INDEX_FILE))
+
+def _scan_shard(path: str, shard: int, entries: Dict[str, Tuple[int, int, int]]) -> int:
+    """Index every complete record of a shard into entries; returns the end of the last one."""
+    good = 0
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        while True:
+            header = f.readline()
+            if not header.endswith(b"\n"):
+                return good
+            try:
+                name, length = header[:-1].decode("utf-8").split("\t")
+            except ValueError:
+                return good
+            if length == "-":  # tombstone of delete()
+                entries.pop(name, None)
+                good = f.tell()
+                continue
+            offset = f.tell()
+            end = offset + int(length) + 1
+            if end > size:
+                return good
+            f.seek(end - 1)
+            if f.read(1) != b"\n":
+                return good
+            entries[name] = (shard, offset, int(length))
+            good = end
+
+class PackWriter:
+    """
+    Append records to a pack; the index is (re)written on close(). Thread-safe.
+
+    append=False starts an empty pack (side files in the directory are kept);
+    append=True re-indexes the existing shards first (a torn record at the end of an
+    interrupted run is cut off) and writes that index right away. Overwritten and
+    deleted records stay in the shards until the pack is rebuilt (pack_dir(unpacked)).
+    """
+
+    def __init__(self, path: str, append: bool = False, shard_bytes: int = DEFAULT_SHARD_BYTES):
+        self.path = path
+        self.shard_bytes = shard_bytes
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[int, int, int]] = {}
+        ensure_dir(path)
+        shards = sorted(glob.glob(os.path.join(path, "shard-*.dat")))
+        if not append:
+            for p in shards:
+                os.remove(p)
+            shards = []
+        self._shard = 0
+        for p in shards:
+            self._shard = int(os.path.basename(p)[6:-4])
+            end = _scan_shard(p, self._shard, self._entries)
+            if end < os.path.getsize(p):
+                with open(p, "r+b") as f:
+                    f.truncate(end)
+        self._f = open(os.path.join(path, SHARD_PATTERN % self._shard), "ab")
+        _write_index(path, self._entries)
+
+    def names(self, suffix: Optional[str] = None) -> List[str]:
+        out = sorted(self._entries)
+        if suffix is not None:
+            out = [n for n in out if n.lower().endswith(suffix)]
+        return out
+
+    def has(self, name: str) -> bool:
+        return name in self._entries
+
+    def _header(self, name: str, length: Union[int, str]) -> bytes:
+        if "\t" in name or "\n" in name:
+            raise ValueError(f"pack record names cannot contain tabs or newlines: {name!r}")
+        return f"{name}\t{length}\n".encode("utf-8")
+
+    def _roll(self) -> None:
+        if self._f.tell() >= self.shard_bytes:
+            self._f.close()
+            self._shard += 1
+            self._f = open(os.path.join(self.path, SHARD_PATTERN % self._shard), "ab")
+
+    def put(self, name: str, data: bytes) -> None:
+        header = self._header(name, len(data))
+        with self._lock:
+            offset = self._f.tell() + len(header)
+            self._f.write(header)
+            self._f.write(data)
+            self._f.write(b"\n")
+            self._f.flush()
+            self._entries[name] = (self._shard, offset, len(data))
+            self._roll()
+
+    def put_file(self, name: str, src: str, keep: bool = False) -> None:
+        """Append the contents of file src (removed afterwards unless keep)."""
+        with open(src, "rb") as f_in:
+            length = os.fstat(f_in.fileno()).st_size
+            header = self._header(name, length)
+            with self._lock:
+                offset = self._f.tell() + len(header)
+                self._f.write(header)
+                shutil.copyfileobj(f_in, self._f, 1 << 20)
+                self._f.write(b"\n")
+                self._f.flush()
+                self._entries[name] = (self._shard, offset, length)
+                self._roll()
+        if not keep:
+            os.remove(src)
+
+    def copy_from(self, store, name: str, method: str = "copy") -> None:
+        """Append `name` from another store (a no-op when it is this very pack)."""
+        if isinstance(store, PackStore) and os.path.samefile(store.path, self.path) and name in self._entries:
+            return
+        self.put(name, store.view(name))
+
+    def delete(self, name: str) -> None:
+        header = self._header(name, "-")
+        with self._lock:
+            if self._entries.pop(name, None) is not None:
+                self._f.write(header)
+                self._f.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._f.closed:
+                return
+            self._f.close()
+            _write_index(self.path, self._entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def open_writer(path: str, pack: Optional[bool] = None, append: bool = False) -> Union[DirWriter, PackWriter]:
+    """PackWriter if pack (pack=None: if path already is a pack), else DirWriter. append only applies to packs."""
+    if pack is None:
+        pack = is_pack(path)
+    return PackWriter(path, append=append) if pack else DirWriter(path)
+
+# ---------------------------
+# Converters
+# ---------------------------
+
+def pack_dir(src: str, dst: str, shard_bytes: int = DEFAULT_SHARD_BYTES) -> int:
+    """Pack the payload files of directory src into dst (side files are copied). Returns the record count."""
+    store = DirStore(src)
+    names = store.names()
+    with PackWriter(dst, shard_bytes=shard_bytes) as w:
+        for name in names:
+            w.put_file(name, store.path_of(name), keep=True)
+    for name in _side_files(src):
+        shutil.copy2(os.path.join(src, name), os.path.join(dst, name))
+    return len(names)
+
+def unpack_dir(src: str, dst: str) -> int:
+    """Write every record of pack src to directory dst as a file (side files are copied)."""
+    n = 0
+    with PackStore(src) as store, DirWriter(dst) as w:
+        for name, data in store.items():
+            w.put(name, data)
+            n += 1
+    for name in _side_files(src):
+        shutil.copy2(os.path.join(src, name), os.path.join(dst, name))
+    return n
+
+def convert_tree(src: str, dst: str, unpack: bool = False, shard_bytes: int = DEFAULT_SHARD_BYTES) -> List[Tuple[str, int]]:
+    """
+    Mirror the directory tree src at dst, packing every directory that holds payload
+    files (or unpacking every pack); other files are copied as they are.
+    Returns (relative directory, files converted) per converted directory.
+    """
+    done = []
+    for dirpath, _, filenames in os.walk(src):
+        rel = os.path.relpath(dirpath, src)
+        out = os.path.normpath(os.path.join(dst, rel))
+        if unpack and is_pack(dirpath):
+            done.append((rel, unpack_dir(dirpath, out)))
+        elif not unpack and not is_pack(dirpath) and any(is_payload(n) for n in filenames):
+            done.append((rel, pack_dir(dirpath, out, shard_bytes=shard_bytes)))
+        else:
+            ensure_dir(out)
+            for name in filenames:
+                shutil.copy2(os.path.join(dirpath, name), os.path.join(out, name))
+    return done
+
+def main():
+    ap = argparse.ArgumentParser(description="Convert snapshot data directories to and from packs (shards + offset index).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    for cmd, what in (("pack", "directory -> pack"), ("unpack", "pack -> directory")):
+        p = sub.add_parser(cmd, help=what)
+        p.add_argument("src")
+        p.add_argument("dst")
+        p.add_argument("--recursive", action="store_true",
+                       help="Convert every data directory below src into the same relative path below dst")
+        if cmd == "pack":
+            p.add_argument("--shard-mb", type=int, default=DEFAULT_SHARD_BYTES >> 20,
+                           help=f"Start a new shard after this many MB (default: {DEFAULT_SHARD_BYTES >> 20})")
+    p = sub.add_parser("ls", help="List the records of a pack")
+    p.add_argument("src")
+    args = ap.parse_args()
+
+    if args.cmd == "ls":
+        with PackStore(args.src) as store:
+            for name in store.names():
+                print(f"{store.size(name):>12}  {name}")
+            print(f"[INFO] {len(store)} records")
+        return
+
+    if args.recursive:
+        done = convert_tree(args.src, args.dst, unpack=args.cmd == "unpack", shard_bytes=getattr(args, "shard_mb", 0) << 20)
+    elif args.cmd == "pack":
+        done = [(".", pack_dir(args.src, args.dst, shard_bytes=args.shard_mb << 20))]
+    else:
+        done = [(".", unpack_dir(args.src, args.dst))]
+    for rel, n in done:
+        print(f"[INFO] {args.cmd}ed {n} files: {os.path.normpath(os.path.join(args.src, rel))}")
+    print(f"[DONE] {len(done)} director{'y' if len(done) == 1 else 'ies'} converted into '{args.dst}'.")
+
+if __name__ == "__main__":
+    main()
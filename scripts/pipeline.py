@@ -0,0 +1,615 @@
+#!/usr/bin/env python3
+"""
+Download -> simplify -> token filter -> split/render as one streaming pipeline.
+
+The three-script workflow writes every event to raw/, rewrites it into simplified/ and
+reads it all back from there. Here events flow through generator stages connected by
+bounded queues, each stage in its own thread and with its own concurrency:
+
+  source    feed downloads (--download-workers threads), or an existing raw/ (--raw-dir)
+  simplify  simplify_event, label lookup and minification (--simplify-workers processes)
+  filter    token counting in windows (TokenCounter, --token-workers processes)
+  render    Markdown twins of kept events (--render-workers processes)
+
+Only kept events are staged under <out>/prepared; once every event has been seen they are
+split and placed by filter_and_split.write_filtered_outputs, so <out>/prepared is identical
+to the output of the three scripts. raw/ and simplified/ (with their manifests) are only
+written with --keep-raw / --keep-simplified. Raw events of at least --stream-min-mb are
+spooled to disk and simplified in bounded memory, as in simplify_misp.py.
+
+With --metrics every event's row collects its download, simplify, token and render
+figures across the stages (see metrics.py).
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures as fut
+import functools
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from tqdm import tqdm
+
+import json_codec
+from download_events import (
+    INDEX_URL_BOTVRIJ, INDEX_URL_CIRCL, HttpClient, append_manifest_row, compact_manifest, download_one,
+    interleave_by_host, list_feed_events, today_stamp,
+)
+from filter_and_split import (
+    OVERHEAD_CONFIG, _token_counter, calculate_safe_threshold, ensure_clean_dir,
+    get_label_for_file, render_markdown_to, write_filtered_outputs,
+)
+from metrics import Metrics, add_metrics_arguments, metrics_from_args
+from packstore import DirStore, open_store, open_writer
+from simplify_misp import (
+    DEFAULT_STREAM_MIN_MB, build_record, read_manifest, sha256_bytes, sha256_file, simplify_bytes,
+    simplify_file_streaming,
+)
+from token_counting import DEFAULT_BATCH_SIZE, DEFAULT_CACHE_PATH
+from token_daemon import DEFAULT_SOCKET
+from utils import count_attributes
+
+DEFAULT_QUEUE_SIZE = 256
+# filter_and_split.py tokenizes in windows of TOKENIZE_WINDOW_CHARS; here a window that
+# large would hold tokenization back until most of the feed is downloaded. Verdicts do
+# not depend on the window size.
+DEFAULT_WINDOW_CHARS = 1_000_000
+
+# ---------------------------
+# Stage plumbing
+# ---------------------------
+
+_END = object()
+
+class _Cancelled(Exception):
+    """Raised in a stage whose neighbour failed."""
+
+def bounded_map(fn: Callable[[Any], Any], items: Iterable, workers: int, executor_cls=fut.ThreadPoolExecutor) -> Iterator:
+    """
+    fn(item) for every item on `workers` threads (or processes), with at most 2 * workers
+    items in flight; results come in completion order. workers <= 1 runs inline.
+    """
+    if workers <= 1:
+        for item in items:
+            yield fn(item)
+        return
+    with executor_cls(max_workers=workers) as ex:
+        pending = set()
+        try:
+            for item in items:
+                pending.add(ex.submit(fn, item))
+                if len(pending) >= 2 * workers:
+                    done, pending = fut.wait(pending, return_when=fut.FIRST_COMPLETED)
+                    for f in done:
+                        yield f.result()
+            while pending:
+                done, pending = fut.wait(pending, return_when=fut.FIRST_COMPLETED)
+                for f in done:
+                    yield f.result()
+        finally:
+            for f in pending:
+                f.cancel()
+
+class Pipeline:
+    """
+    Runs a source iterable and a chain of stages (generator functions taking the previous
+    stage's output) with a bounded queue between each pair. The source and every stage but
+    the last run in their own thread; the last runs in the caller's. A failing stage stops
+    all the others and run() re-raises its exception.
+    """
+
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+
+    def _fail(self, error: BaseException) -> None:
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._stop.set()
+
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _drain(self, q: queue.Queue) -> Iterator:
+        while True:
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    raise _Cancelled()
+                continue
+            if item is _END:
+                return
+            yield item
+
+    def _feed(self, items: Iterable, q: queue.Queue) -> None:
+        it = iter(items)
+        try:
+            for item in it:
+                if not self._put(q, item):
+                    return
+            self._put(q, _END)
+        except _Cancelled:
+            pass
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()
+
+    def run(self, source: Iterable, *stages: Callable[[Iterator], Iterable]) -> None:
+        threads: List[threading.Thread] = []
+        upstream = source
+        for stage in stages:
+            q: queue.Queue = queue.Queue(self.queue_size)
+            t = threading.Thread(target=self._feed, args=(upstream, q), daemon=True)
+            t.start()
+            threads.append(t)
+            upstream = stage(self._drain(q))
+        try:
+            for _ in upstream:
+                pass
+        except _Cancelled:
+            pass
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for t in threads:
+                t.join()
+        if self._error is not None:
+            raise self._error
+
+# ---------------------------
+# Source: feed downloads or an existing raw/
+# ---------------------------
+
+class Spooled(NamedTuple):
+    """A raw event too large to pass around in memory; the file is removed after simplification if owned."""
+    path: str
+    owned: bool
+
+Payload = Union[bytes, Spooled]
+
+class _TeeWriter:
+    """
+    Writer handed to download_one: keeps each finished download for the calling thread
+    (bytes, or the spooled file if at least stream_min_bytes) and forwards it to `inner`,
+    the persisted raw/, if any.
+    """
+
+    def __init__(self, inner, spool_dir: str, stream_min_bytes: int):
+        self.inner = inner
+        self.spool_dir = spool_dir
+        self.stream_min_bytes = stream_min_bytes
+        self._local = threading.local()
+
+    def put_file(self, name: str, src: str, keep: bool = False) -> None:
+        if os.path.getsize(src) >= self.stream_min_bytes:
+            if self.inner is not None:
+                self.inner.put_file(name, src, keep=True)
+            spooled = os.path.join(self.spool_dir, f"{name}.{threading.get_ident()}.raw")
+            os.replace(src, spooled)
+            self._local.payload = Spooled(spooled, True)
+            return
+        with open(src, "rb") as f:
+            self._local.payload = f.read()
+        if self.inner is not None:
+            self.inner.put_file(name, src)
+        else:
+            os.remove(src)
+
+    def take(self) -> Optional[Payload]:
+        payload, self._local.payload = getattr(self._local, "payload", None), None
+        return payload
+
+def download_source(
+    entries: List[Dict[str, Any]],
+    spool_dir: str,
+    stream_min_bytes: int,
+    workers: int,
+    client: HttpClient,
+    raw_writer=None,
+    raw_manifest=None,
+    metrics: Optional[Metrics] = None,
+) -> Iterator[Tuple[str, Payload, Dict[str, Any]]]:
+    """
+    Download entries on `workers` threads and yield (filename, payload, manifest row) as
+    they complete. With raw_writer/raw_manifest, raw/ and its manifest rows are written
+    as download_events.py writes them.
+    """
+    metrics = metrics or Metrics("pipeline")
+    tee = _TeeWriter(raw_writer, spool_dir, stream_min_bytes)
+
+    def fetch(entry: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Payload], float]:
+        start = time.perf_counter()
+        res = download_one(entry["url"], spool_dir, client=client, writer=tee)
+        seconds = time.perf_counter() - start
+        metrics.add("download", seconds)
+        if "error" not in res and entry.get("timestamp") is not None:
+            res["timestamp"] = entry["timestamp"]
+        return res, tee.take(), seconds
+
+    for res, payload, seconds in bounded_map(fetch, interleave_by_host(entries), workers):
+        if raw_manifest is not None:
+            append_manifest_row(raw_manifest, res)
+        if "error" in res:
+            print(f"[ERR] {res['filename']}: {res['error']}")
+            metrics.event(res["filename"], url=res["url"], status="download_error", seconds=seconds)
+            continue
+        metrics.note(res["filename"], url=res["url"], download_s=seconds, seconds=seconds)
+        yield res["filename"], payload, res
+
+def _read_payload(store, name: str, spool_dir: str, stream_min_bytes: int) -> Payload:
+    if store.size(name) < stream_min_bytes:
+        return store.read(name)
+    if isinstance(store, DirStore):
+        return Spooled(store.path_of(name), False)
+    spooled = os.path.join(spool_dir, f"{name}.raw")
+    with store.open(name) as f_in, open(spooled, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out, 1 << 20)
+    return Spooled(spooled, True)
+
+def store_source(
+    raw_dir: str, spool_dir: str, stream_min_bytes: int, metrics: Optional[Metrics] = None
+) -> Iterator[Tuple[str, Payload, Dict[str, Any]]]:
+    """Yield (filename, payload, manifest row) for every event of an existing raw/ (a directory or a pack)."""
+    metrics = metrics or Metrics("pipeline")
+    lookup = {row["filename"]: row for row in read_manifest(os.path.join(raw_dir, "manifest.jsonl")) if "filename" in row}
+    with open_store(raw_dir) as store:
+        for name in store.names(".json"):
+            start = time.perf_counter()
+            payload = _read_payload(store, name, spool_dir, stream_min_bytes)
+            seconds = time.perf_counter() - start
+            metrics.add("read", seconds)
+            metrics.note(name, seconds=seconds)
+            yield name, payload, lookup.get(name, {})
+
+# ---------------------------
+# Stages
+# ---------------------------
+
+class Simplified(NamedTuple):
+    filename: str
+    record: Optional[Dict[str, Any]]   # simplified/manifest.jsonl row; None if skipped or failed
+    message: Optional[str]
+    data: Optional[bytes]              # simplified JSON, as simplify_misp.py writes it
+    label_id: Optional[str]            # None: unlabeled, dropped before the token filter
+    text: Optional[str]                # minified JSON the tokens are counted on
+    stats: Dict[str, Any]              # metrics row fields and per-stage "timings" (see simplify_misp.simplify_one)
+
+def simplify_task(task: Tuple[str, Payload, Dict[str, Any], bool, int, bool]) -> Simplified:
+    """
+    simplify_misp.simplify_one on an in-memory (or spooled) raw event, followed by what
+    filter_and_split.py does with the output: parse it, look up its label and minify it.
+    """
+    filename, payload, meta, keep_to_ids, truncate_long, compact = task
+    start = time.perf_counter()
+    timings: Dict[str, float] = {}
+    stats: Dict[str, Any] = {"timings": timings}
+
+    def done(status: Optional[str] = None) -> Dict[str, Any]:
+        if status is not None:
+            stats["status"] = status
+        stats["seconds"] = time.perf_counter() - start
+        return stats
+
+    try:
+        t = time.perf_counter()
+        if isinstance(payload, Spooled):
+            stats["bytes"] = os.path.getsize(payload.path)
+            with open(payload.path, "rb") as f_in:
+                source_sha256 = sha256_file(f_in)
+            timings["hash"] = time.perf_counter() - t
+            t = time.perf_counter()
+            out_path = payload.path + ".simplified"
+            try:
+                out_sha256 = simplify_file_streaming(payload.path, out_path, keep_to_ids, truncate_long, compact)
+                if out_sha256 is None:
+                    out_bytes = None
+                else:
+                    with open(out_path, "rb") as f:
+                        out_bytes = f.read()
+            finally:
+                if os.path.exists(out_path):
+                    os.remove(out_path)
+            timings["stream"] = time.perf_counter() - t
+        else:
+            stats["bytes"] = len(payload)
+            source_sha256 = sha256_bytes(payload)
+            timings["hash"] = time.perf_counter() - t
+            out_bytes = simplify_bytes(payload, keep_to_ids, truncate_long, compact, stats=stats)
+            out_sha256 = None if out_bytes is None else sha256_bytes(out_bytes)
+        if out_bytes is None:
+            return Simplified(filename, None, f"[WARN] Skipping {filename}: no valid 'Event' to simplify.",
+                              None, None, None, done("skipped"))
+        stats["bytes_out"] = len(out_bytes)
+        record = build_record(filename, out_sha256, source_sha256, meta)
+        t = time.perf_counter()
+        data = json_codec.loads(out_bytes, errors="strict")
+        timings["reparse"] = time.perf_counter() - t
+        if "attributes" not in stats:  # streamed
+            stats["attributes"] = count_attributes(data)
+    except Exception as e:
+        return Simplified(filename, None, f"[ERR] Failed to process {filename}: {e}", None, None, None, done("error"))
+    finally:
+        if isinstance(payload, Spooled) and payload.owned:
+            os.remove(payload.path)
+
+    lab = get_label_for_file(filename, {filename: record}, data)
+    if not lab:
+        return Simplified(filename, record, None, out_bytes, None, None, done("unlabeled"))
+    t = time.perf_counter()
+    text = json_codec.dumps(data)
+    timings["minify"] = time.perf_counter() - t
+    return Simplified(filename, record, None, out_bytes, lab[0], text, done())
+
+def simplify_stage(items: Iterator, workers: int, keep_to_ids: bool, truncate_long: int, compact: bool) -> Iterator[Simplified]:
+    tasks = ((fn, payload, meta, keep_to_ids, truncate_long, compact) for fn, payload, meta in items)
+    return bounded_map(simplify_task, tasks, workers, fut.ProcessPoolExecutor)
+
+class FilterStage:
+    """
+    Token filter over simplified events, tokenized in windows of ~window_chars.
+    Kept events are staged in staging_json and passed on as (filename, simplified JSON);
+    the counts and (filename, label_id) lists write_filtered_outputs needs are collected
+    here, as are the simplified outputs when they are persisted.
+    With enabled `metrics`, kept events are counted exactly (count_capped, same verdicts)
+    and their rows are completed by render_stage; all others get theirs here.
+    """
+
+    def __init__(self, counter, threshold: int, staging_json: str, simplified_writer=None,
+                 window_chars: int = DEFAULT_WINDOW_CHARS, total: Optional[int] = None,
+                 metrics: Optional[Metrics] = None):
+        self.metrics = metrics or Metrics("pipeline")
+        self.counter = counter
+        self.threshold = threshold
+        self.window_chars = window_chars
+        self.staging_json = staging_json
+        self.simplified_writer = simplified_writer
+        self.total = total
+        self.total_files = 0
+        self.labeled_candidates: List[Tuple[str, str]] = []
+        self.kept_pairs: List[Tuple[str, str]] = []
+        self.records: List[Dict[str, Any]] = []
+
+    def _window(self, pending: List[Simplified]) -> Iterator[Tuple[str, bytes]]:
+        texts = [ev.text for ev in pending]
+        with self.metrics.stage("tokenize"):
+            if self.metrics.enabled:
+                tokens = self.counter.count_capped(texts, self.threshold)
+                verdicts = [n is not None for n in tokens]
+            else:
+                verdicts = self.counter.within_limit(texts, self.threshold)
+                tokens = [None] * len(texts)
+        for ev, fits, n in zip(pending, verdicts, tokens):
+            if fits:
+                self.kept_pairs.append((ev.filename, ev.label_id))
+                with open(os.path.join(self.staging_json, ev.filename), "wb") as f:
+                    f.write(ev.data)
+                self.metrics.note(ev.filename, tokens=n)
+                yield ev.filename, ev.data
+            else:
+                self.metrics.event(ev.filename, status="dropped", tokens=None)
+
+    def _record(self, ev: Simplified) -> None:
+        """Stage timings of ev, and its row fields so far."""
+        if not self.metrics.enabled:
+            return
+        fields = dict(ev.stats)
+        timings = fields.pop("timings")
+        self.metrics.add_timings(timings)
+        self.metrics.note(ev.filename, label=ev.label_id, **fields, **{f"{k}_s": v for k, v in timings.items()})
+
+    def __call__(self, items: Iterator[Simplified]) -> Iterator[Tuple[str, bytes]]:
+        pending: List[Simplified] = []
+        pending_chars = 0
+        for ev in tqdm(items, total=self.total, desc="Simplify + filter"):
+            if ev.message:
+                print(ev.message)
+            self._record(ev)
+            if ev.record is None or ev.label_id is None:
+                self.metrics.event(ev.filename)
+            if ev.record is None:
+                continue
+            self.total_files += 1
+            if self.simplified_writer is not None:
+                self.simplified_writer.put(ev.filename, ev.data)
+                self.records.append(ev.record)
+            if ev.label_id is None:
+                continue
+            self.labeled_candidates.append((ev.filename, ev.label_id))
+            pending.append(ev)
+            pending_chars += len(ev.text)
+            if pending_chars >= self.window_chars:
+                yield from self._window(pending)
+                pending = []
+                pending_chars = 0
+        if pending:
+            yield from self._window(pending)
+
+def render_task(task: Tuple[str, str, bytes]) -> Tuple[str, float]:
+    staging_md, filename, data = task
+    start = time.perf_counter()
+    render_markdown_to(staging_md, filename, json_codec.loads(data, errors="strict"))
+    return filename, time.perf_counter() - start
+
+def render_stage(items: Iterator[Tuple[str, bytes]], staging_md: str, workers: int,
+                 metrics: Optional[Metrics] = None) -> Iterator[str]:
+    metrics = metrics or Metrics("pipeline")
+    tasks = ((staging_md, fn, data) for fn, data in items)
+    for filename, seconds in bounded_map(render_task, tasks, workers, fut.ProcessPoolExecutor):
+        metrics.add("render", seconds)
+        metrics.event(filename, status="kept", render_s=seconds, seconds=seconds)
+        yield filename
+
+# ---------------------------
+# Driver
+# ---------------------------
+
+def run_pipeline(args, metrics: Optional[Metrics] = None) -> None:
+    metrics = metrics or Metrics("pipeline")
+    prepared = os.path.join(args.out, "prepared")
+    stream_min_bytes = int(args.stream_min_mb * 1024 * 1024)
+
+    print(f"Loading reference tokenizer: '{args.tokenizer_model}'...")
+    threshold = calculate_safe_threshold(args.max_context_length, OVERHEAD_CONFIG)
+    counter = _token_counter(args, args.tokenizer_model)
+
+    os.makedirs(args.out, exist_ok=True)
+    ensure_clean_dir(prepared)
+    staging_json = os.path.join(prepared, ".json_staging")
+    staging_md = os.path.join(prepared, ".md_staging")
+    os.makedirs(staging_json)
+    os.makedirs(staging_md)
+    spool_dir = tempfile.mkdtemp(prefix=".spool-", dir=args.out)
+
+    raw_dir = os.path.join(args.out, "raw")
+    raw_writer = raw_manifest = simplified_writer = None
+    entries: Optional[List[Dict[str, Any]]] = None
+    try:
+        if args.raw_dir:
+            print(f"[INFO] Reading raw events from {args.raw_dir}")
+            source = store_source(args.raw_dir, spool_dir, stream_min_bytes, metrics)
+            with open_store(args.raw_dir) as store:
+                total = len(store.names(".json"))
+        else:
+            print("[INFO] Listing events...")
+            # An event listed by several feeds is fetched once: the last listing, whose
+            # manifest row simplify_misp.py would use as well.
+            with metrics.stage("list"):
+                listed = list_feed_events(args.index_url or [INDEX_URL_CIRCL, INDEX_URL_BOTVRIJ])
+            by_name = {e["filename"]: e for e in listed}
+            entries = sorted(by_name.values(), key=lambda e: e["url"])
+            total = len(entries)
+            if args.keep_raw:
+                raw_writer = open_writer(raw_dir, pack=args.pack or None, append=True)
+                raw_manifest = open(os.path.join(raw_dir, "manifest.jsonl"), "a", encoding="utf-8")
+            client = HttpClient(max_workers=args.download_workers, max_per_host=args.max_per_host)
+            source = download_source(entries, spool_dir, stream_min_bytes, args.download_workers, client,
+                                     raw_writer, raw_manifest, metrics)
+            print(f"[INFO] Found {total} events.")
+        if args.keep_simplified:
+            simplified_writer = open_writer(os.path.join(args.out, "simplified"), pack=args.pack or None)
+
+        filter_stage = FilterStage(counter, threshold, staging_json, simplified_writer,
+                                   window_chars=args.token_window_chars, total=total, metrics=metrics)
+        with counter:
+            Pipeline(args.queue_size).run(
+                source,
+                functools.partial(simplify_stage, workers=args.simplify_workers, keep_to_ids=not args.drop_to_ids,
+                                  truncate_long=args.truncate_long, compact=args.compact),
+                filter_stage,
+                functools.partial(render_stage, staging_md=staging_md, workers=args.render_workers, metrics=metrics),
+            )
+            print(counter.report())
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+        if raw_manifest is not None:
+            raw_manifest.close()
+        if raw_writer is not None:
+            raw_writer.close()
+        if simplified_writer is not None:
+            simplified_writer.close()
+
+    if raw_manifest is not None:
+        n_rows = compact_manifest(raw_manifest.name, [e["url"] for e in entries])
+        print(f"[DONE] Wrote manifest: {raw_manifest.name} ({n_rows} rows)")
+    if simplified_writer is not None:
+        mani_path = os.path.join(args.out, "simplified", "manifest.jsonl")
+        with open(mani_path, "w", encoding="utf-8") as f:
+            for record in sorted(filter_stage.records, key=lambda r: r["filename"]):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"[DONE] Wrote manifest: {mani_path} ({len(filter_stage.records)} rows)")
+
+    # filter_and_split.py scans in filename order; the split depends on it.
+    with metrics.stage("place"):
+        write_filtered_outputs(DirStore(staging_json), prepared, sorted(filter_stage.kept_pairs),
+                               sorted(filter_stage.labeled_candidates), filter_stage.total_files, args,
+                               staging_md, json_method="link")
+    shutil.rmtree(staging_json)
+    shutil.rmtree(staging_md)
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Download, simplify, token-filter and split/render MISP events in one streaming pass.\n"
+                    "<out>/prepared is identical to running download_events.py, simplify_misp.py and\n"
+                    "filter_and_split.py in turn; raw/ and simplified/ are only written on request.",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    ap.add_argument("--out", default=f"snapshots_both/{today_stamp()}",
+                    help="Output snapshot directory (will create <out>/prepared)")
+    ap.add_argument("--index-url", action="append", default=None,
+                    help="Feed index URL (repeatable). Defaults to the CIRCL and botvrij OSINT feeds.")
+    ap.add_argument("--raw-dir", default=None,
+                    help="Process an existing raw/ directory or pack (with its manifest.jsonl) instead of downloading.")
+    ap.add_argument("--keep-raw", action="store_true", help="Also write <out>/raw and its manifest, as download_events.py does.")
+    ap.add_argument("--keep-simplified", action="store_true",
+                    help="Also write <out>/simplified and its manifest, as simplify_misp.py does.")
+    ap.add_argument("--pack", action="store_true",
+                    help="Write every output directory as a pack (shards + offset index, see packstore.py).")
+    ap.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                    help=f"Events buffered between two stages (default: {DEFAULT_QUEUE_SIZE}).")
+
+    ap.add_argument("--download-workers", type=int, default=16, help="Parallel download threads (default: 16).")
+    ap.add_argument("--max-per-host", type=int, default=None,
+                    help="Upper bound for the adaptive per-host in-flight limit (default: --download-workers).")
+
+    ap.add_argument("--simplify-workers", type=int, default=1,
+                    help="Simplify in N worker processes (default: 1, in the stage's thread).")
+    ap.add_argument("--truncate-long", type=int, default=512,
+                    help="Truncate very long string values to N characters (default: 512). Use 0 to disable.")
+    ap.add_argument("--drop-to-ids", action="store_true", help="Drop the 'to_ids' field from attributes.")
+    ap.add_argument("--compact", action="store_true", help="Write minified JSON instead of indent=4.")
+    ap.add_argument("--stream-min-mb", type=float, default=DEFAULT_STREAM_MIN_MB,
+                    help=f"Spool raw events of at least this many MB to disk and simplify them in bounded memory\n"
+                         f"(default: {DEFAULT_STREAM_MIN_MB}).")
+
+    ap.add_argument("--tokenizer-model", default="meta-llama/Meta-Llama-3-8B-Instruct",
+                    help="HF model name for tokenization.")
+    ap.add_argument("--max-context-length", type=int, default=8192, help="Fixed context window.")
+    ap.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                    help=f"Documents per tokenizer call (default: {DEFAULT_BATCH_SIZE}).")
+    ap.add_argument("--token-workers", dest="workers", type=int, default=1,
+                    help="Tokenize in N worker processes, each loading the tokenizer once (default: 1).")
+    ap.add_argument("--token-window-chars", type=int, default=DEFAULT_WINDOW_CHARS,
+                    help=f"Characters of minified JSON tokenized per window (default: {DEFAULT_WINDOW_CHARS:,}).")
+    ap.add_argument("--token-cache", default=DEFAULT_CACHE_PATH,
+                    help=f"SQLite token-count cache (default: {DEFAULT_CACHE_PATH}).")
+    ap.add_argument("--no-token-cache", action="store_true", help="Neither read nor update the token count cache.")
+    ap.add_argument("--token-daemon", nargs="?", const=DEFAULT_SOCKET, default=None, metavar="SOCKET",
+                    help=f"Count tokens through a running token_daemon.py (default socket: {DEFAULT_SOCKET}).")
+
+    ap.add_argument("--render-workers", type=int, default=1,
+                    help="Render Markdown twins in N worker processes (default: 1, in the caller's thread).")
+    ap.add_argument("--split", action="store_true", help="Perform a stratified train/test split.")
+    ap.add_argument("--test-size", type=float, default=0.3, help="Test set ratio when --split is used (default: 0.3).")
+    ap.add_argument("--seed", type=int, default=42, help="Random seed for the stratified split (default: 42).")
+    add_metrics_arguments(ap)
+    args = ap.parse_args()
+
+    if args.raw_dir and not os.path.exists(os.path.join(args.raw_dir, "manifest.jsonl")):
+        raise SystemExit(f"Error: manifest.jsonl not found in '{args.raw_dir}'")
+    metrics = metrics_from_args("pipeline", args)
+    run_pipeline(args, metrics)
+    print(f"\n[DONE] Pipeline complete: {os.path.join(args.out, 'prepared')}")
+    metrics.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Declarative projections of MISP events.
+
+A spec says which keys of Event / Attribute / Object / ... to keep, under which
+condition, and how nested lists are projected. compile_spec() turns it once into
+plain Python functions (one per node, no interpretation at call time), so every
+simplifier in utils.py and simplify_misp.py is a named spec over the same engine.
+
+    TAG = node(field("name", when="truthy"), require={"name": "truthy"})
+    SPEC = spec("tags-only", node(keep("date", "info"), each("Tag", TAG, source="or", when="nonempty")))
+    project = compile_spec(SPEC)        # project(raw) -> {"Event": {...}} or None
+
+Field options
+  pick    "present": first source key present in the input (skipped if none, unless default)
+          "get":     x.get(k1) or x.get(k2) ... (or default)
+  when    "always" | "not_none" | "truthy" | "nonempty" (not None, [] or "")
+  unless  skip the field if this key is already in the output
+List sources (each)
+  "list"     the value if it is a list, else the key is omitted
+  "or"       x.get(k1) or x.get(k2) ...; anything but a list counts as []
+  "as_list"  None -> [], a list as is, any other value -> [value]
+Non-dict list items are always skipped. each(..., batch=fn) calls fn(items) on the
+projected list (to edit all items in one pass) before it is stored.
+"""
+
+from __future__ import annotations
+
+import itertools
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_PICKS = ("present", "get")
+_WHENS = ("always", "not_none", "truthy", "nonempty")
+_SOURCES = ("list", "or", "as_list")
+_EMPTY = (None, [], "")
+_MISSING = object()
+
+# --------------------------------- Spec builders ---------------------------------
+
+def field(
+    out: str,
+    *src: str,
+    pick: str = "present",
+    when: str = "always",
+    default: Any = _MISSING,
+    transform: Optional[Callable[[Any, Dict[str, Any]], Any]] = None,
+    unless: Optional[str] = None,
+) -> Dict[str, Any]:
+    """One output key read from src keys (default: the same key). transform(value, input_node)."""
+    if pick not in _PICKS or when not in _WHENS:
+        raise ValueError(f"field {out!r}: unknown pick/when {pick!r}/{when!r}")
+    return {"kind": "field", "out": out, "src": src or (out,), "pick": pick, "when": when,
+            "default": default, "transform": transform, "unless": unless}
+
+def keep(*keys: str, when: str = "always") -> List[Dict[str, Any]]:
+    """Copy each key if present, in this order."""
+    return [field(k, when=when) for k in keys]
+
+def const(out: str, value: Any, unless: Optional[str] = None) -> Dict[str, Any]:
+    """A fixed value (e.g. a default appended when the key is missing: unless=out)."""
+    return {"kind": "const", "out": out, "value": value, "unless": unless}
+
+def each(
+    out: str,
+    item: Dict[str, Any],
+    *src: str,
+    source: str = "list",
+    when: str = "always",
+    batch: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+) -> Dict[str, Any]:
+    """A list of projected dict items; items for which `item` yields nothing are dropped."""
+    if source not in _SOURCES or when not in ("always", "nonempty"):
+        raise ValueError(f"each {out!r}: unknown source/when {source!r}/{when!r}")
+    return {"kind": "each", "out": out, "src": src or (out,), "item": item, "source": source, "when": when,
+            "batch": batch}
+
+def node(
+    *fields: Any,
+    require: Optional[Dict[str, str]] = None,
+    keep_if: Optional[Callable[[Dict[str, Any], Dict[str, Any]], bool]] = None,
+    drop_empty: bool = False,
+) -> Dict[str, Any]:
+    """
+    A projected dict. fields may be nested lists (as returned by keep()).
+    The node yields nothing when a `require` key of the output fails its test
+    ("truthy" | "not_none"), when keep_if(input, output) is false, or, with
+    drop_empty, when the output is {}.
+    """
+    flat: List[Dict[str, Any]] = []
+    for f in fields:
+        flat.extend(f if isinstance(f, list) else [f])
+    return {"fields": flat, "require": dict(require or {}), "keep_if": keep_if, "drop_empty": drop_empty}
+
+def spec(
+    name: str,
+    event: Dict[str, Any],
+    root: str = "Event",
+    strict_root: bool = False,
+    post: Optional[Callable[[Dict[str, Any]], Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Whole-event projection: raw -> {root: event(raw[root])}, or None without raw[root].
+    A falsy raw[root] is read as {}; with strict_root anything but a dict gives None.
+    post, if set, is applied to the result.
+    """
+    return {"name": name, "event": event, "root": root, "strict_root": strict_root, "post": post}
+
+# ----------------------------------- Compiler ------------------------------------
+
+_CONDITIONS = {
+    "always": None,
+    "not_none": "{v} is not None",
+    "truthy": "{v}",
+    "nonempty": "{v} not in _EMPTY",
+}
+
+class _Compiler:
+    def __init__(self, name: str):
+        self.name = name.replace("-", "_")
+        self.ns: Dict[str, Any] = {"_EMPTY": _EMPTY, "_MISSING": _MISSING}
+        self.chunks: List[str] = []
+        self._ids = itertools.count()
+        self._nodes: Dict[int, Tuple[str, bool]] = {}  # id(node) -> emitted function, shared nodes once
+
+    def bind(self, value: Any, prefix: str) -> str:
+        name = f"_{prefix}{next(self._ids)}"
+        self.ns[name] = value
+        return name
+
+    def node(self, spec_node: Dict[str, Any]) -> Tuple[str, bool]:
+        """Emit a function for spec_node; returns (name, may_yield_none)."""
+        if id(spec_node) in self._nodes:
+            return self._nodes[id(spec_node)]
+        fn = f"_{self.name}_{next(self._ids)}"
+        body: List[str] = ["out = {}"]
+        for f in spec_node["fields"]:
+            body.extend(self._field(f))
+        may_drop = False
+        for key, test in spec_node["require"].items():
+            if test == "truthy":
+                body.append(f"if not out.get({key!r}): return None")
+            elif test == "not_none":
+                body.append(f"if out.get({key!r}) is None: return None")
+            else:
+                raise ValueError(f"require {key!r}: unknown test {test!r}")
+            may_drop = True
+        if spec_node["keep_if"] is not None:
+            body.append(f"if not {self.bind(spec_node['keep_if'], 'keep')}(x, out): return None")
+            may_drop = True
+        if spec_node["drop_empty"]:
+            body.append("if not out: return None")
+            may_drop = True
+        body.append("return out")
+        self.chunks.append(f"def {fn}(x):\n" + "".join(f"    {line}\n" for line in body))
+        self._nodes[id(spec_node)] = fn, may_drop
+        return fn, may_drop
+
+    def _field(self, f: Dict[str, Any]) -> List[str]:
+        out = f["out"]
+        if f["kind"] == "const":
+            lines = [f"out[{out!r}] = {self.bind(f['value'], 'const')}"]
+        elif f["kind"] == "each":
+            lines = self._each(f)
+        else:
+            lines = self._scalar(f)
+        if f.get("unless"):
+            lines = [f"if {f['unless']!r} not in out:"] + ["    " + line for line in lines]
+        return lines
+
+    def _scalar(self, f: Dict[str, Any]) -> List[str]:
+        out, src, default = f["out"], f["src"], f["default"]
+        store: List[str] = []
+        if f["transform"] is not None:
+            store.append(f"v = {self.bind(f['transform'], 'transform')}(v, x)")
+        cond = _CONDITIONS[f["when"]]
+        store += [f"if {cond.format(v='v')}:", f"    out[{out!r}] = v"] if cond else [f"out[{out!r}] = v"]
+
+        if f["pick"] == "get":
+            expr = " or ".join(f"x.get({k!r})" for k in src)
+            if default is not _MISSING:
+                expr = f"{expr} or {self.bind(default, 'default')}"
+            return [f"v = {expr}"] + store
+        # pick == "present"
+        if len(src) == 1 and default is _MISSING:
+            if len(store) == 1 and f["transform"] is None:
+                return [f"if {src[0]!r} in x:", f"    out[{out!r}] = x[{src[0]!r}]"]
+            return [f"if {src[0]!r} in x:", f"    v = x[{src[0]!r}]"] + ["    " + s for s in store]
+        lines: List[str] = []
+        for i, k in enumerate(src):
+            lines += [f"{'if' if i == 0 else 'elif'} {k!r} in x:", f"    v = x[{k!r}]"]
+        lines += ["else:", f"    v = {'_MISSING' if default is _MISSING else self.bind(default, 'default')}"]
+        return lines + ["if v is not _MISSING:"] + ["    " + s for s in store]
+
+    def _each(self, f: Dict[str, Any]) -> List[str]:
+        out, src = f["out"], f["src"]
+        item_fn, may_drop = self.node(f["item"])
+        if may_drop:
+            build = f"[r for i in v if isinstance(i, dict) and (r := {item_fn}(i)) is not None]"
+        else:
+            build = f"[{item_fn}(i) for i in v if isinstance(i, dict)]"
+        emit = [f"out[{out!r}] = items"] if f["when"] == "always" else ["if items:", f"    out[{out!r}] = items"]
+        if f["batch"] is not None:
+            emit.insert(0, f"{self.bind(f['batch'], 'batch')}(items)")
+        if f["source"] == "list":
+            return [f"v = x.get({src[0]!r})", "if isinstance(v, list):", f"    items = {build}"] + [
+                "    " + line for line in emit
+            ]
+        if f["source"] == "or":
+            lines = ["v = " + " or ".join(f"x.get({k!r})" for k in src), "if not isinstance(v, list): v = []"]
+        else:  # as_list
+            lines = [f"v = x.get({src[0]!r})", "v = [] if v is None else v if isinstance(v, list) else [v]"]
+        return lines + [f"items = {build}"] + emit
+
+def compile_spec(s: Dict[str, Any]) -> Callable[[Dict[str, Any]], Optional[Any]]:
+    """Compile a spec() into a projection function; its generated code is in .source."""
+    c = _Compiler(s["name"])
+    event_fn, _ = c.node(s["event"])
+    root = s["root"]
+    lines = ["def project(raw):", f"    if {root!r} not in raw: return None"]
+    if s["strict_root"]:
+        lines += [f"    e = raw[{root!r}]", "    if not isinstance(e, dict): return None"]
+    else:
+        lines += [f"    e = raw[{root!r}] or {{}}"]
+    result = f"{{{root!r}: {event_fn}(e)}}"
+    if s["post"] is not None:
+        result = f"{c.bind(s['post'], 'post')}({result})"
+    lines.append(f"    return {result}")
+    c.chunks.append("\n".join(lines) + "\n")
+
+    source = "\n".join(c.chunks)
+    exec(compile(source, f"<projection {s['name']}>", "exec"), c.ns)
+    project = c.ns["project"]
+    project.__name__ = project.__qualname__ = f"project_{c.name}"
+    project.spec = s
+    project.source = source
+    return project
@@ -26,22 +26,37 @@ Other keys are dropped.
 
 from __future__ import annotations
 import argparse
+import concurrent.futures as fut
+import contextlib
+import functools
 import hashlib
 import json
 import os
 import re
-from typing import Any, Dict, List, Optional, Tuple
+import shutil
+import tempfile
+import time
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+import json_codec
+from json_stream import JsonStreamReader, JsonStreamWriter
+from metrics import Metrics, add_metrics_arguments, metrics_from_args
+from packstore import PackWriter, is_pack, open_store, open_writer
+from projection import compile_spec, const, each, field, keep, node, spec
+from utils import count_attributes
 
 # --- Constants / Keep-lists ---
 
-KEEP_EVENT_KEYS = {
+# Ordered (not a set) so the output key order, and hence sha256, does not depend on
+# PYTHONHASHSEED; this is the order found in the frozen snapshot.
+KEEP_EVENT_KEYS = (
+    "threat_level_id",
     "date",
+    "published",
     "info",
     "publish_timestamp",   # canonical name
-    "threat_level_id",
     "timestamp",
-    "published",
-}
+)
 
 # KEEP_ATTR_KEYS is built dynamically based on --drop-to-ids
 BASE_ATTR_KEYS = ["category", "comment", "timestamp", "type", "value"]
@@ -72,23 +87,12 @@ def ensure_dir(path: str) -> None:
 def sha256_bytes(b: bytes) -> str:
     return hashlib.sha256(b).hexdigest()
 
-def _as_list(x) -> List[Any]:
-    if x is None:
-        return []
-    if isinstance(x, list):
-        return x
-    return [x]
-
 def _coerce_threat_level_id(x: Any) -> Optional[str]:
     if x is None:
         return None
     s = str(x).strip()
     return s  # keep "1"/"2"/"3" as strings; pass-through other values too
 
-def _ensure_comment(d: Dict[str, Any]) -> None:
-    if "comment" not in d:
-        d["comment"] = ""
-
 def _type_is_hashlike(attr_type: Optional[str]) -> bool:
     if not attr_type:
         return False
@@ -120,6 +124,32 @@ def _truncate(val: str, limit: int) -> str:
     return val[:limit] + "…"
 
 
+# --- Per-type dispatch table ---
+
+# attr_type -> mask placeholder ("<sha256>") for hash-like types, or None for types whose
+# values are kept (truncated if they look like blobs). MISP has a few hundred types, so
+# each one is lowercased/split once and then only looked up.
+_TYPE_MASKS: Dict[Any, Optional[str]] = {t: f"<{t}>" for t in HASH_TYPES}
+_MAX_TYPE_MASKS = 1 << 16  # stop memoizing on feeds with an absurd number of distinct types
+
+def _mask_for_type(attr_type: Optional[str]) -> Optional[str]:
+    if not _type_is_hashlike(attr_type):
+        return None
+    tok = _first_hash_token(attr_type)
+    return f"<{tok}>" if tok else "<hash>"
+
+def _type_mask(attr_type: Optional[str]) -> Optional[str]:
+    try:
+        return _TYPE_MASKS[attr_type]
+    except KeyError:
+        mask = _mask_for_type(attr_type)
+        if len(_TYPE_MASKS) < _MAX_TYPE_MASKS:
+            _TYPE_MASKS[attr_type] = mask
+        return mask
+    except TypeError:  # unhashable garbage in "type": decide without memoizing
+        return _mask_for_type(attr_type)
+
+
 # --- Core normalization for attribute values ---
 
 def normalize_value(attr_type: str, value: Any, truncate_long: int) -> Any:
@@ -133,97 +163,214 @@ def normalize_value(attr_type: str, value: Any, truncate_long: int) -> Any:
     if value is None or not isinstance(value, str):
         return value
 
-    if _type_is_hashlike(attr_type):
-        tok = _first_hash_token(attr_type)
-        return f"<{tok}>" if tok else "<hash>"
+    mask = _type_mask(attr_type)
+    if mask is not None:
+        return mask
 
-    if _looks_like_big_blob(value) and truncate_long > 0:
+    # Values that already fit are never truncated, so skip the blob regexes for them.
+    if truncate_long > 0 and len(value) > truncate_long and _looks_like_big_blob(value):
         return _truncate(value, truncate_long)
 
     return value
 
+def normalize_attribute_values(attrs: List[Dict[str, Any]], truncate_long: int) -> None:
+    """normalize_value for a whole list of kept attributes (type and value present), in place."""
+    masks = _TYPE_MASKS
+    for a in attrs:
+        value = a["value"]
+        if not isinstance(value, str):
+            continue
+        try:
+            mask = masks[a["type"]]
+        except (KeyError, TypeError):
+            mask = _type_mask(a["type"])
+        if mask is not None:
+            a["value"] = mask
+        elif truncate_long > 0 and len(value) > truncate_long and _looks_like_big_blob(value):
+            a["value"] = _truncate(value, truncate_long)
 
-# --- Strict simplifier ---
-
-def simplify_event(evt_full: Dict[str, Any], keep_to_ids: bool, truncate_long: int) -> Optional[Dict[str, Any]]:
-    """Return {"Event": out} simplified or None if not an event."""
-    if "Event" not in evt_full or not isinstance(evt_full["Event"], dict):
-        return None
-
-    e = evt_full["Event"]
-
-    # Normalize published_timestamp -> publish_timestamp
-    if "publish_timestamp" not in e and "published_timestamp" in e:
-        e["publish_timestamp"] = e["published_timestamp"]
-
-    # Top-level Event
-    out_e: Dict[str, Any] = {}
-    for k in KEEP_EVENT_KEYS:
-        if k in e:
-            out_e[k] = e[k]
-
-    # Coerce threat_level_id to string
-    if "threat_level_id" in out_e:
-        out_e["threat_level_id"] = _coerce_threat_level_id(out_e["threat_level_id"])
 
-    # Tags: keep only {name}
-    tags_in = _as_list(e.get("Tag"))
-    tags_out: List[Dict[str, Any]] = []
-    for t in tags_in:
-        if isinstance(t, dict) and t.get("name"):
-            tags_out.append({"name": t["name"]})
-    if tags_out:
-        out_e["Tag"] = tags_out
+# --- Strict simplifier ---
 
+def strict_spec(keep_to_ids: bool, truncate_long: int) -> Dict[str, Any]:
+    """Projection spec of the strict keep-lists above (see projection.py)."""
     # Build attr keep-list per CLI flag
     keep_attr_keys = BASE_ATTR_KEYS + ([TO_IDS_KEY] if keep_to_ids else [])
+    # Values are masked/truncated per attribute list, for event and object attributes alike.
+    normalize = functools.partial(normalize_attribute_values, truncate_long=truncate_long)
 
     # Attributes: keep only allowed keys; require type & value; ensure comment; mask/truncate value
-    attrs_in = _as_list(e.get("Attribute"))
-    attrs_out: List[Dict[str, Any]] = []
-    for a in attrs_in:
-        if not isinstance(a, dict):
-            continue
-        kept = {k: a.get(k) for k in keep_attr_keys if k in a}
-        if kept.get("type") and kept.get("value") is not None:
-            kept["value"] = normalize_value(kept.get("type", ""), kept["value"], truncate_long)
-            _ensure_comment(kept)
-            attrs_out.append(kept)
-    if attrs_out:
-        out_e["Attribute"] = attrs_out
-
-    # Objects: keep allowed keys; ensure comment; filter inner attributes same way
-    objs_in = _as_list(e.get("Object"))
-    objs_out: List[Dict[str, Any]] = []
-    for o in objs_in:
-        if not isinstance(o, dict):
-            continue
-        so = {k: o.get(k) for k in KEEP_OBJ_KEYS if k in o}
-        original_has_meta = bool(so)
-        _ensure_comment(so)
-
-        o_attrs_in = _as_list(o.get("Attribute"))
-        o_attrs_out: List[Dict[str, Any]] = []
-        for oa in o_attrs_in:
-            if not isinstance(oa, dict):
-                continue
-            sa = {k: oa.get(k) for k in keep_attr_keys if k in oa}
-            if sa.get("type") and sa.get("value") is not None:
-                sa["value"] = normalize_value(sa.get("type", ""), sa["value"], truncate_long)
-                _ensure_comment(sa)
-                o_attrs_out.append(sa)
-
-        if o_attrs_out:
-            so["Attribute"] = o_attrs_out
-
-        # Keep object only if it had any meta keys originally OR has kept attributes
-        if original_has_meta or o_attrs_out:
-            objs_out.append(so)
+    attr = node(
+        keep(*keep_attr_keys),
+        const("comment", "", unless="comment"),
+        require={"type": "truthy", "value": "not_none"},
+    )
+    # Objects: keep allowed keys; ensure comment; filter inner attributes same way.
+    # Keep object only if it had any meta keys originally OR has kept attributes.
+    obj = node(
+        keep(*KEEP_OBJ_KEYS),
+        const("comment", "", unless="comment"),
+        each("Attribute", attr, source="as_list", when="nonempty", batch=normalize),
+        keep_if=lambda o, out: "Attribute" in out or any(k in o for k in KEEP_OBJ_KEYS),
+    )
+    # Coerce threat_level_id to string; normalize published_timestamp -> publish_timestamp
+    special = {
+        "threat_level_id": field("threat_level_id", transform=lambda v, e: _coerce_threat_level_id(v)),
+        "publish_timestamp": field("publish_timestamp", "publish_timestamp", "published_timestamp"),
+    }
+    event = node(
+        [special.get(k) or field(k) for k in KEEP_EVENT_KEYS],
+        # Tags: keep only {name}
+        each("Tag", node(field("name", pick="get"), require={"name": "truthy"}), source="as_list", when="nonempty"),
+        each("Attribute", attr, source="as_list", when="nonempty", batch=normalize),
+        each("Object", obj, source="as_list", when="nonempty"),
+    )
+    return spec("strict", event, strict_root=True)
 
-    if objs_out:
-        out_e["Object"] = objs_out
+@functools.lru_cache(maxsize=None)
+def _strict_projection(keep_to_ids: bool, truncate_long: int):
+    return compile_spec(strict_spec(keep_to_ids, truncate_long))
 
-    return {"Event": out_e}
+def simplify_event(evt_full: Dict[str, Any], keep_to_ids: bool, truncate_long: int) -> Optional[Dict[str, Any]]:
+    """Return {"Event": out} simplified or None if not an event."""
+    return _strict_projection(keep_to_ids, truncate_long)(evt_full)
+
+
+# --- Streaming simplifier for giant events ---
+
+# Event members simplify_event reads, besides the Attribute/Object arrays that are streamed.
+_HEAD_KEYS = frozenset(KEEP_EVENT_KEYS + ("published_timestamp", "Tag"))
+_STREAMED_KEYS = ("Attribute", "Object")
+# Streamed items are projected in batches of at most this many items / characters of JSON.
+STREAM_BATCH_ITEMS = 1024
+STREAM_BATCH_CHARS = 1 << 20
+DEFAULT_STREAM_MIN_MB = 256
+
+class _HashedOutput:
+    def __init__(self, f):
+        self.f = f
+        self.sha = hashlib.sha256()
+
+    def write(self, b: bytes) -> None:
+        self.sha.update(b)
+        self.f.write(b)
+
+def sha256_file(f: BinaryIO, chunk_bytes: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    for chunk in iter(lambda: f.read(chunk_bytes), b""):
+        h.update(chunk)
+    return h.hexdigest()
+
+def _write_kept(w: JsonStreamWriter, project, key: str, items: Any) -> int:
+    kept = project({"Event": {key: items}})["Event"].get(key, [])
+    w.values(kept)
+    return len(kept)
+
+def _stream_items(
+    r: JsonStreamReader, key: str, project, spool, indent: Optional[int]
+) -> Tuple[int, Optional[Exception]]:
+    """
+    Project Event[key] item by item into spool, encoded as the value of {"Event": {key: ...}}.
+    Returns (items kept, error). A projection error does not stop the read, so a later
+    duplicate of `key` can still replace this value, as it would in json.loads.
+    """
+    spool.seek(0)
+    spool.truncate()
+    w = JsonStreamWriter(spool, indent, depth=2)
+    n, error = 0, None
+
+    def flush(items: Any) -> None:
+        nonlocal n, error
+        if error is None:
+            try:
+                n += _write_kept(w, project, key, items)
+            except Exception as e:
+                error = e
+
+    w.begin_array()
+    if r.peek() != "[":
+        flush(r.value())  # not a list: the spec applies as_list
+    else:
+        batch, start = [], r.consumed
+        for _ in r.items():
+            batch.append(r.value())
+            if len(batch) >= STREAM_BATCH_ITEMS or r.consumed - start >= STREAM_BATCH_CHARS:
+                flush(batch)
+                batch, start = [], r.consumed
+        flush(batch)
+    w.end()
+    return n, error
+
+def simplify_file_streaming(
+    in_file: Union[str, BinaryIO], out_path: str, keep_to_ids: bool, truncate_long: int, compact: bool = False
+) -> Optional[str]:
+    """
+    simplify_event + dumps_bytes for one file without loading it: Event.Attribute and
+    Event.Object are read item by item, projected in small batches and spooled to temp
+    files next to out_path; the other Event members are read whole. Peak memory is about
+    the largest single attribute/object plus one batch. The output bytes are identical
+    to the in-memory path. Returns the output sha256, or None (nothing written) if the
+    file holds no Event object. in_file is a path or an open binary file (e.g. a pack record).
+    """
+    project = _strict_projection(keep_to_ids, truncate_long)
+    indent = None if compact else 4
+    out_dir = os.path.dirname(out_path) or "."
+    with (open(in_file, "rb") if isinstance(in_file, str) else contextlib.nullcontext(in_file)) as f_in, \
+            tempfile.TemporaryFile(dir=out_dir) as spool_attrs, tempfile.TemporaryFile(dir=out_dir) as spool_objs:
+        spools = {"Attribute": spool_attrs, "Object": spool_objs}
+        r = JsonStreamReader(f_in)
+        if r.peek() != "{":
+            return None
+        head: Optional[Dict[str, Any]] = None
+        counts = dict.fromkeys(_STREAMED_KEYS, 0)
+        errors: Dict[str, Optional[Exception]] = {}
+        for key in r.members():
+            if key != "Event":
+                r.skip()
+                continue
+            # a repeated key replaces the earlier value, as in json.loads
+            head, counts, errors = None, dict.fromkeys(_STREAMED_KEYS, 0), {}
+            if r.peek() != "{":
+                r.skip()
+                continue
+            head = {}
+            for ekey in r.members():
+                if ekey in spools:
+                    counts[ekey], errors[ekey] = _stream_items(r, ekey, project, spools[ekey], indent)
+                elif ekey in _HEAD_KEYS:
+                    head[ekey] = r.value()
+                else:
+                    r.skip()
+        if not r.at_end():
+            raise ValueError("extra data after the JSON document")
+        if head is None:
+            return None
+        for error in errors.values():
+            if error is not None:
+                raise error
+
+        out_event = project({"Event": head})["Event"]
+        tmp_path = out_path + ".part"
+        try:
+            with open(tmp_path, "wb") as f_out:
+                out = _HashedOutput(f_out)
+                w = JsonStreamWriter(out, indent)
+                w.begin_object()
+                w.begin_object("Event")
+                for k, v in out_event.items():
+                    w.value(v, key=k)
+                for k, spool in spools.items():
+                    if counts[k]:
+                        spool.seek(0)
+                        w.raw(iter(lambda: spool.read(1 << 20), b""), key=k)
+                w.end()
+                w.end()
+            os.replace(tmp_path, out_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return out.sha.hexdigest()
 
 
 # --- Manifest helpers ---
@@ -253,70 +400,276 @@ def normalize_label_field(r: Dict[str, Any]) -> Tuple[Optional[str], Optional[st
 
 # --- Driver that simplifies + writes dataset + new manifest ---
 
+# Bump whenever simplify_event / normalize_value change their output for the same input,
+# so --incremental re-simplifies everything instead of reusing stale files.
+SIMPLIFIER_VERSION = "2"
+SETTINGS_FILE = ".simplify_settings"
+
+def simplifier_settings(keep_to_ids: bool, truncate_long: int, compact: bool = False) -> Dict[str, Any]:
+    return {
+        "version": SIMPLIFIER_VERSION,
+        "keep_to_ids": keep_to_ids,
+        "truncate_long": truncate_long,
+        "compact": compact,
+    }
+
+def _file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return sha256_file(f)
+
+def load_previous_output(output_dir: str, settings: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    filename -> previous manifest record, or {} if the previous run used other settings.
+    The settings file records the sha256 of the manifest written by the same run, so a
+    manifest from any other run (or an interrupted one) is never trusted.
+    """
+    settings_path = os.path.join(output_dir, SETTINGS_FILE)
+    manifest_path = os.path.join(output_dir, "manifest.jsonl")
+    if not (os.path.exists(settings_path) and os.path.exists(manifest_path)):
+        return {}
+    try:
+        with open(settings_path, "r", encoding="utf-8") as f:
+            recorded = json.load(f)
+        manifest_sha256 = recorded.pop("manifest_sha256", None)
+        if recorded != settings or manifest_sha256 != _file_sha256(manifest_path):
+            return {}
+    except Exception:
+        return {}
+    return {r["filename"]: r for r in read_manifest(manifest_path) if "filename" in r}
+
+def write_settings(output_dir: str, settings: Dict[str, Any]) -> None:
+    """Record the settings of a finished run, tied to the manifest.jsonl it wrote."""
+    manifest_sha256 = _file_sha256(os.path.join(output_dir, "manifest.jsonl"))
+    with open(os.path.join(output_dir, SETTINGS_FILE), "w", encoding="utf-8") as f:
+        json.dump({**settings, "manifest_sha256": manifest_sha256}, f)
+
+def build_record(filename: str, out_sha256: str, source_sha256: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+    """New manifest record for one simplified file."""
+    tl_id, tl_lab = normalize_label_field(meta)  # NOTE: label not emitted below
+
+    record: Dict[str, Any] = {
+        "filename": filename,
+        "sha256": out_sha256,
+        "source_sha256": source_sha256,
+    }
+    # keep only numeric threat level id if present in original manifest (no label emitted)
+    if tl_id is not None:
+        record["threat_level_id"] = tl_id
+
+    # Pass through timestamps if they exist in the ORIGINAL manifest
+    if "date" in meta:
+        record["date"] = meta["date"]
+    if "publish_timestamp" in meta:
+        record["publish_timestamp"] = meta["publish_timestamp"]
+    elif "published_timestamp" in meta:
+        record["publish_timestamp"] = meta["published_timestamp"]
+    if "timestamp" in meta:
+        record["timestamp"] = meta["timestamp"]
+    return record
+
+def simplify_bytes(
+    raw_bytes: bytes, keep_to_ids: bool, truncate_long: int, compact: bool = False, stats: Optional[Dict[str, Any]] = None
+) -> Optional[bytes]:
+    """
+    Simplified output bytes (indent=4 unless compact) of one raw event held in memory; None without a valid 'Event'.
+    With `stats`, stats["timings"] gets the parse/simplify/serialize seconds and stats["attributes"] the output's attribute count.
+    """
+    start = time.perf_counter()
+    raw_json = json_codec.loads(raw_bytes)
+    parsed = time.perf_counter()
+    simplified_json = simplify_event(raw_json, keep_to_ids=keep_to_ids, truncate_long=truncate_long)
+    del raw_json
+    simplified = time.perf_counter()
+    out_bytes = json_codec.dumps_bytes(simplified_json, indent=None if compact else 4) if simplified_json else None
+    if stats is not None:
+        stats.setdefault("timings", {}).update(
+            parse=parsed - start, simplify=simplified - parsed, serialize=time.perf_counter() - simplified)
+        if simplified_json:
+            stats["attributes"] = count_attributes(simplified_json)
+    return out_bytes
+
+@functools.lru_cache(maxsize=None)
+def _input_store(input_dir: str):
+    """One open store per input directory and process (pool workers map a pack themselves)."""
+    return open_store(input_dir)
+
+def simplify_one(
+    input_dir: str,
+    output_dir: str,
+    filename: str,
+    meta: Dict[str, Any],
+    keep_to_ids: bool,
+    truncate_long: int,
+    previous: Optional[Dict[str, Any]] = None,
+    compact: bool = False,
+    stream_min_bytes: Optional[int] = None,
+) -> Tuple[Optional[Dict[str, Any]], Optional[str], bool, Dict[str, Any]]:
+    """
+    Simplify one raw file (input_dir may be a pack) into output_dir. Returns (manifest
+    record, message, reused, stats). The record is None when the file is skipped or fails.
+    If `previous` (the record of an earlier run with identical settings, whose output
+    still exists) has the same source_sha256, nothing is parsed or written and the
+    record is rebuilt from it.
+    Files of at least stream_min_bytes go through simplify_file_streaming.
+    stats holds the event's metrics row (bytes in/out, attributes, seconds, status) and
+    its per-stage "timings"; they cost a few clock reads and are reported with --metrics.
+    """
+    start = time.perf_counter()
+    timings: Dict[str, float] = {}
+    stats: Dict[str, Any] = {"filename": filename, "timings": timings}
+
+    def done(record: Optional[Dict[str, Any]], message: Optional[str], reused: bool, status: str):
+        stats["status"] = status
+        stats["seconds"] = time.perf_counter() - start
+        return record, message, reused, stats
+
+    store = _input_store(input_dir)
+    out_path = os.path.join(output_dir, filename)
+    try:
+        stats["bytes"] = store.size(filename)
+        streamed = stream_min_bytes is not None and stats["bytes"] >= stream_min_bytes
+        stats["streamed"] = streamed
+        t = time.perf_counter()
+        if streamed:
+            with store.open(filename) as f_in:
+                source_sha256 = sha256_file(f_in)
+        else:
+            # read raw as bytes so we can hash original
+            raw_bytes = store.read(filename)
+            timings["read"] = time.perf_counter() - t
+            t = time.perf_counter()
+            source_sha256 = sha256_bytes(raw_bytes)
+        timings["hash"] = time.perf_counter() - t
+
+        if previous is not None and previous.get("source_sha256") == source_sha256 and previous.get("sha256"):
+            return done(build_record(filename, previous["sha256"], source_sha256, meta), None, True, "reused")
+
+        if streamed:
+            t = time.perf_counter()
+            with store.open(filename) as f_in:
+                out_sha256 = simplify_file_streaming(f_in, out_path, keep_to_ids, truncate_long, compact)
+            timings["stream"] = time.perf_counter() - t
+            if out_sha256 is None:
+                return done(None, f"[WARN] Skipping {filename}: no valid 'Event' to simplify.", False, "skipped")
+            stats["bytes_out"] = os.path.getsize(out_path)
+            return done(build_record(filename, out_sha256, source_sha256, meta), None, False, "ok")
+
+        out_bytes = simplify_bytes(raw_bytes, keep_to_ids, truncate_long, compact, stats=stats)
+        if out_bytes is None:
+            return done(None, f"[WARN] Skipping {filename}: no valid 'Event' to simplify.", False, "skipped")
+        stats["bytes_out"] = len(out_bytes)
+
+        # A new file renamed into place: an existing output may be hard-linked into prepared datasets
+        t = time.perf_counter()
+        tmp_path = out_path + ".part"
+        try:
+            with open(tmp_path, "wb") as f_out:
+                f_out.write(out_bytes)
+            os.replace(tmp_path, out_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        timings["write"] = time.perf_counter() - t
+
+        return done(build_record(filename, sha256_bytes(out_bytes), source_sha256, meta), None, False, "ok")
+
+    except Exception as e:
+        return done(None, f"[ERR] Failed to process {filename}: {e}", False, "error")
+
+def _simplify_task(args: Tuple) -> Tuple[Optional[Dict[str, Any]], Optional[str], bool, Dict[str, Any]]:
+    return simplify_one(*args)
+
 def simplify_and_write_dataset(
     input_dir: str,
     output_dir: str,
     manifest_rows: Dict[str, Dict[str, Any]],
     keep_to_ids: bool,
     truncate_long: int,
+    workers: int = 1,
+    incremental: bool = False,
+    compact: bool = False,
+    stream_min_bytes: Optional[int] = None,
+    pack: Optional[bool] = None,
+    metrics: Optional[Metrics] = None,
 ) -> None:
-    ensure_dir(output_dir)
+    """
+    Simplify every *.json in input_dir (a directory or a pack). With workers > 1 files are processed in a
+    process pool, largest first to avoid a straggler tail; messages and manifest rows
+    are still emitted in filename order, so manifest.jsonl is byte-identical to workers=1.
+    Files of at least stream_min_bytes are simplified item by item in bounded memory.
+
+    With incremental=True, files whose source_sha256 and simplifier settings match the
+    previous output manifest are reused as-is, and outputs whose raw file is gone (or
+    no longer simplifies) are deleted.
+
+    output_dir is written as a pack if `pack` (pack=None: if it already is one); each
+    output is then simplified into a staging directory and appended by this process.
+    With `metrics`, every file gets a metrics row and its stage timings are added up.
+    """
     new_manifest_path = os.path.join(output_dir, "manifest.jsonl")
-
-    json_files = sorted([f for f in os.listdir(input_dir) if f.lower().endswith(".json")])
-
-    with open(new_manifest_path, "w", encoding="utf-8") as manifest_out:
-        for filename in json_files:
-            in_path = os.path.join(input_dir, filename)
-            try:
-                # read raw as bytes so we can hash original
-                with open(in_path, "rb") as f_in:
-                    raw_bytes = f_in.read()
-
-                # decode & load JSON
-                raw_json = json.loads(raw_bytes.decode("utf-8", errors="replace"))
-
-                # strict simplify
-                simplified_json = simplify_event(raw_json, keep_to_ids=keep_to_ids, truncate_long=truncate_long)
-                if not simplified_json:
-                    print(f"[WARN] Skipping {filename}: no valid 'Event' to simplify.")
-                    continue
-
-                # write simplified
-                out_path = os.path.join(output_dir, filename)
-                out_bytes = json.dumps(
-                    simplified_json, ensure_ascii=False, separators=(",", ":"), indent=4
-                ).encode("utf-8")
-                with open(out_path, "wb") as f_out:
-                    f_out.write(out_bytes)
-
-                # build new manifest record
-                meta = manifest_rows.get(filename, {})
-                tl_id, tl_lab = normalize_label_field(meta)  # NOTE: label not emitted below
-
-                record: Dict[str, Any] = {
-                    "filename": filename,
-                    "sha256": sha256_bytes(out_bytes),
-                    "source_sha256": sha256_bytes(raw_bytes),
-                }
-                # keep only numeric threat level id if present in original manifest (no label emitted)
-                if tl_id is not None:
-                    record["threat_level_id"] = tl_id
-
-                # Pass through timestamps if they exist in the ORIGINAL manifest
-                if "date" in meta:
-                    record["date"] = meta["date"]
-                if "publish_timestamp" in meta:
-                    record["publish_timestamp"] = meta["publish_timestamp"]
-                elif "published_timestamp" in meta:
-                    record["publish_timestamp"] = meta["published_timestamp"]
-                if "timestamp" in meta:
-                    record["timestamp"] = meta["timestamp"]
-
+    metrics = metrics or Metrics("simplify")
+    settings = simplifier_settings(keep_to_ids, truncate_long, compact)
+    previous = load_previous_output(output_dir, settings) if incremental else {}
+    # Until this run finishes, its outputs and manifest must not be reused by a later one
+    settings_path = os.path.join(output_dir, SETTINGS_FILE)
+    if os.path.exists(settings_path):
+        os.remove(settings_path)
+    _input_store.cache_clear()
+    store = _input_store(input_dir)
+
+    with open_writer(output_dir, pack=pack, append=incremental) as out:
+        previous = {fn: r for fn, r in previous.items() if out.has(fn)}
+        stage_dir = os.path.join(output_dir, ".staging") if isinstance(out, PackWriter) else output_dir
+        ensure_dir(stage_dir)
+
+        json_files = store.names(".json")
+        tasks = {
+            fn: (input_dir, stage_dir, fn, manifest_rows.get(fn, {}), keep_to_ids, truncate_long, previous.get(fn),
+                 compact, stream_min_bytes)
+            for fn in json_files
+        }
+
+        if workers > 1:
+            by_size = sorted(json_files, key=store.size, reverse=True)
+            with fut.ProcessPoolExecutor(max_workers=workers) as ex:
+                futures = {fn: ex.submit(_simplify_task, tasks[fn]) for fn in by_size}
+                results = (futures[fn].result() for fn in json_files)
+                written, reused = _write_results(new_manifest_path, results, out, stage_dir, metrics)
+        else:
+            written, reused = _write_results(new_manifest_path, (_simplify_task(tasks[fn]) for fn in json_files),
+                                             out, stage_dir, metrics)
+
+        if incremental:
+            removed = 0
+            for fn in out.names(".json"):
+                if fn not in written:
+                    out.delete(fn)
+                    removed += 1
+            print(f"[INFO] Incremental: {reused} reused, {len(written) - reused} simplified, {removed} stale outputs removed.")
+        write_settings(output_dir, settings)
+    if stage_dir != output_dir:
+        shutil.rmtree(stage_dir, ignore_errors=True)
+
+def _write_results(manifest_path: str, results, out, stage_dir: str, metrics: Metrics) -> Tuple[set, int]:
+    """Write manifest rows in order and move new outputs from stage_dir into `out`; returns (filenames written, number reused)."""
+    written = set()
+    reused = 0
+    with open(manifest_path, "w", encoding="utf-8") as manifest_out:
+        for record, message, was_reused, stats in results:
+            if message:
+                print(message)
+            if record is not None:
+                if not was_reused:
+                    with metrics.stage("store"):
+                        out.put_file(record["filename"], os.path.join(stage_dir, record["filename"]))
                 manifest_out.write(json.dumps(record, ensure_ascii=False) + "\n")
-
-            except Exception as e:
-                print(f"[ERR] Failed to process {filename}: {e}")
+                written.add(record["filename"])
+                reused += was_reused
+            timings = stats.pop("timings")
+            metrics.add_timings(timings)
+            metrics.event(stats.pop("filename"), **stats, **{f"{k}_s": v for k, v in timings.items()})
+    return written, reused
 
 
 # --- CLI ---
@@ -346,7 +699,39 @@ def main():
         action="store_true",
         help="If set, drop the 'to_ids' field from attributes. By default it is kept."
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Simplify in N worker processes, largest files first (default: 1, serial)."
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reuse outputs whose source_sha256 and settings match the previous manifest.jsonl in --output-dir; "
+             "delete outputs of raw files that no longer exist."
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write minified JSON instead of indent=4 (smaller files, faster to read back)."
+    )
+    parser.add_argument(
+        "--pack",
+        action="store_true",
+        help="Write --output-dir as a pack (shards + offset index, see packstore.py). "
+             "An existing pack stays a pack; --input-dir may be either."
+    )
+    parser.add_argument(
+        "--stream-min-mb",
+        type=float,
+        default=DEFAULT_STREAM_MIN_MB,
+        help=f"Stream raw files of at least this many MB attribute by attribute, in bounded memory "
+             f"(identical output; default: {DEFAULT_STREAM_MIN_MB}, 0 streams every file)."
+    )
+    add_metrics_arguments(parser)
     args = parser.parse_args()
+    metrics = metrics_from_args("simplify", args)
 
     manifest_path = os.path.join(args.input_dir, "manifest.jsonl")
     if not os.path.exists(manifest_path):
@@ -360,6 +745,11 @@ def main():
     print(f"Simplifying JSONs from '{args.input_dir}' to '{args.output_dir}'...")
     print(f" - keep to_ids: {keep_to_ids}")
     print(f" - truncate-long: {args.truncate_long}")
+    print(f" - workers: {args.workers}")
+    print(f" - incremental: {args.incremental}")
+    print(f" - compact: {args.compact} (JSON backend: {json_codec.BACKEND})")
+    print(f" - stream files >= {args.stream_min_mb:g} MB")
+    print(f" - output: {'pack' if args.pack or is_pack(args.output_dir) else 'directory'}")
 
     simplify_and_write_dataset(
         args.input_dir,
@@ -367,10 +757,17 @@ def main():
         manifest_lookup,
         keep_to_ids=keep_to_ids,
         truncate_long=args.truncate_long,
+        workers=args.workers,
+        incremental=args.incremental,
+        compact=args.compact,
+        stream_min_bytes=int(args.stream_min_mb * 1024 * 1024),
+        pack=args.pack or None,
+        metrics=metrics,
     )
 
     print("\n[DONE] Simplification complete.")
     print(f"Simplified dataset is ready in: '{args.output_dir}'")
+    metrics.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""
+Batched token counting for filter_and_split.py.
+
+Texts are grouped into size-bucketed batches (similar lengths together, capped by
+count and by total characters so one giant event does not drag a batch of small
+ones along) and sent to the fast tokenizer as lists, which lets its Rust backend
+encode a batch in parallel. With workers > 1 the batches are spread over a process
+pool whose workers load the tokenizer once each, largest batches first.
+
+Counts are exactly len(tokenizer(text, add_special_tokens=False).input_ids) for
+every text, whatever the batch size or number of workers.
+
+Counts can be remembered in a SQLite cache keyed by sha256 of the text and a
+fingerprint of the tokenizer (a hash of its serialized pipeline: vocab, merges,
+normalizer, pre-tokenizer, added tokens), so re-runs and later snapshots only
+tokenize documents that actually changed. The fingerprint changes whenever the
+tokenizer revision does, so a new revision never reuses stale counts. The cache
+also remembers which fingerprint belongs to which tokenizer files on disk, the
+length-bound calibration below and the lower bounds found by early exits, so a run
+whose documents are all settled by it never loads the tokenizer (or imports
+transformers).
+
+When only "is it within the limit?" matters (TokenCounter.within_limit), byte-level
+BPE tokenizers get two cheaper tiers in front of full tokenization, both exact:
+  - length bounds: every token covers between 1 and max_token_bytes UTF-8 bytes
+    (max_token_bytes is read from the tokenizer's own vocab and added tokens), so
+    ceil(bytes / max_token_bytes) <= tokens <= bytes decides clearly small and
+    clearly huge documents without tokenizing them;
+  - early exit: a long ambiguous document is pre-tokenized once and its pieces are
+    BPE-encoded in order (exactly what the tokenizer does internally), stopping
+    as soon as the running count passes the limit; it also stops immediately when
+    there are more pieces than the limit, since every piece yields at least one token.
+Tokenizers for which the bounds cannot be proven (normalizers, BPE dropout,
+incomplete byte alphabet, non-BPE models) use full tokenization only.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures as fut
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BATCH_SIZE = 64
+MAX_BATCH_CHARS = 4_000_000
+# Ambiguous documents above this many bytes per token of the limit are probably over
+# it (minified JSON runs ~3-4 bytes/token), so the early-exit path is worth taking;
+# shorter ones are cheaper in the batched full-tokenization path. Speed only, not results.
+EARLY_EXIT_BYTES_PER_TOKEN = 8
+DEFAULT_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "cti-threat-level-benchmark",
+    "token_counts.sqlite",
+)
+
+def load_tokenizer(tokenizer_model: str):
+    from transformers import AutoTokenizer, logging
+    logging.set_verbosity_error()
+    return AutoTokenizer.from_pretrained(tokenizer_model, use_fast=True)
+
+def tokenizer_fingerprint(tokenizer) -> str:
+    """Stable hash of everything that determines token ids (independent of the model name/path)."""
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        state = backend.to_str()
+    else:
+        state = json.dumps(
+            {"vocab": tokenizer.get_vocab(), "added": [str(t) for t in tokenizer.all_special_tokens]},
+            sort_keys=True,
+        )
+    h = hashlib.sha256(type(tokenizer).__name__.encode("utf-8"))
+    h.update(state.encode("utf-8"))
+    return h.hexdigest()
+
+TOKENIZER_FILES = ("tokenizer.json", "tokenizer_config.json", "special_tokens_map.json", "added_tokens.json")
+
+def tokenizer_source_key(tokenizer_model: str) -> Optional[str]:
+    """
+    sha256 over the tokenizer files as they are on disk (a local model directory or the
+    Hugging Face hub cache), without loading the tokenizer. None if tokenizer.json is
+    not available locally.
+    """
+    if os.path.isdir(tokenizer_model):
+        paths = {f: os.path.join(tokenizer_model, f) for f in TOKENIZER_FILES}
+    else:
+        try:
+            from huggingface_hub import try_to_load_from_cache
+        except ImportError:
+            return None
+        paths = {f: try_to_load_from_cache(tokenizer_model, f) for f in TOKENIZER_FILES}
+    if not (isinstance(paths["tokenizer.json"], str) and os.path.isfile(paths["tokenizer.json"])):
+        return None
+    h = hashlib.sha256()
+    for f in TOKENIZER_FILES:
+        p = paths[f]
+        if isinstance(p, str) and os.path.isfile(p):
+            h.update(f.encode("utf-8") + b"\0")
+            with open(p, "rb") as fh:
+                h.update(hashlib.sha256(fh.read()).digest())
+    return h.hexdigest()
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+class TokenCountCache:
+    """SQLite map (tokenizer fingerprint, sha256 of text) -> token count, shared by all snapshots."""
+
+    _LOOKUP_CHUNK = 500
+
+    def __init__(
+        self,
+        path: str,
+        tokenizer_model: str,
+        compute_fingerprint: Callable[[], str],
+        source_key: Optional[str] = None,
+    ):
+        """
+        compute_fingerprint (which loads the tokenizer) is only called when source_key,
+        the hash of the tokenizer files, has not been seen with this cache before.
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS token_counts ("
+            " tokenizer TEXT NOT NULL, sha256 TEXT NOT NULL, tokens INTEGER NOT NULL,"
+            " PRIMARY KEY (tokenizer, sha256)) WITHOUT ROWID"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tokenizers (tokenizer TEXT PRIMARY KEY, name TEXT, first_seen REAL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tokenizer_sources (source_key TEXT PRIMARY KEY, tokenizer TEXT NOT NULL)"
+        )
+        # max_token_bytes of LengthBounds (NULL: bounds do not apply), so length decisions need no tokenizer
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tokenizer_bounds (tokenizer TEXT PRIMARY KEY, max_token_bytes INTEGER)"
+        )
+        # Early-exit results: the document has at least `floor` tokens (exact count unknown)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS token_floors ("
+            " tokenizer TEXT NOT NULL, sha256 TEXT NOT NULL, floor INTEGER NOT NULL,"
+            " PRIMARY KEY (tokenizer, sha256)) WITHOUT ROWID"
+        )
+        row = None
+        if source_key is not None:
+            row = self._db.execute(
+                "SELECT tokenizer FROM tokenizer_sources WHERE source_key = ?", (source_key,)
+            ).fetchone()
+        self.fingerprint = row[0] if row else compute_fingerprint()
+        if source_key is not None and row is None:
+            self._db.execute("INSERT OR REPLACE INTO tokenizer_sources VALUES (?, ?)", (source_key, self.fingerprint))
+        self._db.execute(
+            "INSERT OR IGNORE INTO tokenizers VALUES (?, ?, ?)", (self.fingerprint, tokenizer_model, time.time())
+        )
+        self._db.commit()
+
+    def _select(self, table: str, column: str, digests: Sequence[str]) -> Dict[str, int]:
+        found: Dict[str, int] = {}
+        unique = list(dict.fromkeys(digests))
+        for i in range(0, len(unique), self._LOOKUP_CHUNK):
+            chunk = unique[i:i + self._LOOKUP_CHUNK]
+            rows = self._db.execute(
+                f"SELECT sha256, {column} FROM {table} WHERE tokenizer = ? AND sha256 IN ({','.join('?' * len(chunk))})",
+                (self.fingerprint, *chunk),
+            )
+            found.update(rows)
+        return found
+
+    def get_many(self, digests: Sequence[str]) -> Dict[str, int]:
+        found = self._select("token_counts", "tokens", digests)
+        hits = sum(1 for d in digests if d in found)
+        self.hits += hits
+        self.misses += len(digests) - hits
+        return found
+
+    def get_floors(self, digests: Sequence[str]) -> Dict[str, int]:
+        """Lower bounds for digests that get_many missed; found ones count as hits."""
+        found = self._select("token_floors", "floor", digests)
+        hits = sum(1 for d in digests if d in found)
+        self.hits += hits
+        self.misses -= hits
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, int]]) -> None:
+        self._db.executemany(
+            "INSERT OR REPLACE INTO token_counts VALUES (?, ?, ?)",
+            ((self.fingerprint, d, n) for d, n in items),
+        )
+        self._db.commit()
+
+    def put_floors(self, items: Iterable[Tuple[str, int]]) -> None:
+        self._db.executemany(
+            "INSERT INTO token_floors VALUES (?, ?, ?)"
+            " ON CONFLICT (tokenizer, sha256) DO UPDATE SET floor = max(floor, excluded.floor)",
+            ((self.fingerprint, d, n) for d, n in items),
+        )
+        self._db.commit()
+
+    def get_calibration(self) -> Tuple[bool, Optional[int]]:
+        """(known, max_token_bytes) stored for this tokenizer."""
+        row = self._db.execute(
+            "SELECT max_token_bytes FROM tokenizer_bounds WHERE tokenizer = ?", (self.fingerprint,)
+        ).fetchone()
+        return (row is not None), (row[0] if row else None)
+
+    def put_calibration(self, max_token_bytes: Optional[int]) -> None:
+        self._db.execute("INSERT OR REPLACE INTO tokenizer_bounds VALUES (?, ?)", (self.fingerprint, max_token_bytes))
+        self._db.commit()
+
+    def report(self) -> str:
+        total = self.hits + self.misses
+        rate = (100.0 * self.hits / total) if total else 0.0
+        return f"[INFO] Token cache {self.path}: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate)"
+
+    def close(self) -> None:
+        self._db.close()
+
+def decide_by_length(n_bytes: int, limit: int, max_token_bytes: int) -> Optional[bool]:
+    """True/False when the UTF-8 length alone settles tokens <= limit, else None."""
+    if n_bytes <= limit:
+        return True
+    if -(-n_bytes // max_token_bytes) > limit:
+        return False
+    return None
+
+class LengthBounds:
+    """
+    Exact byte-length bounds and piece-wise early-exit counting for one byte-level
+    BPE tokenizer. Use LengthBounds.for_tokenizer(), which returns None when the
+    tokenizer is not one for which the bounds hold.
+    """
+
+    def __init__(self, backend, max_token_bytes: int, added_tokens: List[str]):
+        self.backend = backend
+        self.max_token_bytes = max_token_bytes
+        self.added_tokens = added_tokens
+        self._added_prefixes = sorted({t[:2] for t in added_tokens})
+
+    @classmethod
+    def for_tokenizer(cls, tokenizer) -> Optional["LengthBounds"]:
+        backend = getattr(tokenizer, "backend_tokenizer", None)
+        if backend is None:
+            return None
+        state = json.loads(backend.to_str())
+        model = state.get("model") or {}
+        pre = json.dumps(state.get("pre_tokenizer"))
+        if (state.get("normalizer") is not None or model.get("type") != "BPE" or model.get("dropout")
+                or '"ByteLevel"' not in pre):
+            return None
+        from tokenizers.pre_tokenizers import ByteLevel
+        vocab = backend.get_vocab(with_added_tokens=False)
+        if not all(ch in vocab for ch in ByteLevel.alphabet()):
+            return None
+        added = [t["content"] for t in state.get("added_tokens") or [] if t.get("content")]
+        # Vocab entries are byte-level strings: one character per byte.
+        max_bytes = max([len(t) for t in vocab] + [len(t.encode("utf-8")) for t in added])
+        return cls(backend, max_bytes, added)
+
+    def has_added_tokens(self, text: str) -> bool:
+        return any(p in text for p in self._added_prefixes) and any(t in text for t in self.added_tokens)
+
+    def count_up_to(self, text: str, limit: int) -> Tuple[int, bool]:
+        """
+        (tokens, exact). Encodes pre-tokenized pieces in order and stops once the count
+        exceeds limit; then exact=False and tokens is only known to be > limit.
+        Callers must route texts containing added tokens to full tokenization.
+        """
+        pieces = self.backend.pre_tokenizer.pre_tokenize_str(text)
+        if len(pieces) > limit:
+            return len(pieces), False
+        tokenize = self.backend.model.tokenize
+        total = 0
+        for piece, _ in pieces:
+            total += len(tokenize(piece))
+            if total > limit:
+                return total, False
+        return total, True
+
+def count_batch(tokenizer, texts: Sequence[str]) -> List[int]:
+    enc = tokenizer(
+        list(texts),
+        add_special_tokens=False,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+    )
+    return [len(ids) for ids in enc.input_ids]
+
+def make_batches(lengths: Sequence[int], batch_size: int, max_batch_chars: int = MAX_BATCH_CHARS) -> List[List[int]]:
+    """Group indices of texts with similar lengths; each batch has <= batch_size items and ~<= max_batch_chars."""
+    batches: List[List[int]] = []
+    cur: List[int] = []
+    cur_chars = 0
+    for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        if cur and (len(cur) >= batch_size or cur_chars + lengths[i] > max_batch_chars):
+            batches.append(cur)
+            cur, cur_chars = [], 0
+        cur.append(i)
+        cur_chars += lengths[i]
+    if cur:
+        batches.append(cur)
+    return batches
+
+# --- worker process state (one tokenizer per process) ---
+
+_worker_tokenizer = None
+
+def _init_worker(tokenizer_model: str) -> None:
+    global _worker_tokenizer
+    # One process per core already; nested Rust threads would only oversubscribe.
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    _worker_tokenizer = load_tokenizer(tokenizer_model)
+
+def _count_task(texts: List[str]) -> List[int]:
+    return count_batch(_worker_tokenizer, texts)
+
+class TokenCounter:
+    """Counts tokens of many texts at once; keeps running docs/tokens/seconds totals."""
+
+    def __init__(
+        self,
+        tokenizer_model: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        workers: int = 1,
+        cache_path: Optional[str] = None,
+    ):
+        self.tokenizer_model = tokenizer_model
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self.cache: Optional[TokenCountCache] = None
+        self._pool: Optional[fut.ProcessPoolExecutor] = None
+        self._tokenizer = None
+        self._bounds: Optional[LengthBounds] = None
+        self._bounds_checked = False
+        self._max_token_bytes: Optional[int] = None
+        self._calibrated = False
+        self.decided = {"cache": 0, "bounds": 0, "early_exit": 0, "tokenized": 0}
+        if cache_path:
+            self.cache = TokenCountCache(
+                cache_path, tokenizer_model,
+                compute_fingerprint=lambda: tokenizer_fingerprint(self.tokenizer),
+                source_key=tokenizer_source_key(tokenizer_model),
+            )
+        self.docs = 0
+        self.tokens = 0
+        self.seconds = 0.0
+
+    @property
+    def tokenizer(self):
+        """Loaded on first use (even when workers do the batch encoding: the bounds and
+        the early-exit path need it here), so fully cached runs skip it entirely."""
+        if self._tokenizer is None:
+            self._tokenizer = load_tokenizer(self.tokenizer_model)
+        return self._tokenizer
+
+    @property
+    def bounds(self) -> Optional[LengthBounds]:
+        if not self._bounds_checked:
+            self._bounds = LengthBounds.for_tokenizer(self.tokenizer)
+            self._bounds_checked = True
+        return self._bounds
+
+    @property
+    def max_token_bytes(self) -> Optional[int]:
+        """LengthBounds calibration (None: bounds do not apply); read from the cache when known."""
+        if not self._calibrated:
+            known, value = self.cache.get_calibration() if self.cache is not None else (False, None)
+            if not known:
+                value = self.bounds.max_token_bytes if self.bounds is not None else None
+                if self.cache is not None:
+                    self.cache.put_calibration(value)
+            self._max_token_bytes = value
+            self._calibrated = True
+        return self._max_token_bytes
+
+    def _ensure_pool(self) -> fut.ProcessPoolExecutor:
+        # Started on first use, so a fully cached run never spawns workers.
+        if self._pool is None:
+            self._pool = fut.ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(self.tokenizer_model,)
+            )
+        return self._pool
+
+    def _tokenize(self, texts: Sequence[str]) -> List[int]:
+        counts: List[int] = [0] * len(texts)
+        batches = make_batches([len(t) for t in texts], self.batch_size)
+        if self.workers > 1:
+            pool = self._ensure_pool()
+            batches.sort(key=lambda b: sum(len(texts[i]) for i in b), reverse=True)
+            futures = [(b, pool.submit(_count_task, [texts[i] for i in b])) for b in batches]
+            for b, f in futures:
+                for i, n in zip(b, f.result()):
+                    counts[i] = n
+        else:
+            for b in batches:
+                for i, n in zip(b, count_batch(self.tokenizer, [texts[i] for i in b])):
+                    counts[i] = n
+        return counts
+
+    def count(self, texts: Sequence[str]) -> List[int]:
+        """Token count of every text, in input order."""
+        start = time.perf_counter()
+        if self.cache is None:
+            counts = self._tokenize(texts)
+        else:
+            digests = [text_sha256(t) for t in texts]
+            known = self.cache.get_many(digests)
+            todo = [i for i, d in enumerate(digests) if d not in known]
+            fresh = self._tokenize([texts[i] for i in todo])
+            self.cache.put_many((digests[i], n) for i, n in zip(todo, fresh))
+            known.update((digests[i], n) for i, n in zip(todo, fresh))
+            counts = [known[d] for d in digests]
+        self.docs += len(texts)
+        self.tokens += sum(counts)
+        self.seconds += time.perf_counter() - start
+        return counts
+
+    def within_limit(self, texts: Sequence[str], limit: int) -> List[bool]:
+        """
+        tokens(text) <= limit for every text, in input order. Same answers as comparing
+        count() with limit, but cheap tiers (cache, length bounds, early exit) go first.
+        """
+        return self._evaluate(texts, limit, need_counts=False)[0]
+
+    def count_capped(self, texts: Sequence[str], cap: int) -> List[Optional[int]]:
+        """
+        Exact token count of every text that has at most cap tokens, None for the others.
+        Lets one pass serve several limits <= cap; only the "clearly huge" bound and the
+        early exit apply, since kept documents need their real count.
+        """
+        fits, counts = self._evaluate(texts, cap, need_counts=True)
+        return [n if ok else None for ok, n in zip(fits, counts)]
+
+    def _evaluate(self, texts: Sequence[str], limit: int, need_counts: bool) -> Tuple[List[bool], List[Optional[int]]]:
+        start = time.perf_counter()
+        fits: List[bool] = [False] * len(texts)
+        exact: List[Optional[int]] = [None] * len(texts)
+        digests = [text_sha256(t) for t in texts] if self.cache is not None else []
+        known = self.cache.get_many(digests) if self.cache is not None else {}
+        floors = self.cache.get_floors([d for d in digests if d not in known]) if self.cache is not None else {}
+        fresh: List[Tuple[str, int]] = []
+        fresh_floors: List[Tuple[str, int]] = []
+        todo: List[int] = []
+        encoded = 0
+        for i, text in enumerate(texts):
+            if digests and digests[i] in known:
+                exact[i] = known[digests[i]]
+                fits[i] = exact[i] <= limit
+                self.decided["cache"] += 1
+                continue
+            if digests and floors.get(digests[i], 0) > limit:
+                self.decided["cache"] += 1
+                continue
+            max_token_bytes = self.max_token_bytes
+            if max_token_bytes is not None:
+                n_bytes = len(text) if text.isascii() else len(text.encode("utf-8", errors="surrogatepass"))
+                verdict = decide_by_length(n_bytes, limit, max_token_bytes)
+                if verdict is False or (verdict and not need_counts):
+                    fits[i] = verdict
+                    self.decided["bounds"] += 1
+                    continue
+                if n_bytes > EARLY_EXIT_BYTES_PER_TOKEN * limit and not self.bounds.has_added_tokens(text):
+                    tokens, complete = self.bounds.count_up_to(text, limit)
+                    if complete:
+                        exact[i] = tokens
+                        fits[i] = tokens <= limit
+                        if digests:
+                            fresh.append((digests[i], tokens))
+                    elif digests:
+                        fresh_floors.append((digests[i], tokens))
+                    encoded += tokens
+                    self.decided["early_exit"] += 1
+                    continue
+            todo.append(i)
+        counts = self._tokenize([texts[i] for i in todo])
+        for i, n in zip(todo, counts):
+            exact[i] = n
+            fits[i] = n <= limit
+            if digests:
+                fresh.append((digests[i], n))
+        if self.cache is not None and fresh:
+            self.cache.put_many(fresh)
+        if self.cache is not None and fresh_floors:
+            self.cache.put_floors(fresh_floors)
+        self.decided["tokenized"] += len(todo)
+        self.docs += len(texts)
+        self.tokens += encoded + sum(counts)
+        self.seconds += time.perf_counter() - start
+        return fits, exact
+
+    def report(self) -> str:
+        secs = max(self.seconds, 1e-9)
+        lines = [f"[INFO] Processed {self.docs} docs in {self.seconds:.2f}s ({self.docs / secs:.1f} docs/s); "
+                 f"encoded {self.tokens} tokens ({self.tokens / secs:,.0f} tokens/s) "
+                 f"(batch_size={self.batch_size}, workers={self.workers})"]
+        if any(self.decided.values()):
+            lines.append("[INFO] Decided by " + ", ".join(f"{k}: {v}" for k, v in self.decided.items()))
+        if self.cache is not None:
+            lines.append(self.cache.report())
+        return "\n".join(lines)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+    def __enter__(self) -> "TokenCounter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
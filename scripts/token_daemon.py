@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Long-lived local token-count daemon.
+
+Keeps one warm TokenCounter per tokenizer (loaded on first request, or up front with
+--preload) behind a Unix socket, so repeated filter_and_split.py runs and notebooks
+skip tokenizer start-up and share one token-count cache.
+
+Protocol: one JSON object per line in each direction.
+    {"op": "within_limit", "tokenizer": "<model>", "texts": [...], "limit": N}
+    {"op": "count" | "count_capped", "tokenizer": "<model>", "texts": [...], "limit": N}
+    {"op": "report", "tokenizer": "<model>"}   {"op": "ping"}   {"op": "shutdown"}
+Replies are {"ok": true, "result": ...} or {"ok": false, "error": "..."}.
+
+The default socket is $XDG_RUNTIME_DIR/cti-token-daemon.sock, else daemon.sock in a
+private per-user directory under the temp dir. A daemon refuses to start while another
+one answers on its socket and only replaces a stale socket of the same user.
+
+Example:
+  python scripts/token_daemon.py --preload meta-llama/Meta-Llama-3-8B-Instruct &
+  python scripts/filter_and_split.py ... --token_daemon
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import json_codec
+from token_counting import DEFAULT_BATCH_SIZE, DEFAULT_CACHE_PATH, TokenCounter
+
+_UID = getattr(os, "getuid", lambda: 0)()
+
+def _default_socket() -> str:
+    """$XDG_RUNTIME_DIR/cti-token-daemon.sock, else a socket in a private per-user directory under the temp dir."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "cti-token-daemon.sock")
+    return os.path.join(tempfile.gettempdir(), f"cti-token-daemon-{_UID}", "daemon.sock")
+
+DEFAULT_SOCKET = _default_socket()
+PING_TIMEOUT = 2.0
+
+def _ping(socket_path: str) -> Optional[Dict[str, Any]]:
+    """The ping reply of whatever listens on socket_path, or None for a stale socket nobody listens on."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(PING_TIMEOUT)
+        try:
+            sock.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            return None
+        try:
+            sock.sendall(json_codec.dumps_bytes({"op": "ping"}) + b"\n")
+            reply = json_codec.loads(sock.makefile("rb").readline())
+            return reply.get("result") or {}
+        except (OSError, ValueError):
+            return {}  # something is listening, but it does not speak the daemon protocol
+
+def _claim_socket(socket_path: str) -> None:
+    """
+    Make socket_path free to bind. The parent directory is created private (0700) when
+    missing. An existing path is removed only when it is a socket of the current user
+    that nobody listens on; a live daemon, a foreign socket or any other file is an error.
+    """
+    parent = os.path.dirname(os.path.abspath(socket_path))
+    if not os.path.isdir(parent):
+        os.makedirs(parent, mode=0o700)
+    st = os.stat(parent)
+    if st.st_uid not in (_UID, 0) or (st.st_mode & (stat.S_IWGRP | stat.S_IWOTH) and not st.st_mode & stat.S_ISVTX):
+        raise RuntimeError(f"{parent} can be changed by other users; choose another --socket")
+    try:
+        st = os.lstat(socket_path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(st.st_mode):
+        raise RuntimeError(f"{socket_path} exists and is not a socket; not removing it")
+    if st.st_uid != _UID:
+        raise RuntimeError(f"{socket_path} belongs to another user (uid {st.st_uid}); choose another --socket")
+    reply = _ping(socket_path)
+    if reply is not None:
+        pid = reply.get("pid")
+        raise RuntimeError(f"a token daemon is already listening on {socket_path}"
+                           + (f" (pid {pid})" if pid else "") + "; stop it with --stop or choose another --socket")
+    os.remove(socket_path)  # stale socket left by a daemon that did not shut down cleanly
+
+class _Counters:
+    """TokenCounter per tokenizer, created on first use; each one serves one request at a time."""
+
+    def __init__(self, batch_size: int, workers: int, cache_path: Optional[str]):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.cache_path = cache_path
+        self._counters: Dict[str, TokenCounter] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tokenizer_model: str):
+        with self._lock:
+            if tokenizer_model not in self._counters:
+                self._counters[tokenizer_model] = TokenCounter(
+                    tokenizer_model, batch_size=self.batch_size, workers=self.workers, cache_path=self.cache_path
+                )
+                self._locks[tokenizer_model] = threading.Lock()
+            return self._counters[tokenizer_model], self._locks[tokenizer_model]
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._counters)
+
+    def close(self) -> None:
+        with self._lock:
+            for c in self._counters.values():
+                c.close()
+            self._counters.clear()
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                reply = {"ok": True, "result": self.server.dispatch(json_codec.loads(line))}
+            except Exception as e:
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json_codec.dumps_bytes(reply) + b"\n")
+            self.wfile.flush()
+
+class TokenDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, counters: _Counters):
+        _claim_socket(socket_path)
+        old_umask = os.umask(0o077)  # only the current user may connect
+        try:
+            super().__init__(socket_path, _Handler)
+        finally:
+            os.umask(old_umask)
+        self.socket_path = socket_path
+        self.counters = counters
+        self._socket_ino = os.lstat(socket_path).st_ino
+
+    def dispatch(self, req: Dict[str, Any]) -> Any:
+        op = req.get("op")
+        if op == "ping":
+            return {"pid": os.getpid(), "tokenizers": self.counters.names()}
+        if op == "shutdown":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return None
+        counter, lock = self.counters.get(req["tokenizer"])
+        with lock:
+            if op == "count":
+                return counter.count(req["texts"])
+            if op == "within_limit":
+                return counter.within_limit(req["texts"], int(req["limit"]))
+            if op == "count_capped":
+                return counter.count_capped(req["texts"], int(req["limit"]))
+            if op == "report":
+                return counter.report()
+        raise ValueError(f"unknown op {op!r}")
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.counters.close()
+        try:
+            if os.lstat(self.socket_path).st_ino == self._socket_ino:  # still our socket, not a newer daemon's
+                os.remove(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+class TokenDaemonClient:
+    """Same counting interface as TokenCounter, answered by a running token_daemon.py."""
+
+    def __init__(self, tokenizer_model: str, socket_path: str = DEFAULT_SOCKET):
+        self.tokenizer_model = tokenizer_model
+        self.socket_path = socket_path
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._sock.connect(socket_path)
+        except OSError as e:
+            self._sock.close()
+            raise ConnectionError(f"no token daemon at {socket_path} ({e}); start scripts/token_daemon.py") from e
+        self._rfile = self._sock.makefile("rb")
+
+    def request(self, op: str, **kw) -> Any:
+        self._sock.sendall(json_codec.dumps_bytes({"op": op, "tokenizer": self.tokenizer_model, **kw}) + b"\n")
+        line = self._rfile.readline()
+        if not line:
+            raise ConnectionError(f"token daemon at {self.socket_path} closed the connection")
+        reply = json_codec.loads(line)
+        if not reply.get("ok"):
+            raise RuntimeError(f"token daemon: {reply.get('error')}")
+        return reply.get("result")
+
+    def count(self, texts: Sequence[str]) -> List[int]:
+        return self.request("count", texts=list(texts))
+
+    def within_limit(self, texts: Sequence[str], limit: int) -> List[bool]:
+        return self.request("within_limit", texts=list(texts), limit=limit)
+
+    def count_capped(self, texts: Sequence[str], cap: int) -> List[Optional[int]]:
+        return self.request("count_capped", texts=list(texts), limit=cap)
+
+    def report(self) -> str:
+        return f"[INFO] via token daemon {self.socket_path}\n" + self.request("report")
+
+    def close(self) -> None:
+        self._rfile.close()
+        self._sock.close()
+
+    def __enter__(self) -> "TokenDaemonClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve warm tokenizers for token counting over a Unix socket.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help=f"Socket path (default: {DEFAULT_SOCKET})")
+    parser.add_argument("--preload", nargs="*", default=[], help="Tokenizers to load before accepting requests")
+    parser.add_argument("--batch_size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=1, help="Tokenizer worker processes per tokenizer")
+    parser.add_argument("--token_cache", default=DEFAULT_CACHE_PATH,
+                        help=f"SQLite token count cache (default: {DEFAULT_CACHE_PATH})")
+    parser.add_argument("--no_token_cache", action="store_true")
+    parser.add_argument("--stop", action="store_true", help="Ask the daemon on --socket to exit")
+    args = parser.parse_args()
+
+    if args.stop:
+        with TokenDaemonClient("", args.socket) as client:
+            client.request("shutdown")
+        print(f"[DONE] Stopped token daemon at {args.socket}")
+        return
+
+    counters = _Counters(args.batch_size, args.workers, None if args.no_token_cache else args.token_cache)
+    try:
+        server = TokenDaemon(args.socket, counters)
+    except RuntimeError as e:
+        raise SystemExit(f"[ERR] {e}") from None
+    with server:
+        for model in args.preload:  # requests wait in the listen backlog until serve_forever
+            counter, _ = counters.get(model)
+            counter.tokenizer  # noqa: B018 - load now rather than on the first request
+            print(f"[INFO] Loaded {model}")
+        print(f"[INFO] Token daemon listening on {args.socket} (pid {os.getpid()})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    print("[DONE] Token daemon stopped")
+
+if __name__ == "__main__":
+    main()
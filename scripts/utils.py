@@ -3,9 +3,19 @@
 from __future__ import annotations
 
 import hashlib
+import json
 import os
+import re
+import shutil
 import textwrap
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from projection import compile_spec, each, field, keep, node, spec
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
 # --------------------------- Constants & small utils ---------------------------
 
@@ -22,6 +32,31 @@ def sha256_bytes(b: bytes) -> str:
     h.update(b)
     return h.hexdigest()
 
+def link_or_copy(src: str, dst: str) -> None:
+    """Hard-link src to dst (replacing dst); fall back to a copy across filesystems."""
+    if os.path.exists(dst):
+        if os.path.samefile(src, dst):
+            return
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+# ioctl number of FICLONE on Linux (fcntl.FICLONE only exists from Python 3.12).
+_FICLONE = getattr(fcntl, "FICLONE", 0x40049409) if fcntl is not None else None
+
+def reflink_or_copy(src: str, dst: str) -> None:
+    """Copy-on-write clone of src to dst (Btrfs, XFS, ...); fall back to a regular copy."""
+    if _FICLONE is not None:
+        try:
+            with open(src, "rb") as fin, open(dst, "wb") as fout:
+                fcntl.ioctl(fout.fileno(), _FICLONE, fin.fileno())
+            return
+        except OSError:
+            pass
+    shutil.copyfile(src, dst)
+
 def safe_int(x: Any) -> Optional[int]:
     if x is None:
         return None
@@ -36,124 +71,153 @@ def get_first(d: Dict[str, Any], *keys: str) -> Any:
             return d[k]
     return None
 
-def _copy_if_present(src: Dict[str, Any], keys: List[str]) -> Dict[str, Any]:
-    out: Dict[str, Any] = {}
-    for k in keys:
-        if k in src:
-            out[k] = src[k]
-    return out
-
-def _strip_tag(tag: Dict[str, Any]) -> Dict[str, Any]:
-    # Keep at least the name; include local/relationship_type if present.
-    out: Dict[str, Any] = {}
-    for k in ("name", "local", "relationship_type"):
-        if k in tag:
-            out[k] = tag[k]
-    if not out and "name" in tag:
-        out["name"] = tag["name"]
-    return out
-
 def _is_empty(v: Any) -> bool:
     return v is None or v == "" or v == [] or v == {}
 
-def clean_json_recursively(x: Any) -> Any:
-    """Remove empty values recursively without altering types/keys."""
-    if isinstance(x, dict):
-        return {k: clean_json_recursively(v) for k, v in x.items() if not _is_empty(clean_json_recursively(v))}
-    if isinstance(x, list):
-        return [clean_json_recursively(v) for v in x if not _is_empty(clean_json_recursively(v))]
-    return x
-
-def scrub_labels(event_dict: Dict[str, Any]) -> Dict[str, Any]:
-    """Remove all threat_level keys to avoid leakage."""
-    if not isinstance(event_dict, dict):
-        return event_dict
-    def _scrub(obj: Any) -> Any:
-        if isinstance(obj, dict):
-            return {k: _scrub(v) for k, v in obj.items() if k not in ("threat_level", "threat_level_id")}
-        if isinstance(obj, list):
-            return [_scrub(v) for v in obj]
-        return obj
-    return _scrub(event_dict)
+_NO_KEYS: frozenset = frozenset()
+_LABEL_KEYS = frozenset(("threat_level", "threat_level_id"))
 
-# --------------------------- Schema-faithful simplify --------------------------
+def _prune_copy(root: Any, drop_keys: frozenset, drop_empty: bool) -> Any:
+    """Rebuild root without drop_keys (dict keys) and, if drop_empty, without empty values.
 
-def _simplify_attribute(attr: Dict[str, Any]) -> Dict[str, Any]:
-    """Preserve important analyst signals; do not drop to_ids/uuid/object_relation/Tag."""
-    keep = [
-        "category","type","value","comment","timestamp","uuid","to_ids",
-        "deleted","disable_correlation","first_seen","last_seen","object_relation",
+    Iterative post-order walk: every node is visited once and a container is judged
+    empty only after its own children were pruned, so depth costs neither time nor stack.
+    """
+    out_root: Any = {} if isinstance(root, dict) else []
+    # frame: (items iterator, output container, key of the container in its parent)
+    stack: List[Tuple[Any, Any, Any]] = [
+        (iter(root.items()) if isinstance(root, dict) else enumerate(root), out_root, None)
     ]
-    base = _copy_if_present(attr, keep)
-    if isinstance(attr.get("Tag"), list):
-        base["Tag"] = [_strip_tag(t) for t in attr["Tag"] if isinstance(t, dict)]
-    return base
-
-def _simplify_object(obj: Dict[str, Any]) -> Dict[str, Any]:
-    """Keep MISP keys as-is: 'meta-category' and 'Attribute' (singular)."""
-    keep_obj = [
-        "name","description","meta-category","timestamp","uuid","template_uuid",
-        "template_version","deleted","comment",
+    while stack:
+        items, out, _ = stack[-1]
+        is_dict = type(out) is dict
+        for k, v in items:
+            if is_dict and k in drop_keys:
+                continue
+            if isinstance(v, dict):
+                stack.append((iter(v.items()), {}, k))
+                break
+            if isinstance(v, list):
+                stack.append((enumerate(v), [], k))
+                break
+            if drop_empty and _is_empty(v):
+                continue
+            if is_dict:
+                out[k] = v
+            else:
+                out.append(v)
+        else:
+            _, done, key = stack.pop()
+            if stack and not (drop_empty and not done):
+                parent = stack[-1][1]
+                if type(parent) is dict:
+                    parent[key] = done
+                else:
+                    parent.append(done)
+    return out_root
+
+def _prune_inplace(root: Any, drop_keys: frozenset, drop_empty: bool) -> Any:
+    """Same result as _prune_copy, but edits root's dicts and lists instead of copying them."""
+    # frame: [container, items iterator, keys to delete (dict) | next write index (list), key in parent]
+    stack: List[List[Any]] = [
+        [root, iter(root.items()), [], None] if isinstance(root, dict) else [root, enumerate(root), 0, None]
     ]
-    out = _copy_if_present(obj, keep_obj)
-    # Allow tolerant input that used 'meta_category' and map back without losing data.
-    if "meta-category" not in out and "meta_category" in obj:
-        out["meta-category"] = obj["meta_category"]
-    # Attributes (support either key; write as 'Attribute')
-    attrs = obj.get("Attribute") or obj.get("Attributes") or []
-    out["Attribute"] = [_simplify_attribute(a) for a in attrs if isinstance(a, dict)]
-    # Object references
-    if isinstance(obj.get("ObjectReference"), list):
-        kept_refs: List[Dict[str, Any]] = []
-        for r in obj["ObjectReference"]:
-            if not isinstance(r, dict):
+    while stack:
+        frame = stack[-1]
+        node, items = frame[0], frame[1]
+        is_dict = type(frame[2]) is list
+        for k, v in items:
+            if is_dict and k in drop_keys:
+                frame[2].append(k)
                 continue
-            kept_refs.append({
-                k: r.get(k) for k in (
-                    "relationship_type","relationship","referenced_uuid","referenced_id",
-                    "uuid","comment","timestamp","object_uuid"
-                ) if k in r
-            })
-        if kept_refs:
-            out["ObjectReference"] = kept_refs
-    return out
-
-def make_simplified_event(raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    """
-    Produce a 'simplified' event that is still schema-faithful and loss-aware.
-    IMPORTANT: We DO NOT create or map a 'published_timestamp'. We keep 'publish_timestamp' only if present.
+            if isinstance(v, dict):
+                stack.append([v, iter(v.items()), [], k])
+                break
+            if isinstance(v, list):
+                stack.append([v, enumerate(v), 0, k])
+                break
+            if drop_empty and _is_empty(v):
+                if is_dict:
+                    frame[2].append(k)
+                continue
+            if not is_dict:
+                node[frame[2]] = v
+                frame[2] += 1
+        else:
+            done, _, state, key = stack.pop()
+            if type(state) is list:
+                for k in state:
+                    del done[k]
+            else:
+                del done[state:]
+            if stack:
+                parent = stack[-1]
+                if type(parent[2]) is list:
+                    if drop_empty and not done:
+                        parent[2].append(key)
+                elif not (drop_empty and not done):
+                    parent[0][parent[2]] = done
+                    parent[2] += 1
+    return root
+
+def clean_json_recursively(x: Any, inplace: bool = False) -> Any:
+    """Remove empty values recursively without altering types/keys.
+
+    With inplace=True the dicts and lists of x are pruned in place and x is returned.
     """
-    if "Event" not in raw:
-        return None
-    E = raw["Event"] or {}
+    if not isinstance(x, (dict, list)):
+        return x
+    return (_prune_inplace if inplace else _prune_copy)(x, _NO_KEYS, True)
 
-    out_event: Dict[str, Any] = {}
+def scrub_labels(event_dict: Dict[str, Any], inplace: bool = False) -> Dict[str, Any]:
+    """Remove all threat_level keys to avoid leakage."""
+    if not isinstance(event_dict, dict):
+        return event_dict
+    return (_prune_inplace if inplace else _prune_copy)(event_dict, _LABEL_KEYS, False)
 
+# --------------------------- Schema-faithful simplify --------------------------
+# Simplifiers are projection specs (see projection.py), compiled once at import.
+
+_TAG = node(keep("name", "local", "relationship_type"))
+_TAG_NAME = node(field("name", pick="get"), require={"name": "truthy"})
+
+# Preserve important analyst signals; do not drop to_ids/uuid/object_relation/Tag.
+_SCHEMA_ATTRIBUTE = node(
+    keep("category", "type", "value", "comment", "timestamp", "uuid", "to_ids",
+         "deleted", "disable_correlation", "first_seen", "last_seen", "object_relation"),
+    each("Tag", _TAG),
+)
+
+# Keep MISP keys as-is: 'meta-category' and 'Attribute' (singular); tolerate input that
+# used 'meta_category' / 'Attributes'.
+_SCHEMA_OBJECT = node(
+    keep("name", "description", "meta-category", "timestamp", "uuid", "template_uuid",
+         "template_version", "deleted", "comment"),
+    field("meta-category", "meta_category", unless="meta-category"),
+    each("Attribute", _SCHEMA_ATTRIBUTE, "Attribute", "Attributes", source="or"),
+    each("ObjectReference", node(keep("relationship_type", "relationship", "referenced_uuid", "referenced_id",
+                                      "uuid", "comment", "timestamp", "object_uuid")), when="nonempty"),
+)
+
+SCHEMA_SPEC = spec("schema", node(
     # Pass through commonly used top-level keys verbatim (no renaming)
-    passthrough = [
-        "date","info","analysis","published","publish_timestamp","timestamp",
-        "uuid","extends_uuid","threat_level_id","Orgc","Org","distribution",
-        "Galaxy","AttributeCount"
-    ]
-    out_event.update(_copy_if_present(E, passthrough))
-
+    keep("date", "info", "analysis", "published", "publish_timestamp", "timestamp",
+         "uuid", "extends_uuid", "threat_level_id", "Orgc", "Org", "distribution",
+         "Galaxy", "AttributeCount"),
     # If non-standard 'threat_level' exists (some feeds), keep alongside threat_level_id.
-    if "threat_level" in E and "threat_level_id" not in out_event:
-        out_event["threat_level"] = E["threat_level"]
-
-    # Event-level tags
-    if isinstance(E.get("Tag"), list):
-        out_event["Tag"] = [_strip_tag(t) for t in E["Tag"] if isinstance(t, dict)]
-
-    # Attributes
-    if isinstance(E.get("Attribute"), list):
-        out_event["Attribute"] = [_simplify_attribute(a) for a in E["Attribute"] if isinstance(a, dict)]
-
-    # Objects
-    if isinstance(E.get("Object"), list):
-        out_event["Object"] = [_simplify_object(o) for o in E["Object"] if isinstance(o, dict)]
-
-    return {"Event": out_event}
+    field("threat_level", unless="threat_level_id"),
+    each("Tag", _TAG),
+    each("Attribute", _SCHEMA_ATTRIBUTE),
+    each("Object", _SCHEMA_OBJECT),
+))
+_project_schema = compile_spec(SCHEMA_SPEC)
+
+def make_simplified_event_schema(raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Produce a 'simplified' event that is still schema-faithful and loss-aware.
+    IMPORTANT: We DO NOT create or map a 'published_timestamp'. We keep 'publish_timestamp' only if present.
+    """
+    return _project_schema(raw)
 
 # ------------------------------- Textifier ------------------------------------
 
@@ -259,9 +323,163 @@ def parse_event_minimal(raw: Dict[str, Any]) -> Dict[str, Any]:
         "threat_level_id": thr_str if thr_str in {"1","2","3","4"} else None,
     }
 
-
-def _strip_tag_names_only(tag_list):
-    return [t.get("name") for t in (tag_list or []) if isinstance(t, dict) and t.get("name")]
+def count_attributes(event_dict: Dict[str, Any]) -> int:
+    """Attributes of an event (raw or simplified): Event.Attribute plus those of every Object."""
+    e = event_dict.get("Event") if isinstance(event_dict, dict) else None
+    if not isinstance(e, dict):
+        return 0
+    attrs = e.get("Attribute")
+    objs = e.get("Object")
+    n = len(attrs) if isinstance(attrs, list) else 0
+    if isinstance(objs, list):
+        n += sum(len(o.get("Attribute") or []) for o in objs if isinstance(o, dict))
+    return n
+
+
+# Bounded prefix scan: MISP exports put the scalar Event keys before Tag/Attribute/Object,
+# so the manifest fields are found without materializing the (possibly huge) document.
+META_PREFIX_BYTES = 1 << 20
+_MINIMAL_KEYS = ("uuid", "date", "info", "publish_timestamp", "threat_level_id")
+_RE_WS = re.compile(r"\s*")
+_RE_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.S)
+_RE_STRUCT = re.compile(r'["\[\]{}]')
+_JSON_DECODER = json.JSONDecoder()
+
+class _Truncated(Exception):
+    """The prefix ended before the value being scanned."""
+
+def _skip_ws(s: str, i: int) -> int:
+    return _RE_WS.match(s, i).end()
+
+def _scan_value(s: str, i: int, want: bool) -> Tuple[Any, int]:
+    """Decode the scalar at s[i] (or skip a container); returns (value, end)."""
+    c = s[i:i + 1]
+    if not c:
+        raise _Truncated()
+    if c in "[{":
+        depth = 0
+        while True:
+            m = _RE_STRUCT.search(s, i)
+            if m is None:
+                raise _Truncated()
+            if m.group() == '"':
+                ms = _RE_STRING.match(s, m.start())
+                if ms is None:
+                    raise _Truncated()
+                i = ms.end()
+                continue
+            i = m.end()
+            depth += 1 if m.group() in "[{" else -1
+            if depth == 0:
+                return None, i
+    if c == '"' and not want:
+        ms = _RE_STRING.match(s, i)
+        if ms is None:
+            raise _Truncated()
+        return None, ms.end()
+    try:
+        val, end = _JSON_DECODER.raw_decode(s, i)
+    except json.JSONDecodeError:
+        raise _Truncated()
+    if end >= len(s):
+        raise _Truncated()  # a number/literal may continue past the prefix
+    return val, end
+
+def _scan_members(s: str, i: int, wanted, descend: str = "") -> Iterator[Tuple[str, Any, int]]:
+    """
+    Yield (key, value_or_None, value_start) for each member of the object at s[i].
+    Scalars are decoded only for `wanted` keys; an object under `descend` is not skipped
+    and ends the iteration so the caller can scan into it.
+    """
+    i = _skip_ws(s, i + 1)
+    if s[i:i + 1] == "}":
+        return
+    while True:
+        key, i = _scan_value(s, i, want=True)
+        i = _skip_ws(s, i)
+        if s[i:i + 1] != ":":
+            raise _Truncated()
+        start = _skip_ws(s, i + 1)
+        if key == descend and s[start:start + 1] == "{":
+            yield key, None, start
+            return
+        val, i = _scan_value(s, start, want=key in wanted)
+        yield key, val, start
+        i = _skip_ws(s, i)
+        c = s[i:i + 1]
+        if c == "}":
+            return
+        if c != ",":
+            raise _Truncated()
+        i = _skip_ws(s, i + 1)
+
+def scan_event_minimal(prefix: bytes) -> Dict[str, Any]:
+    """
+    Same result as parse_event_minimal(json.loads(doc)), computed from the first bytes of
+    the document only. Keys not reached within the prefix come back as None.
+    """
+    s = prefix.decode("utf-8", errors="replace")
+    e: Dict[str, Any] = {}
+    try:
+        i = _skip_ws(s, 0)
+        if s[i:i + 1] != "{":
+            return {}
+        for key, val, start in _scan_members(s, i, wanted=("Event",), descend="Event"):
+            if key != "Event":
+                continue
+            if s[start:start + 1] == "[":
+                # falsy [] behaves like an empty Event; a non-empty list is not an event
+                return parse_event_minimal({"Event": {}}) if s[_skip_ws(s, start + 1):][:1] == "]" else {}
+            if s[start:start + 1] != "{":
+                try:
+                    return parse_event_minimal({"Event": val})
+                except Exception:
+                    return {}
+            remaining = set(_MINIMAL_KEYS)
+            for ekey, eval_, _ in _scan_members(s, start, wanted=_MINIMAL_KEYS + ("threat_level",)):
+                if ekey in _MINIMAL_KEYS or ekey == "threat_level":
+                    e[ekey] = eval_
+                    remaining.discard(ekey)
+                    if not remaining:
+                        break
+            break
+        else:
+            return {}
+    except _Truncated:
+        if "Event" not in s:
+            return {}
+    return parse_event_minimal({"Event": e})
+
+
+# ------------------------------ LLM-focused simplify ---------------------------
+
+def _llm_attribute(*extra: str) -> Dict[str, Any]:
+    return node(
+        field("category", pick="get"),
+        field("type", pick="get"),
+        field("value", pick="get"),
+        field("comment", pick="get", default=""),
+        field("to_ids", pick="get"),
+        *[field(k, pick="get") for k in extra],
+        each("Tag", _TAG_NAME, source="or", when="nonempty"),
+    )
+
+LLM_SPEC = spec("llm", node(
+    field("date", pick="get"),
+    field("info", pick="get"),
+    each("Tag", _TAG_NAME, source="or"),
+    each("Attribute", _llm_attribute(), source="or"),
+    each("Object", node(
+        field("name", pick="get"),
+        field("description", pick="get"),
+        field("meta-category", "meta-category", "meta_category", pick="get"),
+        each("Attribute", _llm_attribute("object_relation"), "Attribute", "Attributes", source="or"),
+        # Object references (relationship only; drop opaque UUIDs)
+        each("ObjectReference", node(field("relationship_type", "relationship_type", "relationship", pick="get"),
+                                     require={"relationship_type": "truthy"}), source="or", when="nonempty"),
+    ), source="or"),
+), post=clean_json_recursively)
+_project_llm = compile_spec(LLM_SPEC)
 
 def make_simplified_event_llm(raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """
@@ -272,130 +490,40 @@ def make_simplified_event_llm(raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
       - Object: name, description, meta-category, Attribute (same minimal fields), ObjectReference (relationship_type/relationship only)
     Drops:
       - All uuids, timestamps, published, analysis, Org/Orgc, deleted/disable_correlation, etc.
+    Empty values are removed recursively.
     """
-    if "Event" not in raw:
-        return None
-    E = raw["Event"] or {}
-    out: Dict[str, Any] = {
-        "Event": {
-            "date": E.get("date"),
-            "info": E.get("info"),
-            "Tag": [{"name": n} for n in _strip_tag_names_only(E.get("Tag"))],
-            "Attribute": [],
-            "Object": []
-        }
-    }
-    # Attributes minimal
-    for a in (E.get("Attribute") or []):
-        if not isinstance(a, dict):
-            continue
-        out["Event"]["Attribute"].append({
-            "category": a.get("category"),
-            "type": a.get("type"),
-            "value": a.get("value"),
-            "comment": a.get("comment") or "",
-            "to_ids": a.get("to_ids"),
-            "Tag": [{"name": n} for n in _strip_tag_names_only(a.get("Tag"))] if a.get("Tag") else None
-        })
-        if out["Event"]["Attribute"][-1]["Tag"] is None:
-            out["Event"]["Attribute"][-1].pop("Tag", None)
-
-    # Objects minimal
-    for o in (E.get("Object") or []):
-        if not isinstance(o, dict):
-            continue
-        obj_out = {
-            "name": o.get("name"),
-            "description": o.get("description"),
-            "meta-category": o.get("meta-category") or o.get("meta_category"),
-            "Attribute": []
-        }
-        for oa in (o.get("Attribute") or o.get("Attributes") or []):
-            if not isinstance(oa, dict):
-                continue
-            obj_out["Attribute"].append({
-                "category": oa.get("category"),
-                "type": oa.get("type"),
-                "value": oa.get("value"),
-                "comment": oa.get("comment") or "",
-                "to_ids": oa.get("to_ids"),
-                "object_relation": oa.get("object_relation"),
-                "Tag": [{"name": n} for n in _strip_tag_names_only(oa.get("Tag"))] if oa.get("Tag") else None
-            })
-            if obj_out["Attribute"][-1]["Tag"] is None:
-                obj_out["Attribute"][-1].pop("Tag", None)
-
-        # Object references (relationship only; drop opaque UUIDs)
-        refs = []
-        for r in (o.get("ObjectReference") or []):
-            if not isinstance(r, dict):
-                continue
-            rel = r.get("relationship_type") or r.get("relationship")
-            if rel:
-                refs.append({"relationship_type": rel})
-        if refs:
-            obj_out["ObjectReference"] = refs
-
-        out["Event"]["Object"].append(obj_out)
-
-    # Clean empties
-    return clean_json_recursively(out)
-
-
-def _simpl_attr_core(attr: Dict[str, Any]) -> Dict[str, Any]:
-    """Core, LLM-focused attribute subset: category, type, value, comment, to_ids, + Tag names."""
-    out: Dict[str, Any] = {
-        "category": attr.get("category"),
-        "type": attr.get("type"),
-        "value": attr.get("value"),
-    }
-    if attr.get("comment"):
-        out["comment"] = attr.get("comment")
-    if "to_ids" in attr:
-        out["to_ids"] = attr.get("to_ids")
-    # Attribute-level tags (names only)
-    if isinstance(attr.get("Tag"), list):
-        names = [t.get("name") for t in attr["Tag"] if isinstance(t, dict) and t.get("name")]
-        if names:
-            out["Tag"] = [{"name": n} for n in names]
-    return {k: v for k, v in out.items() if v not in (None, [], "")}
-
-def _simpl_object_core(obj: Dict[str, Any]) -> Dict[str, Any]:
-    """Core, LLM-focused object subset."""
-    out: Dict[str, Any] = {
-        "name": obj.get("name"),
-        "description": obj.get("description"),
-        "meta-category": obj.get("meta-category") or obj.get("meta_category"),
-    }
-    # Attributes (core fields only)
-    attrs = obj.get("Attribute") or obj.get("Attributes") or []
-    core_attrs = [_simpl_attr_core(a) for a in attrs if isinstance(a, dict)]
-    if core_attrs:
-        out["Attribute"] = core_attrs
-
-    # Object references: include relationship_type, referenced_uuid, object_uuid, timestamp (as requested)
-    refs = obj.get("ObjectReference") or []
-    core_refs = []
-    if isinstance(refs, list):
-        for r in refs:
-            if not isinstance(r, dict):
-                continue
-            keep = {}
-            if r.get("relationship_type") is not None:
-                keep["relationship_type"] = r.get("relationship_type")
-            if r.get("referenced_uuid") is not None:
-                keep["referenced_uuid"] = r.get("referenced_uuid")
-            if r.get("object_uuid") is not None:
-                keep["object_uuid"] = r.get("object_uuid")
-            if r.get("timestamp") is not None:
-                keep["timestamp"] = r.get("timestamp")
-            if keep:
-                core_refs.append(keep)
-    if core_refs:
-        out["ObjectReference"] = core_refs
-
-    # Drop empties
-    return {k: v for k, v in out.items() if v not in (None, [], "")}
+    return _project_llm(raw)
+
+# Core, LLM-focused attribute subset: category, type, value, comment, to_ids, + Tag names.
+_CORE_ATTRIBUTE = node(
+    field("category", pick="get", when="nonempty"),
+    field("type", pick="get", when="nonempty"),
+    field("value", pick="get", when="nonempty"),
+    field("comment", pick="get", when="truthy"),
+    field("to_ids", when="nonempty"),
+    each("Tag", _TAG_NAME, when="nonempty"),
+)
+
+_CORE_OBJECT = node(
+    field("name", pick="get", when="nonempty"),
+    field("description", pick="get", when="nonempty"),
+    field("meta-category", "meta-category", "meta_category", pick="get", when="nonempty"),
+    each("Attribute", _CORE_ATTRIBUTE, "Attribute", "Attributes", source="or", when="nonempty"),
+    # Object references: include relationship_type, referenced_uuid, object_uuid, timestamp
+    each("ObjectReference", node(
+        *[field(k, pick="get", when="not_none") for k in ("relationship_type", "referenced_uuid", "object_uuid", "timestamp")],
+        drop_empty=True,
+    ), source="or", when="nonempty"),
+)
+
+CORE_SPEC = spec("core", node(
+    field("date", pick="get", when="not_none"),
+    field("info", pick="get", when="not_none"),
+    each("Tag", _TAG_NAME, source="or", when="nonempty"),
+    each("Attribute", _CORE_ATTRIBUTE, source="or", when="nonempty"),
+    each("Object", _CORE_OBJECT, source="or", when="nonempty"),
+))
+_project_core = compile_spec(CORE_SPEC)
 
 def make_simplified_event(raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """
@@ -405,36 +533,4 @@ def make_simplified_event(raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
       - Exception: keep ObjectReference {relationship_type, referenced_uuid, object_uuid, timestamp} to preserve graph context.
       - Never create 'published_timestamp' (we don't map it at all).
     """
-    if "Event" not in raw:
-        return None
-    E = raw["Event"] or {}
-
-    # Event core fields
-    out_event: Dict[str, Any] = {}
-    if E.get("date") is not None:
-        out_event["date"] = E.get("date")
-    if E.get("info") is not None:
-        out_event["info"] = E.get("info")
-
-    # Event-level tags (names only)
-    tags = []
-    for t in (E.get("Tag") or []):
-        if isinstance(t, dict) and t.get("name"):
-            tags.append({"name": t.get("name")})
-    if tags:
-        out_event["Tag"] = tags
-
-    # Attributes (core)
-    attrs = E.get("Attribute") or []
-    core_attrs = [_simpl_attr_core(a) for a in attrs if isinstance(a, dict)]
-    if core_attrs:
-        out_event["Attribute"] = core_attrs
-
-    # Objects (core)
-    objs = E.get("Object") or []
-    core_objs = [_simpl_object_core(o) for o in objs if isinstance(o, dict)]
-    if core_objs:
-        out_event["Object"] = core_objs
-
-    return {"Event": out_event}
-
+    return _project_core(raw)